@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+冷启动基准：从磁盘读出全部 Prompt 并得到可用的记录对象所需的时间
+对比两条路径：
+  JSON     json.load 解析带缩进的 prompts.json，再逐条构造 PromptRecord
+  快照缓存 读取同目录下的 prompts.snap（marshal），直接还原记录
+另外给出分区完整加载（快照 + 分类/标签索引，即首屏可显示）的耗时，以及随后建立搜索索引的耗时；
+后者在界面空闲后由后台线程完成（PromptManager.prefetch），或推迟到第一次搜索
+
+用法: python benchmarks/bench_coldload.py [记录数 ...]   默认 10000 100000
+"""
+import gc
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from collection import Collection
+from data_manager import PromptManager
+from record import PromptRecord
+from storage import JsonStore
+from bench_search import make_prompts
+
+
+def make_records(count: int):
+    prompts = make_prompts(count)
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1)
+    for prompt in prompts:
+        created = start + timedelta(seconds=rng.randint(0, 86400 * 600), microseconds=rng.randint(0, 999999))
+        prompt["created_at"] = created.isoformat()
+        prompt["updated_at"] = (created + timedelta(seconds=rng.randint(0, 86400 * 30))).isoformat()
+        prompt["usage_count"] = rng.randint(0, 500)
+    return [PromptRecord(p) for p in prompts]
+
+
+def timed_load(store: JsonStore) -> float:
+    """与 PromptManager._collection 相同：读出后把 dict 转成记录对象"""
+    gc.collect()
+    start = time.perf_counter()
+    records = [data if type(data) is PromptRecord else PromptRecord(data) for data in store.load()]
+    elapsed = time.perf_counter() - start
+    assert len(records) > 0
+    return elapsed
+
+
+def timed_collection(path: Path):
+    """(加载分区到可显示的耗时, 建立搜索索引的耗时)"""
+    gc.collect()
+    collection = Collection(PromptManager.SCHEMAS[0], JsonStore(path, "prompts", record_type=PromptRecord))
+    start = time.perf_counter()
+    collection.all()
+    loaded = time.perf_counter()
+    collection.build_indexes()
+    return loaded - start, time.perf_counter() - loaded
+
+
+def run(count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prompts.json"
+        # 写出 JSON 与对应的快照缓存（和正常保存时一样）
+        JsonStore(path, "prompts", record_type=PromptRecord).save(make_records(count))
+        json_store = JsonStore(path, "prompts")
+        snapshot_store = JsonStore(path, "prompts", record_type=PromptRecord)
+
+        json_time = min(timed_load(json_store) for _ in range(3))
+        snapshot_time = min(timed_load(snapshot_store) for _ in range(3))
+        assert not snapshot_store.needs_snapshot()
+        load_time, index_time = timed_collection(path)
+        json_mb = path.stat().st_size / 1024 / 1024
+        snapshot_mb = snapshot_store.snapshot_path.stat().st_size / 1024 / 1024
+        return json_mb, json_time, snapshot_mb, snapshot_time, load_time, index_time
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'记录数':>8}{'JSON MB':>10}{'JSON ms':>10}{'快照 MB':>10}{'快照 ms':>10}{'加速':>8}"
+          f"{'分区加载 ms':>12}{'搜索索引 ms':>12}")
+    for count in counts:
+        json_mb, json_time, snapshot_mb, snapshot_time, load_time, index_time = run(count)
+        print(f"{count:>8}{json_mb:>10.1f}{json_time * 1000:>10.0f}{snapshot_mb:>10.1f}"
+              f"{snapshot_time * 1000:>10.0f}{json_time / snapshot_time:>7.1f}x"
+              f"{load_time * 1000:>12.0f}{index_time * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+正文压缩基准：合成的 OpenAPI / Markdown 风格 API 文档，在不同正文存放方式下的
+磁盘占用、常驻内存（记录 + 搜索索引）、建立搜索索引的耗时与一次内容搜索的耗时
+  搜索(冷)  清空搜索结果缓存和解压缓存后的一次搜索
+  搜索(热)  只清空搜索结果缓存，解压缓存里已有上一次读过的正文
+
+用法: python benchmarks/bench_compression.py [文档数]
+"""
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import content_store
+from data_manager import PromptManager
+from bench_search import clear_caches
+
+RESOURCES = ["users", "orders", "invoices", "products", "payments", "webhooks", "sessions", "reports"]
+FIELDS = ["id", "name", "email", "status", "amount", "currency", "created_at", "updated_at", "metadata", "owner_id"]
+
+
+def make_openapi(rng: random.Random) -> str:
+    resource = rng.choice(RESOURCES)
+    lines = ["openapi: 3.0.0", f"info:\n  title: {resource.title()} API\n  version: 1.{rng.randint(0, 9)}.0", "paths:"]
+    for method in rng.sample(["get", "post", "put", "patch", "delete"], rng.randint(2, 5)):
+        lines.append(f"  /{resource}/{{id}}:\n    {method}:\n      summary: {method.upper()} a single {resource[:-1]}")
+        lines.append("      parameters:\n        - name: id\n          in: path\n          required: true\n          schema:\n            type: string")
+        lines.append("      responses:\n        '200':\n          description: OK\n          content:\n            application/json:")
+        lines.append(f"              schema:\n                $ref: '#/components/schemas/{resource.title()}'")
+    lines.append("components:\n  schemas:")
+    for schema in rng.sample(RESOURCES, 4):
+        lines.append(f"    {schema.title()}:\n      type: object\n      properties:")
+        for field in rng.sample(FIELDS, rng.randint(5, 10)):
+            lines.append(f"        {field}:\n          type: {rng.choice(['string', 'integer', 'boolean'])}")
+    return "\n".join(lines * rng.randint(1, 6))
+
+
+def make_markdown(rng: random.Random) -> str:
+    resource = rng.choice(RESOURCES)
+    parts = [f"# {resource.title()} 接口文档", "", "## 认证", "所有请求都需要在 Header 中携带 `Authorization: Bearer <token>`。"]
+    for _ in range(rng.randint(5, 30)):
+        field = rng.choice(FIELDS)
+        parts += ["", f"### GET /{resource}?{field}=<value>", f"按 `{field}` 过滤{resource}列表。",
+                  "| 参数 | 类型 | 说明 |", "|---|---|---|", f"| {field} | string | 过滤条件 |",
+                  "```json", json.dumps({f: "..." for f in rng.sample(FIELDS, 4)}, ensure_ascii=False), "```"]
+    return "\n".join(parts)
+
+
+def make_docs(count: int):
+    rng = random.Random(3)
+    docs = []
+    for i in range(count):
+        content = make_openapi(rng) if rng.random() < 0.5 else make_markdown(rng)
+        docs.append({
+            "id": f"d{i}", "name": f"{rng.choice(RESOURCES)} API {i}", "category": "API", "tags": ["openapi"],
+            "content": content, "usage_count": 0,
+            "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00",
+        })
+    return docs
+
+
+def run_mode(docs, config):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with open(data_dir / "api_docs.json", "w", encoding="utf-8") as f:
+            json.dump(docs, f, ensure_ascii=False)
+        with open(data_dir / "config.json", "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        # 第一次启动完成格式迁移
+        manager = PromptManager(data_dir=data_dir)
+        manager.get_all_api_docs()
+        manager.flush()
+        disk = sum(p.stat().st_size for p in data_dir.iterdir() if p.name != "config.json")
+
+        content_store.inflate_cache.clear()
+        gc.collect()
+        tracemalloc.start()
+        manager = PromptManager(data_dir=data_dir)
+        manager.get_all_api_docs()
+        manager.collections["api_docs"].build_indexes()
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del manager
+
+        # 计时另开一个实例（tracemalloc 会拖慢计时）；建索引单独计时，不算进搜索
+        content_store.inflate_cache.clear()
+        manager = PromptManager(data_dir=data_dir)
+        manager.get_all_api_docs()
+        start = time.perf_counter()
+        manager.collections["api_docs"].build_indexes()
+        build = (time.perf_counter() - start) * 1000
+
+        content_store.inflate_cache.clear()
+        clear_caches(manager)
+        start = time.perf_counter()
+        hits = len(manager.search_api_docs("owner_id:"))
+        cold = (time.perf_counter() - start) * 1000
+        clear_caches(manager)
+        start = time.perf_counter()
+        manager.search_api_docs("owner_id:")
+        warm = (time.perf_counter() - start) * 1000
+        return disk, memory, build, cold, warm, hits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    docs = make_docs(count)
+    raw = sum(len(d["content"].encode("utf-8")) for d in docs)
+    print(f"{count} 篇合成 API 文档，正文共 {raw / 1024 / 1024:.1f} MB")
+
+    modes = [("原文", {}), ("zlib", {"content_compression": "zlib"})]
+    if content_store.zstandard is not None:
+        modes.append(("zstd", {"content_compression": "zstd"}))
+    modes.append(("外置+zlib", {"content_compression": "zlib", "content_storage": "blob"}))
+
+    print(f"{'方式':<12}{'磁盘 MB':>10}{'内存 MB':>10}{'建索引 ms':>12}{'搜索 ms(冷)':>14}{'搜索 ms(热)':>14}{'命中':>8}")
+    for label, config in modes:
+        disk, memory, build, cold, warm, hits = run_mode(docs, config)
+        print(f"{label:<12}{disk / 1024 / 1024:>10.1f}{memory / 1024 / 1024:>10.1f}{build:>12.1f}"
+              f"{cold:>14.1f}{warm:>14.1f}{hits:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+容错搜索基准：在合成 Prompt 库上逐字输入带错字的查询（"~" 开头），测量每次按键的搜索耗时
+  建索引   第一次输入 "~" 后在后台建立 trigram 索引的耗时，不占用界面线程
+  建立期间 索引建好之前继续输入：搜索不等待索引，先返回子串搜索的结果（耗时与普通搜索相同，
+           很短的片段可能要几十毫秒），统计这些按键的最大耗时
+  按键     索引建好后每输入一个字符调用一次 search_prompts 的耗时（每次计时前清空结果缓存），
+           统计中位数、P95 和最大值；P95 超过 KEYSTROKE_MS 时以失败退出
+  命中     输入完成后，原记录是否出现在结果中（查询取记录名称中的两个词，并交换其中一个词里相邻的两个字母）
+
+用法: python benchmarks/bench_fuzzy.py [记录数]   默认 50000
+"""
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_manager import PromptManager
+from bench_search import make_prompts, clear_caches
+
+QUERIES = 100
+KEYSTROKE_MS = 10.0
+
+
+def make_typo(word: str, rng: random.Random) -> str:
+    """交换相邻的两个字母"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def make_queries(prompts, rng: random.Random):
+    """(目标 id, 查询)：名称里两个词倒序输入，其中较长的词带一个错字"""
+    queries = []
+    for prompt in rng.sample(prompts, QUERIES):
+        words = prompt["name"].split()[:2]
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        words[longest] = make_typo(words[longest], rng)
+        queries.append((prompt["id"], " ".join(reversed(words))))
+    return queries
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(5)
+    prompts = make_prompts(count)
+    queries = make_queries(prompts, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with open(data_dir / "prompts.json", "w", encoding="utf-8") as f:
+            json.dump(prompts, f, ensure_ascii=False)
+        manager = PromptManager(data_dir=data_dir)
+        manager.get_all_prompts()
+        manager.prompt_index
+
+        # 第一次输入 "~" 开始在后台建立索引；建好之前的按键不等待
+        start = time.perf_counter()
+        early = []
+        typed = "~"
+        for char in " " + queries[0][1]:
+            clear_caches(manager)
+            keystroke = time.perf_counter()
+            manager.search_prompts(typed, ranked=True)
+            early.append((time.perf_counter() - keystroke) * 1000)
+            typed += char.strip()
+        while manager.index_pending("prompts", "~"):
+            time.sleep(0.01)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        keystrokes = []
+        found = 0
+        for target, query in queries:
+            typed = "~"
+            for char in query:
+                typed += char
+                clear_caches(manager)
+                start = time.perf_counter()
+                results = manager.search_prompts(typed, ranked=True)
+                keystrokes.append((time.perf_counter() - start) * 1000)
+            found += any(r["id"] == target for r in results)
+
+    keystrokes.sort()
+    p95 = keystrokes[int(len(keystrokes) * 0.95)]
+    print(f"{count} 条合成 Prompt，后台建立 trigram 索引 {build_ms:.0f} ms")
+    print(f"索引建好之前的 {len(early)} 次按键：最大 {max(early):.2f} ms（返回子串搜索的结果，不等待索引）")
+    print(f"{len(keystrokes)} 次按键：中位数 {statistics.median(keystrokes):.2f} ms，"
+          f"P95 {p95:.2f} ms，最大 {keystrokes[-1]:.2f} ms")
+    print(f"带错字、词序颠倒的查询命中原记录 {found}/{len(queries)}")
+    if p95 > KEYSTROKE_MS:
+        sys.exit(f"按键耗时 P95 超过 {KEYSTROKE_MS:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
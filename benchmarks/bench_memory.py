@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+内存基准：同样的 Prompt 数据分别以普通 dict 和 PromptRecord（__slots__）保存时的常驻内存
+数据先序列化成 JSON 再解析，和真实加载一样每条记录都持有自己的时间戳、分类字符串。
+
+用法: python benchmarks/bench_memory.py [记录数]
+"""
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from record import PromptRecord
+from bench_search import make_prompts
+
+
+def make_json(count: int) -> str:
+    prompts = make_prompts(count)
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1)
+    for prompt in prompts:
+        created = start + timedelta(seconds=rng.randint(0, 86400 * 600), microseconds=rng.randint(0, 999999))
+        prompt["created_at"] = created.isoformat()
+        prompt["updated_at"] = (created + timedelta(seconds=rng.randint(0, 86400 * 30))).isoformat()
+        prompt["usage_count"] = rng.randint(0, 500)
+    return json.dumps(prompts, ensure_ascii=False)
+
+
+def measure(build) -> int:
+    """返回 build() 的结果在内存中占用的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = make_json(count)
+
+    dict_bytes = measure(lambda: json.loads(text))
+    # 解析出的 dict 在转换后立即释放，只统计留下来的 PromptRecord
+    record_bytes = measure(lambda: [PromptRecord(data) for data in json.loads(text)])
+
+    print(f"{count} 条合成 Prompt")
+    print(f"{'表示':<16}{'总计 MB':>10}{'每条 字节':>12}")
+    for label, size in (("dict", dict_bytes), ("PromptRecord", record_bytes)):
+        print(f"{label:<16}{size / 1024 / 1024:>10.1f}{size / count:>12.0f}")
+    print(f"节省 {(dict_bytes - record_bytes) / count:.0f} 字节/条（{1 - record_bytes / dict_bytes:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
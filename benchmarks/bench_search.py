@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+搜索微基准：50k 条合成 Prompt 上单次查询耗时
+对比三种实现：
+  旧实现   每次查询对每条记录的每个字段调用 .lower()
+  缓存文本 逐条记录与缓存的规范化搜索文本做一次子串判断（不用倒排索引）
+  当前     倒排索引给出候选 + 缓存文本校验（PromptManager.search_prompts）
+  排序     当前实现 + 对全部命中做 BM25F 打分，堆选择取前 20 条（ranked=True, limit=20）
+当前、排序两列每次计时前清空结果缓存（QueryCache）和逐字输入缓存（NarrowingCache），是真正执行搜索的耗时；
+缓存命中一列是同一查询第二次调用、直接取 QueryCache 结果的耗时
+
+用法: python benchmarks/bench_search.py [记录数]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_manager import PromptManager
+from search_index import normalize_text
+
+CATEGORIES = ["编程", "写作", "分析", "产品", "教育", "翻译"]
+QUERIES = ["py", "python", "sql review", "性能", "写作助手", "Translate", "不存在的词", "zzqx"]
+
+
+def make_vocabulary(rng: random.Random):
+    """合成词表：几千个英文伪词 + 常用汉字组成的中文词，外加查询里用到的真实词"""
+    syllables = ["ka", "lo", "mi", "ren", "sto", "qua", "ter", "vin", "pel", "dra", "zu", "fen"]
+    latin = {"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(4000)}
+    hanzi = [chr(c) for c in range(0x4E00, 0x4E00 + 1500)]
+    chinese = {"".join(rng.choices(hanzi, k=rng.randint(2, 4))) for _ in range(4000)}
+    real = ["python", "sql", "review", "performance", "translate", "性能", "写作", "助手", "翻译"]
+    return sorted(latin) + sorted(chinese) + real
+
+
+def make_prompts(count: int):
+    rng = random.Random(42)
+    words = make_vocabulary(rng)
+    prompts = []
+    for i in range(count):
+        prompts.append({
+            "id": f"p{i}",
+            "name": " ".join(rng.choices(words, k=3)),
+            "category": rng.choice(CATEGORIES),
+            "tags": rng.sample(words, 3),
+            "content": " ".join(rng.choices(words, k=rng.randint(20, 120))),
+            "usage_count": 0,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": "2024-01-01T00:00:00",
+        })
+    return prompts
+
+
+def legacy_search(prompts, query, category=None):
+    """旧版 search_prompts 的逐条扫描实现"""
+    results = []
+    query_lower = query.lower()
+    for prompt in prompts:
+        if category and prompt.get("category") != category:
+            continue
+        if not query:
+            results.append(prompt)
+            continue
+        if (query_lower in prompt["name"].lower() or
+            query_lower in prompt.get("category", "").lower() or
+            query_lower in prompt.get("content", "").lower() or
+            any(query_lower in tag.lower() for tag in prompt.get("tags", []))):
+            results.append(prompt)
+    return results
+
+
+def blob_scan(manager, prompts, query):
+    needle = normalize_text(query)
+    return [p for p in prompts if manager.prompt_index.matches(p["id"], needle)]
+
+
+def clear_caches(manager):
+    """清空搜索结果缓存，下一次查询从倒排索引重新开始"""
+    manager.query_cache.clear()
+    for collection in manager.collections.values():
+        collection._search_cache.clear()
+
+
+def per_query_ms(fn, query, repeat=5, reset=None):
+    """repeat 次中最快的一次；reset 给出时每次计时前调用（不计入耗时）"""
+    best = float("inf")
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        fn(query)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with open(data_dir / "prompts.json", "w", encoding="utf-8") as f:
+            json.dump(make_prompts(count), f, ensure_ascii=False)
+
+        start = time.perf_counter()
+        manager = PromptManager(data_dir=data_dir)
+        prompts = manager.get_all_prompts()  # 分区按需加载，这里触发读盘
+        manager.prompt_index  # 搜索索引在第一次搜索时才建立，这里一并计入
+        load_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{count} 条合成 Prompt，加载 + 建索引 {load_ms:.0f} ms")
+        print(f"{'查询':<14}{'旧实现 ms':>12}{'缓存文本 ms':>14}{'当前 ms':>12}{'排序 ms':>12}"
+              f"{'缓存命中 ms':>14}{'命中':>8}")
+        reset = lambda: clear_caches(manager)
+        for query in QUERIES:
+            before = per_query_ms(lambda q: legacy_search(prompts, q), query)
+            blob = per_query_ms(lambda q: blob_scan(manager, prompts, q), query)
+            after = per_query_ms(manager.search_prompts, query, reset=reset)
+            ranked = per_query_ms(lambda q: manager.search_prompts(q, ranked=True, limit=20), query, reset=reset)
+            hits = len(manager.search_prompts(query))
+            warm = per_query_ms(manager.search_prompts, query)
+            print(f"{query:<14}{before:>12.2f}{blob:>14.2f}{after:>12.2f}{ranked:>12.2f}{warm:>14.2f}{hits:>8}")
+
+
+if __name__ == "__main__":
+    main()
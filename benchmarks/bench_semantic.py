@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+语义搜索基准：合成 Prompt 库上的 TF-IDF 向量索引（需要 numpy）
+  首次输入 第一次输入 "?" 的耗时（索引在后台建立，不应等待）
+  建索引   后台为全部记录计算向量、写入内存映射矩阵的耗时
+  新增     索引建好后逐条新增记录的最大耗时（矩阵预留了空行，不应触发扩容）
+  重新打开 重启后沿用磁盘上的矩阵（只核对每条记录文本的 crc32）的耗时
+  查询     search_prompts("?...") 单次耗时的中位数和最大值
+  命中     查询取一条记录正文里打乱顺序的 8 个词，原记录是否出现在前 10 条结果中
+
+用法: python benchmarks/bench_semantic.py [记录数]   默认 20000
+"""
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_manager import PromptManager
+from bench_search import make_prompts
+
+QUERIES = 100
+ADDS = 20
+
+
+def make_queries(prompts, rng: random.Random):
+    """(目标 id, 查询)：正文里随机取 8 个词，打乱顺序"""
+    queries = []
+    for prompt in rng.sample(prompts, QUERIES):
+        words = rng.sample(prompt["content"].split(), 8)
+        queries.append((prompt["id"], "?" + " ".join(words)))
+    return queries
+
+
+def wait_for_index(manager: PromptManager):
+    """输入 "?" 触发后台建立，等到索引建好；返回 (首次输入耗时 ms, 建立耗时 s)"""
+    start = time.perf_counter()
+    manager.search_prompts("?")
+    first = (time.perf_counter() - start) * 1000
+    while manager.index_pending("prompts", "?"):
+        time.sleep(0.01)
+    return first, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(7)
+    prompts = make_prompts(count)
+    queries = make_queries(prompts, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        with open(data_dir / "prompts.json", "w", encoding="utf-8") as f:
+            json.dump(prompts, f, ensure_ascii=False)
+        manager = PromptManager(data_dir=data_dir)
+        manager.get_all_prompts()
+
+        first_ms, build_time = wait_for_index(manager)
+
+        timings = []
+        found = 0
+        for target, query in queries:
+            start = time.perf_counter()
+            results = manager.search_prompts(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+            found += any(r["id"] == target for r in results)
+        add_timings = []
+        for i in range(ADDS):
+            start = time.perf_counter()
+            manager.add_prompt(f"新增 {i}", "测试", [], prompts[i]["content"])
+            add_timings.append((time.perf_counter() - start) * 1000)
+        manager.compact_storage()
+
+        reopened = PromptManager(data_dir=data_dir)
+        reopened.get_all_prompts()
+        _, reopen_time = wait_for_index(reopened)
+
+    print(f"{count} 条合成 Prompt，首次输入 \"?\" {first_ms:.1f} ms，"
+          f"后台建立向量索引 {build_time:.1f} s，重新打开 {reopen_time:.1f} s")
+    print(f"建好后新增 {ADDS} 条：最大 {max(add_timings):.1f} ms")
+    print(f"{len(timings)} 次查询：中位数 {statistics.median(timings):.1f} ms，最大 {max(timings):.1f} ms")
+    print(f"打乱词序的正文片段命中原记录（前 10 条）{found}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+近似重复检测基准：合成 Prompt 库中混入一批“原文 + 小改动”的变体
+  建索引   为全部记录计算 MinHash 签名并分桶的耗时
+  查询     MinHashIndex.query 单次耗时（只查 LSH 桶，与库大小无关）
+  逐条比较 对同一查询逐条计算签名相似度（不用 LSH 桶）的耗时，作为对照
+  召回     每个变体的查询结果中是否包含它的原文
+
+用法: python benchmarks/bench_similar.py [记录数 ...]   默认 10000 100000
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from minhash import MinHashIndex, signature, similarity
+from bench_search import make_prompts
+
+VARIANTS = 200
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """模拟手工修改：删掉、替换或插入少量词"""
+    words = text.split()
+    for _ in range(max(1, len(words) // 15)):
+        i = rng.randrange(len(words))
+        action = rng.random()
+        if action < 0.3:
+            del words[i]
+        elif action < 0.6:
+            words[i] = words[rng.randrange(len(words))]
+        else:
+            words.insert(i, words[rng.randrange(len(words))])
+    return " ".join(words)
+
+
+def run(count: int):
+    rng = random.Random(3)
+    prompts = make_prompts(count)
+    originals = rng.sample(prompts, VARIANTS)
+    variants = [(original["id"], mutate(original["content"], rng)) for original in originals]
+
+    index = MinHashIndex()
+    start = time.perf_counter()
+    for prompt in prompts:
+        index.add(prompt["id"], prompt["content"])
+    build_time = time.perf_counter() - start
+
+    query_times = []
+    found = 0
+    for original_id, text in variants:
+        start = time.perf_counter()
+        results = index.query(text)
+        query_times.append(time.perf_counter() - start)
+        found += any(record_id == original_id for record_id, _ in results)
+
+    signatures = index._signatures
+    scan_times = []
+    for _, text in variants[:10]:
+        start = time.perf_counter()
+        sig = signature(text)
+        [record_id for record_id, other in signatures.items() if similarity(sig, other) >= 0.7]
+        scan_times.append(time.perf_counter() - start)
+    return build_time, statistics.median(query_times), statistics.median(scan_times), found / VARIANTS
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'记录数':>8}{'建索引 s':>10}{'查询 ms':>10}{'逐条 ms':>10}{'召回':>8}")
+    for count in counts:
+        build_time, query_time, scan_time, recall = run(count)
+        print(f"{count:>8}{build_time:>10.1f}{query_time * 1000:>10.2f}{scan_time * 1000:>10.0f}{recall:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,742 @@
+import hashlib
+import heapq
+import threading
+import unicodedata
+import uuid
+from datetime import datetime
+from typing import List, Dict, Optional, Set, Tuple, Callable
+
+from content_store import STORAGE_SUFFIXES
+from fuzzy_index import TrigramIndex, CONTENT_CHARS, MIN_SIMILARITY, MAX_RESULTS
+from minhash import MinHashIndex, DEFAULT_THRESHOLD
+from pinyin import PinyinIndex, is_query as is_pinyin_query
+from ranking import rank, rank_by_relevance
+from record_table import RecordTable
+from semantic_index import (SemanticIndex, TEXT_CHARS, MAX_RESULTS as SEMANTIC_RESULTS,
+                            available as semantic_available)
+from search_index import SearchIndex, NarrowingCache, normalize_text
+
+
+# 搜索框里以这个字符开头的查询走容错（trigram）搜索
+FUZZY_PREFIX = "~"
+# 以这个字符开头的查询走语义（TF-IDF 向量）搜索
+SEMANTIC_PREFIX = "?"
+# 建立索引时每处理这么多条记录回调一次进度
+INDEX_PROGRESS_EVERY = 500
+
+
+def generate_id() -> str:
+    return str(uuid.uuid4())
+
+
+def normalize_content(text: str) -> str:
+    """判重用的规范化：Unicode NFC、去掉首尾空白、连续空白（含换行）合并为一个空格；保留大小写"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def content_hash(text) -> Optional[bytes]:
+    """规范化正文的哈希（用于判重）；空正文不参与判重，返回 None"""
+    if not isinstance(text, str):
+        return None
+    text = normalize_content(text)
+    if not text:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def mask_secret(value: str) -> str:
+    """遮蔽密钥类字段，只显示前4位和后4位"""
+    if not value:
+        return ""
+    if len(value) <= 8:
+        return "*" * len(value)
+    return value[:4] + "*" * (len(value) - 8) + value[-4:]
+
+
+class Schema:
+    """一个分区的结构描述
+
+    name            分区名，同时是数据文件名（<name>.json）
+    record_type     内存中的紧凑记录类型
+    search_fields   参与搜索的字段
+    masked_fields   显示时需要遮蔽的字段（如 API 密钥）
+    indexes         建二级索引的字段（分类、标签），分类列表、统计、按分类筛选都直接查索引
+    content_field   正文字段（sqlite 全文索引用）
+    external_content  正文是否参与外置 / 压缩存放
+    rank_weights    排序时各搜索字段的 BM25F 权重，默认名称 3、标签 2、正文 1、分类 0.5
+    pinyin_fields   汉字另按音节索引（全拼、首字母及混拼）的字段，默认取搜索字段中的名称、分类、标签
+    """
+
+    def __init__(self, name: str, record_type, search_fields: Tuple[str, ...],
+                 masked_fields: Tuple[str, ...] = (), indexes: Tuple[str, ...] = ("category",),
+                 content_field: str = "content", external_content: bool = False,
+                 rank_weights: Optional[Dict[str, float]] = None,
+                 pinyin_fields: Optional[Tuple[str, ...]] = None):
+        self.name = name
+        self.record_type = record_type
+        self.search_fields = search_fields
+        self.masked_fields = masked_fields
+        self.indexes = indexes
+        self.content_field = content_field
+        self.external_content = external_content
+        if rank_weights is None:
+            rank_weights = {"name": 3.0, "tags": 2.0, content_field: 1.0, "category": 0.5}
+        self.rank_weights = rank_weights
+        if pinyin_fields is None:
+            pinyin_fields = tuple(f for f in ("name", "category", "tags") if f in search_fields)
+        self.pinyin_fields = pinyin_fields
+
+
+class FieldIndex:
+    """字段值 → 记录 id 的二级索引；列表 / 元组类型的值（标签）按每个元素分别索引"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._ids: Dict[object, Dict[str, None]] = {}  # 值 → 有序 id 集合
+        self._keys: Dict[str, tuple] = {}  # id → 该记录登记过的值
+
+    def _values(self, record: Dict) -> tuple:
+        value = record.get(self.field)
+        values = tuple(value) if isinstance(value, (list, tuple)) else (value,)
+        # 不可哈希的值（手工改坏的数据）不进索引
+        return tuple(v for v in values if v.__hash__ is not None)
+
+    def add(self, record: Dict):
+        record_id = record["id"]
+        keys = self._values(record)
+        self._keys[record_id] = keys
+        for key in keys:
+            self._ids.setdefault(key, {})[record_id] = None
+
+    def remove(self, record_id: str):
+        for key in self._keys.pop(record_id, ()):
+            ids = self._ids.get(key)
+            if ids is not None:
+                ids.pop(record_id, None)
+                if not ids:
+                    del self._ids[key]
+
+    def update(self, record: Dict):
+        self.remove(record["id"])
+        self.add(record)
+
+    def ids(self, value) -> List[str]:
+        return list(self._ids.get(value, ()))
+
+    def counts(self) -> Dict[object, int]:
+        return {key: len(ids) for key, ids in self._ids.items()}
+
+
+def field_text(record, field: str):
+    """记录某个字段的值；外置 / 压缩正文读取时不进入预览用的解压缓存（建索引时每条只读一次）"""
+    value = getattr(record, field, None)
+    if type(value) in STORAGE_SUFFIXES:
+        return value.load(cache=False)
+    return record.get(field)
+
+
+class ContentHashIndex:
+    """规范化正文的哈希 → 记录 id，用于 O(1) 判重"""
+
+    def __init__(self):
+        self._ids: Dict[bytes, Dict[str, None]] = {}  # 哈希 → 有序 id 集合（先加入的在前）
+        self._hashes: Dict[str, bytes] = {}  # id → 登记过的哈希
+
+    def add(self, record_id: str, text):
+        digest = content_hash(text)
+        if digest is not None:
+            self._hashes[record_id] = digest
+            self._ids.setdefault(digest, {})[record_id] = None
+
+    def remove(self, record_id: str):
+        digest = self._hashes.pop(record_id, None)
+        ids = self._ids.get(digest)
+        if ids is not None:
+            ids.pop(record_id, None)
+            if not ids:
+                del self._ids[digest]
+
+    def update(self, record_id: str, text):
+        self.remove(record_id)
+        self.add(record_id, text)
+
+    def find(self, text) -> Optional[str]:
+        """与 text 规范化后相同的最早一条记录的 id"""
+        ids = self._ids.get(content_hash(text))
+        return next(iter(ids)) if ids else None
+
+
+class Collection:
+    """一个分区的完整引擎：记录表 + 搜索索引 + 二级索引 + 存储 + 搜索缓存 + 使用次数合并写盘
+
+    三个分区（Prompts、API 文档、API 密钥）共用这一份实现，差异全部由 Schema 描述。
+    记录在第一次访问时才读盘；搜索索引等需要逐条切词的索引在第一次用到时才建立，
+    或由后台预加载（build_indexes）提前建好。同一分区只会加载一次、每个索引只会建立一次。
+    """
+
+    # 按需建立、之后随增删改维护的索引（属性名）
+    LAZY_INDEXES = ("_search_index", "_pinyin_index", "_hash_index", "_similar_index", "_fuzzy_index",
+                    "_semantic_index")
+
+    def __init__(self, schema: Schema, store, contents=None):
+        self.schema = schema
+        self.name = schema.name
+        self.store = store
+        self.contents = contents  # ContentStore，正文外置 / 压缩；不参与时为 None
+        # 每次修改都递增数据版本号，搜索缓存据此失效；使用次数只影响排序，另记一个版本号
+        self.version = 0
+        self.usage_version = 0
+        self._search_cache = NarrowingCache()
+        # 使用次数只在内存中累加（记录里始终是最新值），有变化的 id 记在这里，由 flush_usage 统一写盘
+        self._pending_usage: Set[str] = set()
+        self._loaded: Optional[Tuple[RecordTable, Dict[str, FieldIndex]]] = None
+        self._load_lock = threading.Lock()
+        self._listeners: List[Callable[[str, List[str]], None]] = []
+        # 搜索索引 / 拼音索引 / 正文哈希索引 / 近似重复索引 / 容错搜索索引 / 语义索引在第一次用到时才建立
+        # （需要逐条切词、读取全部正文），之后随增删改维护。
+        # 建立过程不持有 _index_lock，期间的增删改只把 id 记进 _pending_changes，建完后在锁内补上再发布
+        self._index_lock = threading.Lock()
+        self._build_locks = {attr: threading.Lock() for attr in self.LAZY_INDEXES}
+        self._pending_changes: Dict[str, Set[str]] = {}
+        self._search_index: Optional[SearchIndex] = None
+        # 存储引擎自带全文索引（sqlite）时不建 SearchIndex，拼音另建这一份小索引
+        self._pinyin_index: Optional[PinyinIndex] = None
+        self._hash_index: Optional[ContentHashIndex] = None
+        self._similar_index: Optional[MinHashIndex] = None
+        self._fuzzy_index: Optional[TrigramIndex] = None
+        self._semantic_index: Optional[SemanticIndex] = None
+
+    # ==================== 加载 ====================
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded is not None
+
+    def _load(self) -> Tuple[RecordTable, Dict[str, FieldIndex]]:
+        loaded = self._loaded
+        if loaded is None:
+            with self._load_lock:
+                loaded = self._loaded
+                if loaded is None:
+                    record_type = self.schema.record_type
+                    # 从快照缓存读出的已经是记录对象，JSON / 日志里的 dict 才需要转换
+                    records = RecordTable([data if type(data) is record_type else record_type(data)
+                                           for data in self.store.load()])
+                    changed = self.contents is not None and self.contents.attach_all(records)
+                    if changed or self.store.needs_snapshot():
+                        # 正文外置 / 压缩 / 还原的迁移结果写回存储，或重建过期的快照缓存
+                        if changed:
+                            self.contents.sync()
+                        self.store.save(records)
+                    # 分类、标签的二级索引只是字典登记，随加载一起建立；搜索索引留到第一次搜索
+                    fields = {field: FieldIndex(field) for field in self.schema.indexes}
+                    for record in records:
+                        for field_index in fields.values():
+                            field_index.add(record)
+                    loaded = (records, fields)
+                    self._loaded = loaded
+        return loaded
+
+    @property
+    def records(self) -> RecordTable:
+        return self._load()[0]
+
+    @property
+    def index(self) -> SearchIndex:
+        """倒排索引 + 每条记录缓存的规范化搜索文本：搜索时只校验候选记录，每条一次子串判断"""
+        return self._lazy_index("_search_index", self._new_search_index)
+
+    def _new_search_index(self) -> SearchIndex:
+        return SearchIndex(self.schema.search_fields, self.schema.pinyin_fields)
+
+    @property
+    def indexes_ready(self) -> bool:
+        if self.store.has_full_text_index():
+            return self._pinyin_index is not None or not self.schema.pinyin_fields
+        return self._search_index is not None
+
+    def build_indexes(self):
+        """加载记录并建立子串搜索索引（后台预加载时调用，之后第一次搜索不再等待）；
+        存储引擎自带全文索引时只建拼音索引。
+        容错、语义搜索的索引只在第一次输入 "~" / "?" 时才在后台建立，不用这些功能就不占内存"""
+        if not self.store.has_full_text_index():
+            self.index
+        elif self.schema.pinyin_fields:
+            self._lazy_index("_pinyin_index", PinyinIndex)
+
+    def _build_in_background(self, attr: str, create: Callable,
+                             fill: Optional[Callable] = None) -> Optional[threading.Thread]:
+        """在后台线程中建立索引 attr（参数同 _lazy_index）；已经建好或正在建立时什么也不做"""
+        if getattr(self, attr) is not None or self._build_locks[attr].locked():
+            return None
+        thread = threading.Thread(target=self._lazy_index, args=(attr, create, fill),
+                                  name=f"{self.name}-{attr.strip('_')}", daemon=True)
+        thread.start()
+        return thread
+
+    # ==================== 按需建立的索引 ====================
+
+    def _lazy_index(self, attr: str, create: Callable, fill: Optional[Callable] = None,
+                    progress: Optional[Callable[[int, int], Optional[bool]]] = None):
+        """取出（必要时先建立）索引 attr：create() 给出空索引，fill(index, records) 加入全部记录
+        （默认逐条 _refresh）。其他线程同时请求时等待同一次建立完成。
+        逐条建立时定期回调 progress(已处理, 总数)，返回 False 时放弃建立并返回 None"""
+        target = getattr(self, attr)
+        if target is not None:
+            return target
+        with self._build_locks[attr]:
+            target = getattr(self, attr)
+            if target is not None:
+                return target
+            with self._index_lock:
+                self._pending_changes[attr] = set()
+            try:
+                # 在记录表的副本上建立，主线程可以同时增删改
+                records = list(self.records)
+                target = create()
+                if fill is None:
+                    total = len(records)
+                    for count, record in enumerate(records, 1):
+                        self._refresh(attr, target, record["id"], record)
+                        if progress is not None and count % INDEX_PROGRESS_EVERY == 0:
+                            if progress(count, total) is False:
+                                return None
+                else:
+                    fill(target, records)
+                with self._index_lock:
+                    for record_id in self._pending_changes[attr]:
+                        self._refresh(attr, target, record_id)
+                    setattr(self, attr, target)
+            finally:
+                with self._index_lock:
+                    self._pending_changes.pop(attr, None)
+        return target
+
+    def _refresh(self, attr: str, target, record_id: str, record=None):
+        """让索引 attr 中的 record_id 与记录表一致：记录已不存在时移除，否则重新登记"""
+        if record is None:
+            record = self._loaded[0].get(record_id)
+            if record is None:
+                target.remove(record_id)
+                return
+        if attr == "_search_index":
+            target.update(record)
+        elif attr == "_pinyin_index":
+            target.update(record_id, self._pinyin_values(record))
+        elif attr == "_fuzzy_index":
+            target.update(record_id, self._fuzzy_text(record))
+        elif attr == "_semantic_index":
+            target.update(record_id, self._semantic_text(record))
+        else:
+            target.update(record_id, field_text(record, self.schema.content_field))
+
+    def _changed(self, record_id: str):
+        """记录新增、修改或删除后同步各索引；正在建立的索引只记下 id，建完后补上"""
+        with self._index_lock:
+            for attr in self.LAZY_INDEXES:
+                target = getattr(self, attr)
+                if target is not None:
+                    self._refresh(attr, target, record_id)
+                elif attr in self._pending_changes:
+                    self._pending_changes[attr].add(record_id)
+
+    # ==================== 变更通知 ====================
+
+    def subscribe(self, callback: Callable[[str, List[str]], None]):
+        """记录增删改后回调 callback(分区名, 变化的 id 列表)；批量操作只回调一次"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify(self, record_ids: List[str]):
+        for callback in list(self._listeners):
+            try:
+                callback(self.name, record_ids)
+            except Exception as e:
+                print(f"Error in {self.name} listener: {e}")
+
+    # ==================== 增删改查 ====================
+
+    def _indexed(self, record):
+        """新记录或修改后的记录：安排正文存放、更新所有索引、递增版本号"""
+        if self.contents is not None:
+            self.contents.place(record)
+        for field_index in self._load()[1].values():
+            field_index.update(record)
+        self._changed(record["id"])
+        self.version += 1
+
+    def add(self, fields: Dict) -> Dict:
+        return self.add_many([fields])[0]
+
+    def add_many(self, items: List[Dict]) -> List[Dict]:
+        """批量新增：逐条更新索引，只写一次盘、只通知一次"""
+        now = datetime.now().isoformat()
+        records = self.records
+        added = []
+        for fields in items:
+            record = self.schema.record_type({"id": generate_id(), **fields, "usage_count": 0,
+                                              "created_at": now, "updated_at": now})
+            records.append(record)
+            self._indexed(record)
+            added.append(record)
+        if added:
+            self.persist(added)
+            self.notify([r["id"] for r in added])
+        return added
+
+    def insert(self, record: Dict) -> Dict:
+        """导入用：加入一条完整记录并更新索引，不单独写盘（批量结束后调用 persist 和 notify）"""
+        record = self.schema.record_type(record)
+        self.records.append(record)
+        self._indexed(record)
+        return record
+
+    def update(self, record_id: str, fields: Dict) -> bool:
+        return self.update_many({record_id: fields}) > 0
+
+    def update_many(self, changes: Dict[str, Dict]) -> int:
+        """批量修改：changes 为 id → 要修改的字段，返回实际修改的条数"""
+        now = datetime.now().isoformat()
+        records = self.records
+        changed = []
+        for record_id, fields in changes.items():
+            record = records.get(record_id)
+            if record is None:
+                continue
+            for key, value in fields.items():
+                record[key] = value
+            record["updated_at"] = now
+            self._indexed(record)
+            changed.append(record)
+        if changed:
+            self.persist(changed)
+            self.notify([r["id"] for r in changed])
+        return len(changed)
+
+    def persist(self, changed: List[Dict]):
+        """把新增 / 修改的记录交给存储引擎；外置正文先刷到磁盘，再写引用它们的记录"""
+        if self.contents is not None:
+            self.contents.sync()
+        self.store.put_many(self.records, changed)
+
+    def _unindex(self, record_id: str) -> bool:
+        records, fields = self._load()
+        if records.remove(record_id) is None:
+            return False
+        for field_index in fields.values():
+            field_index.remove(record_id)
+        self._changed(record_id)
+        self.version += 1
+        return True
+
+    def delete(self, record_id: str) -> bool:
+        return self.delete_many([record_id]) > 0
+
+    def delete_many(self, record_ids: List[str]) -> int:
+        """批量删除，返回实际删除的条数"""
+        removed = [record_id for record_id in record_ids if self._unindex(record_id)]
+        if removed:
+            self.store.delete_many(self.records, removed)
+            self.notify(removed)
+        return len(removed)
+
+    def discard(self, record_ids: List[str]):
+        """撤销尚未写盘的 insert（导入失败或取消时）"""
+        for record_id in record_ids:
+            self._unindex(record_id)
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        return self.records.get(record_id)
+
+    def _pinyin_values(self, record) -> List[str]:
+        """pinyin_fields 中字段的规范化值（与 SearchIndex 登记进拼音索引的相同）"""
+        values = []
+        for field in self.schema.pinyin_fields:
+            value = record.get(field)
+            if value:
+                values.extend([normalize_text(value)] if isinstance(value, str) else [normalize_text(v) for v in value])
+        return values
+
+    def _fuzzy_text(self, record) -> str:
+        return self._summary_text(record, CONTENT_CHARS)
+
+    def _semantic_text(self, record) -> str:
+        return self._summary_text(record, TEXT_CHARS)
+
+    def _new_semantic_index(self) -> SemanticIndex:
+        return SemanticIndex(self.store.path.with_name(f"{self.name}.vectors.npy"))
+
+    def _fill_semantic_index(self, vector_index: SemanticIndex, records: List[Dict]):
+        # 磁盘上有上次保存的矩阵时沿用文本没变的行
+        vector_index.build((record["id"], self._semantic_text(record)) for record in records)
+
+    def _summary_text(self, record, content_chars: int) -> str:
+        """容错 / 语义搜索索引的文本：各搜索字段（遮蔽字段除外），正文只取开头 content_chars 个字符"""
+        schema = self.schema
+        parts = []
+        for field in schema.search_fields:
+            if field in schema.masked_fields:
+                continue
+            value = field_text(record, field) if field == schema.content_field else record.get(field)
+            if not value:
+                continue
+            if isinstance(value, str):
+                parts.append(value[:content_chars] if field == schema.content_field else value)
+            else:
+                parts.extend(str(item) for item in value)
+        return "\n".join(parts)
+
+    def find_duplicate(self, text) -> Optional[Dict]:
+        """正文（content_field）规范化后与 text 完全相同的已有记录，没有时返回 None"""
+        record_id = self._lazy_index("_hash_index", ContentHashIndex).find(text)
+        return self.records.get(record_id) if record_id is not None else None
+
+    def find_similar(self, text, threshold: float = DEFAULT_THRESHOLD, limit: int = 20,
+                     exclude: Optional[str] = None) -> List[Tuple[Dict, float]]:
+        """正文与 text 近似重复（MinHash 估计的相似度 ≥ threshold）的记录，按相似度从高到低"""
+        similar_index = self._lazy_index("_similar_index", MinHashIndex)
+        records = self.records
+        return [(records.get(record_id), score)
+                for record_id, score in similar_index.query(text, threshold, limit, exclude)]
+
+    def similar_clusters(self, threshold: float = DEFAULT_THRESHOLD,
+                         progress: Optional[Callable[[int, int], Optional[bool]]] = None
+                         ) -> Optional[List[List[Tuple[Dict, float]]]]:
+        """整个分区中互相近似重复的记录组（每组两条以上），大组在前。每组第一条是使用次数最多的记录
+        （建议保留的一条），各条带着与它的估计相似度：组是按相似关系传递归并的，低于 threshold 的
+        只是间接相连，不算它的重复。
+        第一次调用需要为全部正文计算签名，期间定期回调 progress(已处理, 总数)，返回 False 时取消并返回 None"""
+        similar_index = self._lazy_index("_similar_index", MinHashIndex, progress=progress)
+        if similar_index is None:
+            return None
+        records = self.records
+        groups = []
+        for ids in similar_index.clusters(threshold):
+            members = records.get_many(ids)
+            keep = max(members, key=lambda r: r.get("usage_count", 0))
+            groups.append([(keep, 1.0)] + [(record, similar_index.pair_similarity(keep["id"], record["id"]))
+                                           for record in members if record is not keep])
+        return groups
+
+    def all(self) -> List[Dict]:
+        return self.records.values()
+
+    def increment_usage(self, record_id: str):
+        # 使用次数不参与匹配，不影响数据版本号，只影响相关度排序
+        record = self.records.get(record_id)
+        if record is not None:
+            record["usage_count"] = record.get("usage_count", 0) + 1
+            self._pending_usage.add(record_id)
+            self.usage_version += 1
+
+    def masked(self, record: Dict) -> Dict:
+        """显示用的副本，masked_fields 中的字段已遮蔽"""
+        data = dict(record)
+        for field in self.schema.masked_fields:
+            if field in data:
+                data[field] = mask_secret(data[field])
+        return data
+
+    # ==================== 统计 ====================
+
+    def field_values(self, field: str) -> List:
+        """建了二级索引的字段的所有非空取值（已排序）"""
+        return sorted(key for key in self._load()[1][field].counts() if key)
+
+    def category_stats(self) -> Dict[str, int]:
+        stats = {}
+        for category, count in self._load()[1]["category"].counts().items():
+            category = "未分类" if category is None else category
+            stats[category] = stats.get(category, 0) + count
+        return stats
+
+    def top(self, limit: int = 5) -> List[Dict]:
+        """使用次数最多的记录（并列时保持插入顺序）"""
+        return heapq.nlargest(limit, self.records, key=lambda r: r.get("usage_count", 0))
+
+    # ==================== 搜索 ====================
+
+    def search(self, query: str, category: Optional[str] = None, ranked: bool = False,
+               limit: Optional[int] = None) -> List[Dict]:
+        """子串搜索；ranked 为 True 且有查询词时按相关度排序（见 ranking.rank），否则保持存储顺序。
+        limit 只取前若干条（排序时用堆选择，不对全部命中排序）。
+        以 FUZZY_PREFIX 开头的查询改走容错搜索（fuzzy_search），以 SEMANTIC_PREFIX 开头的改走语义搜索
+        （semantic_search）"""
+        if query.startswith(SEMANTIC_PREFIX):
+            return self.semantic_search(query[len(SEMANTIC_PREFIX):], category,
+                                        limit=SEMANTIC_RESULTS if limit is None else limit)
+        if query.startswith(FUZZY_PREFIX):
+            # 容错结果按相似度排列，默认只取前 MAX_RESULTS 条
+            return self.fuzzy_search(query[len(FUZZY_PREFIX):], category,
+                                     limit=MAX_RESULTS if limit is None else limit)
+        results = self._match(query, category)
+        if ranked and query:
+            needle = normalize_text(query)
+            if self.store.has_full_text_index():
+                relevance = self.store.relevance(needle, category, self.schema.rank_weights)
+                ranked_results = rank_by_relevance(results, relevance, limit)
+            else:
+                ranked_results = rank(self.index, results, needle, self.schema.rank_weights,
+                                      len(self.records), limit)
+            return [record for record, _ in ranked_results]
+        return results if limit is None else results[:limit]
+
+    def fuzzy_search(self, query: str, category: Optional[str] = None,
+                     threshold: float = MIN_SIMILARITY, limit: Optional[int] = MAX_RESULTS) -> List[Dict]:
+        """容错搜索：名称、分类、标签和正文开头与 query 的 trigram 相似度 ≥ threshold 的记录，
+        相似度高的在前（见 fuzzy_index）。索引在第一次输入前缀时开始在后台建立，
+        建好之前不等待，先返回子串搜索的结果（见 index_pending）"""
+        fuzzy_index = self._fuzzy_index
+        if fuzzy_index is None:
+            self._build_in_background("_fuzzy_index", TrigramIndex)
+        if fuzzy_index is None or not query.strip():
+            return self.search(query, category, limit=limit)
+        records = self.records
+        # 有分类筛选时先取全部命中再筛选，保证数量足够
+        hits = fuzzy_index.search(query, threshold, None if category else limit)
+        results = []
+        for record_id, _ in hits:
+            record = records.get(record_id)
+            if category and record.get("category") != category:
+                continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def index_pending(self, query: str) -> bool:
+        """query 要用的容错 / 语义索引是否还在后台建立（此时搜索返回的是临时结果）"""
+        if query.startswith(SEMANTIC_PREFIX) and semantic_available():
+            return self._semantic_index is None
+        return query.startswith((FUZZY_PREFIX, SEMANTIC_PREFIX)) and self._fuzzy_index is None
+
+    def search_version(self, query: str, ranked: bool) -> Tuple[int, int]:
+        """search(query, ranked=ranked) 的结果所依赖的版本：数据版本号，按相关度排序时再加上使用次数版本号
+        （空查询、容错搜索和语义搜索不看使用次数）。新近度加成随时间的缓慢变化不计入；
+        索引还在建立时的临时结果另记一个版本，索引建好后作废"""
+        if self.index_pending(query):
+            return self.version, -1
+        by_usage = ranked and query and not query.startswith((FUZZY_PREFIX, SEMANTIC_PREFIX))
+        return self.version, self.usage_version if by_usage else 0
+
+    def semantic_search(self, query: str, category: Optional[str] = None,
+                        limit: Optional[int] = SEMANTIC_RESULTS) -> List[Dict]:
+        """语义搜索：名称、分类、标签和正文开头与 query 的字符 n-gram TF-IDF 余弦相似度最高的记录，
+        相似度高的在前（见 semantic_index）。索引在第一次输入前缀时开始在后台建立，建好之前不等待，
+        先返回子串搜索的结果（见 index_pending）；numpy 不可用时改用容错搜索"""
+        if not semantic_available():
+            return self.fuzzy_search(query, category, limit=limit)
+        vector_index = self._semantic_index
+        if vector_index is None:
+            self._build_in_background("_semantic_index", self._new_semantic_index, self._fill_semantic_index)
+        if vector_index is None or not query.strip():
+            return self.search(query, category, limit=limit)
+        records = self.records
+        # 有分类筛选时先取全部命中再筛选，保证数量足够
+        hits = vector_index.search(query, None if category else limit)
+        results = []
+        for record_id, _ in hits:
+            record = records.get(record_id)
+            if category and record.get("category") != category:
+                continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def _match(self, query: str, category: Optional[str]) -> List[Dict]:
+        records, fields = self._load()
+        if not query:
+            if not category:
+                return records.values()
+            if "category" in fields:
+                return records.in_order(fields["category"].ids(category))
+            return [r for r in records if r.get("category") == category]
+
+        needle = normalize_text(query)
+        # 存储引擎自带全文索引时直接用索引结果（全文索引的内容与查询经过同样的规范化），不建 SearchIndex
+        hit_ids = self.store.search_ids(needle, category)
+        if hit_ids is not None:
+            return self._with_pinyin(needle, category, [records.get(i) for i in hit_ids if i in records])
+
+        index = self.index
+
+        # 候选来源：输入过程中上一次查询的结果（只会更少），或倒排索引
+        cached_ids = self._search_cache.lookup(self.version, needle, category)
+        if cached_ids is not None and len(cached_ids) <= 1000:
+            pool = [records.get(i) for i in cached_ids]
+        else:
+            candidate_ids = index.candidates(needle)
+            if cached_ids is not None and (candidate_ids is None or len(cached_ids) < len(candidate_ids)):
+                pool = [records.get(i) for i in cached_ids]
+            elif candidate_ids is not None:
+                pool = records.in_order(candidate_ids)
+            else:
+                pool = records
+
+        # 每条记录与缓存的规范化文本做一次子串判断
+        results = []
+        for record in pool:
+            if category and record.get("category") != category:
+                continue
+            if index.matches(record["id"], needle):
+                results.append(record)
+        self._search_cache.store(self.version, needle, category, [r["id"] for r in results])
+        return self._with_pinyin(needle, category, results)
+
+    def _pinyin_ids(self, needle: str) -> List[str]:
+        """拼音能从音节开头拼出 needle 的记录 id；存储引擎自带全文索引时用单独的拼音索引"""
+        query = needle.replace(" ", "")
+        if not self.schema.pinyin_fields or not is_pinyin_query(query):
+            return []
+        if self.store.has_full_text_index():
+            return self._lazy_index("_pinyin_index", PinyinIndex).search(query)
+        return self.index.pinyin_ids(needle)
+
+    def _with_pinyin(self, needle: str, category: Optional[str], results: List[Dict]) -> List[Dict]:
+        """并入拼音命中，按存储顺序排列。拼音只从音节开头匹配，不满足子串语义（"xiez" 命中时
+        "iez" 不一定命中），所以不进全文索引，也不经过 NarrowingCache"""
+        records = self.records
+        pinyin_ids = [i for i in self._pinyin_ids(needle)
+                      if not category or records.get(i).get("category") == category]
+        if not pinyin_ids:
+            return results
+        return records.in_order({r["id"] for r in results}.union(pinyin_ids))
+
+    # ==================== 持久化 ====================
+
+    def save(self):
+        self.store.save(self.records)
+
+    def flush_usage(self):
+        """把累积的使用次数写入存储引擎（每条记录一次 patch，json 模式下合并为一次写文件）"""
+        if not self._pending_usage:
+            return
+        pending, self._pending_usage = self._pending_usage, set()
+        records = self.records
+        for record_id in pending:
+            record = records.get(record_id)
+            if record is not None:
+                self.store.patch(records, record_id, {"usage_count": record.get("usage_count", 0)})
+
+    def compact(self) -> bool:
+        """把日志合入快照、清理外置正文文件；没加载过的分区没有新变更，跳过。
+        返回 True 时有效正文已写入新文件、引用它的 JSON 也已同步写出，可以调用 contents.remove_stale()"""
+        if self._loaded is None:
+            return False
+        if self._semantic_index is not None:
+            self._semantic_index.save()
+        records = self._loaded[0]
+        if self.contents is not None and self.contents.compact(records):
+            # 引用已指向新文件：JSON 确认写出后才能删除旧文件，写失败时旧文件原样保留
+            try:
+                self.store.save_now(records)
+            except Exception as e:
+                print(f"Error saving {self.name} after blob compaction: {e}")
+                return False
+            return True
+        self.store.compact(records)
+        return False
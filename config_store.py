@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Dict, Callable, Optional
+
+from storage import write_json_atomic, WriteBehindWriter
+
+
+class ConfigStore(dict):
+    """内存中的配置，修改后自动防抖写盘
+
+    用法与普通 dict 相同：config[key] = value 即可，无需再调用 save_config()。
+    窗口拖动、调整大小这类连续事件只会在停止后写一次 config.json；
+    值没有变化时既不通知也不写盘。subscribe() 注册的回调在值变化时被调用。
+    """
+
+    def __init__(self, path: Path, values: Dict, writer: WriteBehindWriter, delay: float = 1.0):
+        super().__init__(values)
+        self.path = path
+        self.writer = writer
+        self.delay = delay
+        self._subscribers = []  # (key 或 None, 回调)
+
+    def subscribe(self, callback: Callable, key: Optional[str] = None):
+        """注册变更回调 callback(key, value)；指定 key 时只关心该项"""
+        self._subscribers.append((key, callback))
+
+    def unsubscribe(self, callback: Callable):
+        self._subscribers = [(k, cb) for k, cb in self._subscribers if cb != callback]
+
+    def __setitem__(self, key, value):
+        if key in self and self[key] == value:
+            return
+        super().__setitem__(key, value)
+        self._changed(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed(key, None)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def _changed(self, key, value):
+        for wanted, callback in list(self._subscribers):
+            if wanted is None or wanted == key:
+                try:
+                    callback(key, value)
+                except Exception as e:
+                    print(f"Config hook error: {e}")
+        self.save()
+
+    def save(self):
+        """安排一次防抖写盘（后台线程取快照，临时文件 + rename）"""
+        self.writer.schedule(str(self.path), lambda: write_json_atomic(self.path, dict(self)),
+                             delay=self.delay, debounce=True)
@@ -0,0 +1,366 @@
+import base64
+import mmap
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 正文超过这个字符数才移到外置文件，短正文留在 JSON 里
+BLOB_THRESHOLD = 4096
+# 正文超过这个字符数才压缩；压缩后不到原来 90% 的不值得
+COMPRESS_THRESHOLD = 1024
+_COMPRESS_MIN_SAVING = 0.9
+# 外置文件里失效的正文超过有效正文且超过这个字节数时才压缩
+_COMPACT_MIN_BYTES = 1024 * 1024
+
+
+# ==================== 压缩 ====================
+
+def codec_available(codec: str) -> bool:
+    return codec == "" or codec == "zlib" or (codec == "zstd" and zstandard is not None)
+
+
+def resolve_codec(name: Optional[str]) -> str:
+    """配置里的压缩方式 → 实际可用的编码；zstd 不可用时退回 zlib"""
+    if not name:
+        return ""
+    if name == "zstd" and zstandard is None:
+        print("zstandard 未安装，正文压缩改用 zlib")
+        return "zlib"
+    return name if name in ("zlib", "zstd") else "zlib"
+
+
+def compress_text(text: str, codec: str) -> bytes:
+    data = text.encode('utf-8')
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress_text(data: bytes, codec: str) -> str:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return zlib.decompress(data).decode('utf-8')
+
+
+class TextCache:
+    """按字符总数限制大小的文本 LRU 缓存（键为正文对象本身）
+
+    解压结果放在这里，滚动列表、反复预览时不必重复解压；搜索索引也用它缓存规范化后的正文。
+    """
+
+    def __init__(self, max_chars: int = 8 * 1024 * 1024):
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[object, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text: str):
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= len(old)
+            self._entries[key] = text
+            self._chars += len(text)
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+inflate_cache = TextCache()
+
+
+class CompressedContent:
+    """留在内存（和 JSON）里的压缩正文，读取时解压并放入 LRU 缓存"""
+
+    __slots__ = ("codec", "data")
+
+    def __init__(self, codec: str, data: bytes):
+        self.codec = codec
+        self.data = data
+
+    @classmethod
+    def pack(cls, text: str, codec: str) -> Optional["CompressedContent"]:
+        """压缩收益不足时返回 None"""
+        data = compress_text(text, codec)
+        if len(data) > len(text.encode('utf-8')) * _COMPRESS_MIN_SAVING:
+            return None
+        return cls(codec, data)
+
+    def load(self, cache: bool = True) -> str:
+        """cache=False 用于一次性的整体读取（如建索引），不挤占缓存"""
+        text = inflate_cache.get(self)
+        if text is None:
+            try:
+                text = decompress_text(self.data, self.codec)
+            except Exception as e:
+                print(f"Error decompressing content: {e}")
+                return ""
+            if cache:
+                inflate_cache.put(self, text)
+        return text
+
+    def ref(self) -> list:
+        """写入 JSON 的形式：content_z = [编码, base64]"""
+        return [self.codec, base64.b64encode(self.data).decode('ascii')]
+
+
+class LazyContent:
+    """外置正文的引用：只保存 (文件代号, 偏移, 长度[, 编码])，读取时才从 mmap 取出"""
+
+    __slots__ = ("blobs", "gen", "offset", "length", "codec")
+
+    def __init__(self, blobs: "ContentStore", gen: int, offset: int, length: int, codec: str = ""):
+        self.blobs = blobs
+        self.gen = gen
+        self.offset = offset
+        self.length = length
+        self.codec = codec
+
+    def load(self, cache: bool = True) -> str:
+        """外置文件缺失或损坏时提示并返回空串（与压缩正文解压失败时一样）"""
+        if not self.codec:
+            try:
+                return self.blobs.read(self.gen, self.offset, self.length).decode('utf-8')
+            except Exception as e:
+                print(f"Error reading content: {e}")
+                return ""
+        text = inflate_cache.get(self)
+        if text is None:
+            try:
+                text = decompress_text(self.blobs.read(self.gen, self.offset, self.length), self.codec)
+            except Exception as e:
+                print(f"Error decompressing content: {e}")
+                return ""
+            if cache:
+                inflate_cache.put(self, text)
+        return text
+
+    def ref(self) -> list:
+        """写入 JSON 的形式：content_ref = [代号, 偏移, 字节数(, 编码)]"""
+        if self.codec:
+            return [self.gen, self.offset, self.length, self.codec]
+        return [self.gen, self.offset, self.length]
+
+
+# 记录里可以代替正文字符串的对象，写文件时分别以 content_z / content_ref 保存
+STORAGE_SUFFIXES = {CompressedContent: "_z", LazyContent: "_ref"}
+
+
+class ContentStore:
+    """一个分区的正文存放方式：外置文件 <label>.<代号>.blob 和/或压缩
+
+    外置文件只追加写入，记录里保存偏移和长度；读取用 mmap，按需解码。
+    修改、删除留下的失效正文在压缩时清理：有效正文写入下一代文件并原地更新所有引用，
+    等引用新文件的 JSON 落盘后才删除旧文件，任何时刻崩溃都不会丢失正文。
+    """
+
+    def __init__(self, data_dir: Path, label: str, externalize: bool, codec: str = "",
+                 threshold: int = BLOB_THRESHOLD):
+        self.data_dir = data_dir
+        self.label = label
+        self.externalize = externalize
+        self.codec = codec
+        self.threshold = threshold
+        self.gen = 0
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._unsynced: Set[int] = set()  # 追加过、尚未 fsync 的文件代号
+        self._lock = threading.Lock()
+        self._name_re = re.compile(re.escape(label) + r"\.(\d+)\.blob")
+
+    def _path(self, gen: int) -> Path:
+        return self.data_dir / f"{self.label}.{gen}.blob"
+
+    def _existing_gens(self):
+        gens = []
+        for path in self.data_dir.glob(f"{self.label}.*.blob"):
+            match = self._name_re.fullmatch(path.name)
+            if match:
+                gens.append(int(match.group(1)))
+        return gens
+
+    # ==================== 读写 ====================
+
+    def read(self, gen: int, offset: int, length: int) -> bytes:
+        with self._lock:
+            mapped = self._maps.get(gen)
+            if mapped is None or offset + length > len(mapped):
+                # 文件追加后需要重新映射
+                if mapped is not None:
+                    mapped.close()
+                with open(self._path(gen), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[gen] = mapped
+            if offset + length > len(mapped):
+                raise ValueError(f"{self._path(gen).name} is truncated")
+            return mapped[offset:offset + length]
+
+    def _append_bytes(self, data: bytes) -> int:
+        with self._lock:
+            with open(self._path(self.gen), 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            self._unsynced.add(self.gen)
+        return offset
+
+    def sync(self):
+        """把追加过的外置文件刷到磁盘；写引用这些正文的 JSON / 日志之前调用"""
+        with self._lock:
+            gens, self._unsynced = self._unsynced, set()
+            for gen in gens:
+                try:
+                    with open(self._path(gen), 'ab') as f:
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    print(f"Error syncing {self.label} blob file: {e}")
+
+    def append(self, text: str) -> LazyContent:
+        data = text.encode('utf-8')
+        codec = ""
+        if self.codec and len(text) > COMPRESS_THRESHOLD:
+            packed = compress_text(text, self.codec)
+            if len(packed) <= len(data) * _COMPRESS_MIN_SAVING:
+                data, codec = packed, self.codec
+        offset = self._append_bytes(data)
+        return LazyContent(self, self.gen, offset, len(data), codec)
+
+    # ==================== 与记录交互 ====================
+
+    def place(self, record) -> bool:
+        """按当前模式安排正文的存放形式（外置 / 压缩 / 原文），返回记录是否发生变化"""
+        current = record.external("content")
+        if current is not None:
+            if type(current) is LazyContent and self.externalize:
+                return False
+            if not codec_available(current.codec):
+                # 缺少解压模块时保持原样，避免把读不出的正文写坏
+                return False
+            if type(current) is CompressedContent and self.codec:
+                if not self.externalize:
+                    return False
+                # 两种模式同时开启时，只有够长的压缩正文需要移到外置文件
+                text = decompress_text(current.data, current.codec)
+                if len(text) <= self.threshold:
+                    return False
+            else:
+                text = current.load()
+            # 模式变化：先还原成原文再重新安排
+            record["content"] = text
+            self.place(record)
+            return True
+
+        content = record.get("content")
+        if not isinstance(content, str):
+            return False
+        if self.externalize and len(content) > self.threshold:
+            record["content"] = self.append(content)
+            return True
+        if self.codec and len(content) > COMPRESS_THRESHOLD:
+            packed = CompressedContent.pack(content, self.codec)
+            if packed is not None:
+                record["content"] = packed
+                return True
+        return False
+
+    def attach_all(self, records) -> bool:
+        """加载后处理：把 content_ref / content_z 换回正文对象，按当前模式重新安排，
+        清理压缩后遗留的旧文件；返回是否有记录需要重新保存"""
+        changed = False
+        for record in records:
+            ref = record.pop("content_ref", None)
+            packed = record.pop("content_z", None)
+            try:
+                if ref is not None:
+                    gen, offset, length, *codec = ref
+                    record["content"] = LazyContent(self, gen, offset, length, codec[0] if codec else "")
+                elif packed is not None:
+                    codec, data = packed
+                    record["content"] = CompressedContent(codec, base64.b64decode(data))
+            except (TypeError, ValueError):
+                print(f"Invalid stored content in {self.label}: {ref or packed}")
+                # 原样保留，避免下次保存时丢失
+                if ref is not None:
+                    record["content_ref"] = ref
+                if packed is not None:
+                    record["content_z"] = packed
+                continue
+            if self.place(record):
+                changed = True
+        # 以处理后实际仍在引用的文件为准
+        gens = [lazy.gen for lazy in map(self._external_content, records) if lazy is not None]
+        if gens:
+            self.gen = max(gens)
+            # 只删除比当前引用更旧的文件（压缩完成但上次没来得及删除的）；
+            # JSON 读取失败时没有任何引用，此时什么都不删
+            self.remove_stale()
+        elif len(records) > 0 and not changed:
+            # 正文已全部收回 JSON 并在上次保存过，旧的外置文件都不再需要
+            self.gen = max(self._existing_gens(), default=-1) + 1
+            self.remove_stale()
+        return changed
+
+    @staticmethod
+    def _external_content(record) -> Optional[LazyContent]:
+        lazy = record.external("content")
+        return lazy if type(lazy) is LazyContent else None
+
+    def remove_stale(self):
+        """删除当前代之前的文件（确认引用新文件的 JSON 已经落盘后才能调用）"""
+        with self._lock:
+            for gen in self._existing_gens():
+                if gen >= self.gen:
+                    continue
+                mapped = self._maps.pop(gen, None)
+                if mapped is not None:
+                    mapped.close()
+                try:
+                    os.remove(self._path(gen))
+                except OSError as e:
+                    print(f"Error removing {self.label} blob file: {e}")
+
+    def compact(self, records) -> bool:
+        """失效正文过多时把有效正文写入下一代文件并原地更新引用；
+        返回 True 时调用方需保存 JSON，落盘后再调用 remove_stale()"""
+        live = [lazy for lazy in map(self._external_content, records) if lazy is not None]
+        live_bytes = sum(lazy.length for lazy in live)
+        total_bytes = 0
+        for gen in self._existing_gens():
+            total_bytes += self._path(gen).stat().st_size
+        if total_bytes - live_bytes <= max(live_bytes, _COMPACT_MIN_BYTES):
+            return False
+
+        new_gen = max(self._existing_gens(), default=self.gen) + 1
+        with open(self._path(new_gen), 'wb') as f:
+            offset = 0
+            for lazy in live:
+                # 原样复制字节（压缩过的保持压缩）
+                data = self.read(lazy.gen, lazy.offset, lazy.length)
+                f.write(data)
+                lazy.gen, lazy.offset = new_gen, offset
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.gen = new_gen
+        return True
@@ -1,80 +1,159 @@
+import atexit
 import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from collection import Collection, Schema, generate_id
+from config_store import ConfigStore
+from content_store import ContentStore, resolve_codec
+from exporter import export_file
+from importer import import_file
+from minhash import DEFAULT_THRESHOLD
+from record import PromptRecord, ApiKeyRecord
+from record_table import RecordTable
+from search_index import SearchIndex, QueryCache
+from storage import create_store, WriteBehindWriter
+
 
 class PromptManager:
-    def __init__(self):
-        self.data_dir = Path.home() / ".prompt_manager"
+    """三个分区的门面：增删改查、搜索、统计都由各自的 Collection 完成，
+    这里只负责创建存储引擎并保留界面代码使用的方法名"""
+    
+    SCHEMAS = (
+        Schema("prompts", PromptRecord, ("name", "category", "content", "tags"),
+               indexes=("category", "tags"), external_content=True),
+        Schema("api_docs", PromptRecord, ("name", "category", "content", "tags"),
+               indexes=("category", "tags"), external_content=True),
+        Schema("api_keys", ApiKeyRecord, ("name", "category", "key"),
+               masked_fields=("key",), content_field="key"),
+    )
+    
+    def __init__(self, data_dir: Optional[Path] = None):
+        self.data_dir = Path(data_dir) if data_dir else Path.home() / ".prompt_manager"
         self.data_file = self.data_dir / "prompts.json"
         self.api_docs_file = self.data_dir / "api_docs.json"
         self.api_keys_file = self.data_dir / "api_keys.json"
         self.config_file = self.data_dir / "config.json"
         self._ensure_data_dir()
-        self.prompts = self._load_prompts()
-        self.api_docs = self._load_api_docs()
-        self.api_keys = self._load_api_keys()
-        self.config = self._load_config()
+        # 写文件交给后台线程：同一文件短时间内的多次修改合并为一次写入，GUI 线程不等磁盘
+        self.writer = WriteBehindWriter()
+        # 配置修改后自动防抖写盘，界面代码只需赋值
+        self.config = ConfigStore(self.config_file, self._load_config(), self.writer)
+        # 存储引擎：json 为整文件重写，journal 为追加日志 + 定期压缩，sqlite 为数据库 + FTS5 索引；
+        # json / journal 模式下每个 JSON 旁另有二进制快照缓存（.snap），启动时优先读取
+        storage_mode = self.config.get("storage_mode", "json")
+        # content_storage 为 blob 时长正文存到单独的 .blob 文件，内存里只留引用；
+        # content_compression 为 zlib / zstd 时较长的正文压缩保存（sqlite 模式正文本就在数据库里）
+        externalize = self.config.get("content_storage", "inline") == "blob" and storage_mode != "sqlite"
+        codec = resolve_codec(self.config.get("content_compression")) if storage_mode != "sqlite" else ""
+        # 各分区在第一次访问时才读盘、建索引，启动耗时只取决于首屏显示的分区
+        self.collections: Dict[str, Collection] = {}
+        for schema in self.SCHEMAS:
+            store = create_store(storage_mode, self.data_dir / f"{schema.name}.json", schema.name,
+                                 content_field=schema.content_field, writer=self.writer,
+                                 record_type=schema.record_type)
+            contents = None
+            if schema.external_content:
+                contents = ContentStore(self.data_dir, schema.name, externalize, codec)
+            self.collections[schema.name] = Collection(schema, store, contents)
+        self.prompt_store = self.collections["prompts"].store
+        self.api_doc_store = self.collections["api_docs"].store
+        self.api_key_store = self.collections["api_keys"].store
+        # 搜索结果缓存：复制、编辑、删除后界面会用同一查询刷新列表，数据没变的分区直接取缓存
+        self.query_cache = QueryCache(self.config.get("query_cache_size", 64))
+        atexit.register(self.flush)
     
     def _ensure_data_dir(self):
         self.data_dir.mkdir(exist_ok=True)
     
-    def _load_prompts(self) -> List[Dict]:
-        if self.data_file.exists():
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # 确保返回的是列表
-                    if isinstance(data, list):
-                        return data
-                    else:
-                        return []
-            except Exception as e:
-                print(f"Error loading prompts: {e}")
-                return []
-        return []
-    
-    def _save_prompts(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.prompts, f, ensure_ascii=False, indent=2)
-    
-    def _load_api_docs(self) -> List[Dict]:
-        if self.api_docs_file.exists():
-            try:
-                with open(self.api_docs_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        return data
-                    else:
-                        return []
-            except Exception as e:
-                print(f"Error loading api_docs: {e}")
-                return []
-        return []
-    
-    def _save_api_docs(self):
-        with open(self.api_docs_file, 'w', encoding='utf-8') as f:
-            json.dump(self.api_docs, f, ensure_ascii=False, indent=2)
-    
-    def _load_api_keys(self) -> List[Dict]:
-        if self.api_keys_file.exists():
-            try:
-                with open(self.api_keys_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        return data
-                    else:
-                        return []
-            except Exception as e:
-                print(f"Error loading api_keys: {e}")
-                return []
-        return []
-    
-    def _save_api_keys(self):
-        with open(self.api_keys_file, 'w', encoding='utf-8') as f:
-            json.dump(self.api_keys, f, ensure_ascii=False, indent=2)
+    @property
+    def prompts(self) -> RecordTable:
+        return self.collections["prompts"].records
+    
+    @property
+    def api_docs(self) -> RecordTable:
+        return self.collections["api_docs"].records
+    
+    @property
+    def api_keys(self) -> RecordTable:
+        return self.collections["api_keys"].records
+    
+    @property
+    def prompt_index(self) -> SearchIndex:
+        return self.collections["prompts"].index
+    
+    @property
+    def api_doc_index(self) -> SearchIndex:
+        return self.collections["api_docs"].index
+    
+    @property
+    def api_key_index(self) -> SearchIndex:
+        return self.collections["api_keys"].index
+    
+    def is_loaded(self, name: str) -> bool:
+        return self.collections[name].is_loaded
+    
+    def prefetch(self, names: Optional[List[str]] = None) -> Optional[threading.Thread]:
+        """在后台线程中加载分区并建立搜索索引（界面空闲后调用），之后切换分区、第一次搜索都不再卡顿"""
+        pending = [name for name in (names or self.collections) if not self.collections[name].indexes_ready]
+        if not pending:
+            return None
+        
+        def load_all():
+            for name in pending:
+                try:
+                    self.collections[name].build_indexes()
+                except Exception as e:
+                    print(f"Error prefetching {name}: {e}")
+        
+        thread = threading.Thread(target=load_all, name="prompt-manager-prefetch", daemon=True)
+        thread.start()
+        return thread
+    
+    def compact_storage(self):
+        """把日志合入快照、清理外置正文文件（退出时调用）"""
+        # 先写完排队中的任务，压缩时的同步写入不会与后台写线程争用同一个文件；
+        # compact 返回 True 时引用新文件的 JSON 已同步写出，旧的外置文件可以删除
+        self.writer.flush()
+        for collection in self.collections.values():
+            if collection.compact():
+                collection.contents.remove_stale()
+    
+    def flush_usage(self):
+        """把累积的使用次数写入存储引擎"""
+        for collection in self.collections.values():
+            collection.flush_usage()
+    
+    def flush(self):
+        """写出累积的使用次数并等待所有排队中的写入落盘（退出前调用）"""
+        self.flush_usage()
+        self.writer.flush()
+    
+    # ==================== 批量操作（三个分区通用） ====================
+    
+    def add_many(self, collection: str, items: List[Dict]) -> List[Dict]:
+        """批量新增（每项为 name / category / tags / content 等字段），只写一次盘"""
+        return self.collections[collection].add_many(items)
+    
+    def update_many(self, collection: str, changes: Dict[str, Dict]) -> int:
+        """批量修改：changes 为 id → 要修改的字段，返回实际修改的条数"""
+        return self.collections[collection].update_many(changes)
+    
+    def delete_many(self, collection: str, record_ids: List[str]) -> int:
+        """批量删除，返回实际删除的条数"""
+        return self.collections[collection].delete_many(record_ids)
+    
+    def subscribe(self, callback, collection: Optional[str] = None):
+        """记录增删改后回调 callback(分区名, 变化的 id 列表)；不指定分区时订阅全部"""
+        for name in ([collection] if collection else self.collections):
+            self.collections[name].subscribe(callback)
+    
+    def unsubscribe(self, callback, collection: Optional[str] = None):
+        for name in ([collection] if collection else self.collections):
+            self.collections[name].unsubscribe(callback)
     
     def _load_config(self) -> Dict:
         default_config = {
@@ -86,7 +165,8 @@ class PromptManager:
             "window_position": None,
             "window_geometry": None,
             "first_run": True,
-            "gemini_api_key": ""
+            "gemini_api_key": "",
+            "storage_mode": "json"
         }
         if self.config_file.exists():
             try:
@@ -98,309 +178,197 @@ class PromptManager:
         return default_config
     
     def save_config(self):
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        """兼容旧调用：配置修改后已自动保存，这里只是再安排一次写盘"""
+        self.config.save()
+    
+    # ==================== Prompt 相关方法 ====================
+    
+    def search(self, collection: str, query: str, category: Optional[str] = None, ranked: bool = False,
+               limit: Optional[int] = None) -> List[Dict]:
+        """在指定分区中搜索；ranked=True 时按 BM25F 相关度 × 使用次数 × 新近度排序，
+        limit 给出时只返回得分最高的 limit 条。结果的 id 列表按分区的数据版本缓存（见 QueryCache）"""
+        target = self.collections[collection]
+        key = (collection, query, category, ranked, limit)
+        version = target.search_version(query, ranked)
+        ids = self.query_cache.lookup(key, version)
+        if ids is not None:
+            return target.records.get_many(ids)
+        results = target.search(query, category, ranked, limit)
+        self.query_cache.store(key, version, [r["id"] for r in results])
+        return results
+    
+    def get(self, collection: str, record_id: str) -> Optional[Dict]:
+        """指定分区中的一条记录，不存在时返回 None"""
+        return self.collections[collection].get(record_id)
+    
+    def categories(self, collection: str) -> List[str]:
+        """指定分区中用到的全部分类（已排序）"""
+        return self.collections[collection].field_values("category")
+    
+    def masked(self, collection: str, record: Dict) -> Dict:
+        """显示用的副本：分区 masked_fields 中的字段（如 API 密钥）已遮蔽，只显示前 4 位和后 4 位"""
+        return self.collections[collection].masked(record)
+    
+    def query_cache_stats(self) -> Dict[str, float]:
+        """搜索结果缓存的条目数、id 总数、命中 / 未命中 / 淘汰次数和命中率"""
+        return self.query_cache.stats()
+    
+    def find_duplicate(self, collection: str, content: str) -> Optional[Dict]:
+        """正文规范化（去首尾空白、合并连续空白）后与 content 相同的已有记录，O(1) 查找"""
+        return self.collections[collection].find_duplicate(content)
+    
+    def find_similar(self, collection: str, content: str, threshold: float = DEFAULT_THRESHOLD,
+                     limit: int = 20, exclude: Optional[str] = None) -> List[tuple]:
+        """正文与 content 近似重复的记录，返回 [(记录, 估计相似度)]，按相似度从高到低；
+        exclude 为要排除的记录 id（查某条记录自己的相似项时）"""
+        return self.collections[collection].find_similar(content, threshold, limit, exclude)
+    
+    def similar_clusters(self, collection: str, threshold: float = DEFAULT_THRESHOLD,
+                         progress=None) -> Optional[List[List[tuple]]]:
+        """分区内互相近似重复的记录组（每组两条以上），用于清理；每组为 [(记录, 与组内第一条的估计相似度)]，
+        第一条是建议保留的记录；
+        progress(已处理, 总数) 返回 False 时取消并返回 None，详见 Collection.similar_clusters"""
+        return self.collections[collection].similar_clusters(threshold, progress)
+    
+    def bump_duplicate(self, collection: str, content: str) -> Optional[Dict]:
+        """已有正文与 content 相同的记录时给它的使用次数 +1 并返回它，否则返回 None
+        （快速添加在调用 AI 分析之前先检查，重复内容不再新增）"""
+        target = self.collections[collection]
+        existing = target.find_duplicate(content)
+        if existing is not None:
+            target.increment_usage(existing["id"])
+        return existing
     
     def add_prompt(self, name: str, category: str, tags: List[str], content: str) -> Dict:
-        prompt = {
-            "id": self._generate_id(),
-            "name": name,
-            "category": category,
-            "tags": tags,
-            "content": content,
-            "usage_count": 0,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        self.prompts.append(prompt)
-        self._save_prompts()
-        return prompt
+        return self.collections["prompts"].add({"name": name, "category": category, "tags": tags, "content": content})
     
     def update_prompt(self, prompt_id: str, name: str, category: str, tags: List[str], content: str):
-        for prompt in self.prompts:
-            if prompt["id"] == prompt_id:
-                prompt["name"] = name
-                prompt["category"] = category
-                prompt["tags"] = tags
-                prompt["content"] = content
-                prompt["updated_at"] = datetime.now().isoformat()
-                self._save_prompts()
-                return True
-        return False
+        return self.collections["prompts"].update(
+            prompt_id, {"name": name, "category": category, "tags": tags, "content": content})
     
     def delete_prompt(self, prompt_id: str) -> bool:
-        original_len = len(self.prompts)
-        self.prompts = [p for p in self.prompts if p["id"] != prompt_id]
-        if len(self.prompts) < original_len:
-            self._save_prompts()
-            return True
-        return False
+        return self.collections["prompts"].delete(prompt_id)
     
     def get_prompt(self, prompt_id: str) -> Optional[Dict]:
-        for prompt in self.prompts:
-            if prompt["id"] == prompt_id:
-                return prompt
-        return None
+        return self.collections["prompts"].get(prompt_id)
     
     def increment_usage(self, prompt_id: str):
-        for prompt in self.prompts:
-            if prompt["id"] == prompt_id:
-                prompt["usage_count"] = prompt.get("usage_count", 0) + 1
-                self._save_prompts()
-                break
+        self.collections["prompts"].increment_usage(prompt_id)
     
     def get_all_prompts(self) -> List[Dict]:
-        return self.prompts
+        return self.collections["prompts"].all()
     
     def get_categories(self) -> List[str]:
-        categories = set()
-        for prompt in self.prompts:
-            if prompt.get("category"):
-                categories.add(prompt["category"])
-        return sorted(list(categories))
+        return self.collections["prompts"].field_values("category")
     
     def get_all_tags(self) -> List[str]:
-        tags = set()
-        for prompt in self.prompts:
-            for tag in prompt.get("tags", []):
-                tags.add(tag)
-        return sorted(list(tags))
-    
-    def search_prompts(self, query: str, category: Optional[str] = None) -> List[Dict]:
-        results = []
-        query_lower = query.lower()
-        
-        for prompt in self.prompts:
-            if category and prompt.get("category") != category:
-                continue
-            
-            if not query:
-                results.append(prompt)
-                continue
-            
-            if (query_lower in prompt["name"].lower() or
-                query_lower in prompt.get("category", "").lower() or
-                query_lower in prompt.get("content", "").lower() or
-                any(query_lower in tag.lower() for tag in prompt.get("tags", []))):
-                results.append(prompt)
-        
-        return results
+        return self.collections["prompts"].field_values("tags")
+    
+    def index_pending(self, collection: str, query: str) -> bool:
+        """query 要用的索引还在后台建立时为 True，界面稍后应重新搜索一次"""
+        return self.collections[collection].index_pending(query)
+    
+    def search_prompts(self, query: str, category: Optional[str] = None, ranked: bool = False,
+                       limit: Optional[int] = None) -> List[Dict]:
+        return self.search("prompts", query, category, ranked, limit)
     
     def get_category_stats(self) -> Dict[str, int]:
-        stats = {}
-        for prompt in self.prompts:
-            category = prompt.get("category", "未分类")
-            stats[category] = stats.get(category, 0) + 1
-        return stats
+        return self.collections["prompts"].category_stats()
     
     def get_top_prompts(self, limit: int = 5) -> List[Dict]:
-        sorted_prompts = sorted(self.prompts, key=lambda p: p.get("usage_count", 0), reverse=True)
-        return sorted_prompts[:limit]
+        return self.collections["prompts"].top(limit)
+    
+    def import_records(self, collection: str, file_path: str, progress=None) -> tuple[int, int]:
+        """把 JSON 数组或 NDJSON 文件流式导入到指定分区，返回 (新增数, 跳过数)；详见 importer.import_file"""
+        return import_file(self.collections[collection], file_path, progress)
     
     def import_prompts(self, file_path: str) -> tuple[int, int]:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                imported_prompts = json.load(f)
-            
-            if not isinstance(imported_prompts, list):
-                return 0, 0
-            
-            existing_names = {p["name"] for p in self.prompts}
-            added = 0
-            skipped = 0
-            
-            for prompt in imported_prompts:
-                if prompt.get("name") in existing_names:
-                    skipped += 1
-                    continue
-                
-                if "id" not in prompt:
-                    prompt["id"] = self._generate_id()
-                if "usage_count" not in prompt:
-                    prompt["usage_count"] = 0
-                if "created_at" not in prompt:
-                    prompt["created_at"] = datetime.now().isoformat()
-                if "updated_at" not in prompt:
-                    prompt["updated_at"] = datetime.now().isoformat()
-                
-                self.prompts.append(prompt)
-                added += 1
-            
-            if added > 0:
-                self._save_prompts()
-            
-            return added, skipped
+            return self.import_records("prompts", file_path)
         except Exception as e:
             print(f"Import error: {e}")
             return 0, 0
     
+    def export_records(self, collection: str, file_path: str, category: Optional[str] = None,
+                       tag: Optional[str] = None, updated_since: Optional[str] = None,
+                       incremental: bool = False, progress=None) -> int:
+        """把分区流式导出为 NDJSON / JSON 数组（.gz 结尾时压缩），返回导出条数；详见 exporter.export_file
+        
+        incremental=True 时只导出上次完整导出之后修改过的记录。水位是每个分区上次不带
+        分类 / 标签筛选的导出开始时间，保存在配置 export_watermarks 中。删除不会出现在增量导出里。
+        """
+        started = datetime.now().isoformat()
+        watermarks = self.config.get("export_watermarks") or {}
+        if incremental and watermarks.get(collection):
+            updated_since = max(updated_since or "", watermarks[collection])
+        count = export_file(self.collections[collection], file_path, category, tag, updated_since, progress)
+        if not category and not tag:
+            self.config["export_watermarks"] = {**watermarks, collection: started}
+        return count
+    
     def export_prompts(self, file_path: str) -> bool:
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.prompts, f, ensure_ascii=False, indent=2)
+            self.export_records("prompts", file_path)
             return True
         except Exception as e:
             print(f"Export error: {e}")
             return False
     
     def _generate_id(self) -> str:
-        import uuid
-        return str(uuid.uuid4())
+        return generate_id()
     
     # ==================== API 文档相关方法 ====================
     
     def add_api_doc(self, name: str, category: str, tags: List[str], content: str) -> Dict:
-        doc = {
-            "id": self._generate_id(),
-            "name": name,
-            "category": category,
-            "tags": tags,
-            "content": content,
-            "usage_count": 0,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        self.api_docs.append(doc)
-        self._save_api_docs()
-        return doc
+        return self.collections["api_docs"].add({"name": name, "category": category, "tags": tags, "content": content})
     
     def update_api_doc(self, doc_id: str, name: str, category: str, tags: List[str], content: str):
-        for doc in self.api_docs:
-            if doc["id"] == doc_id:
-                doc["name"] = name
-                doc["category"] = category
-                doc["tags"] = tags
-                doc["content"] = content
-                doc["updated_at"] = datetime.now().isoformat()
-                self._save_api_docs()
-                return True
-        return False
+        return self.collections["api_docs"].update(
+            doc_id, {"name": name, "category": category, "tags": tags, "content": content})
     
     def delete_api_doc(self, doc_id: str) -> bool:
-        original_len = len(self.api_docs)
-        self.api_docs = [d for d in self.api_docs if d["id"] != doc_id]
-        if len(self.api_docs) < original_len:
-            self._save_api_docs()
-            return True
-        return False
+        return self.collections["api_docs"].delete(doc_id)
     
     def get_api_doc(self, doc_id: str) -> Optional[Dict]:
-        for doc in self.api_docs:
-            if doc["id"] == doc_id:
-                return doc
-        return None
+        return self.collections["api_docs"].get(doc_id)
     
     def increment_api_doc_usage(self, doc_id: str):
-        for doc in self.api_docs:
-            if doc["id"] == doc_id:
-                doc["usage_count"] = doc.get("usage_count", 0) + 1
-                self._save_api_docs()
-                break
+        self.collections["api_docs"].increment_usage(doc_id)
     
     def get_all_api_docs(self) -> List[Dict]:
-        return self.api_docs
+        return self.collections["api_docs"].all()
     
     def get_api_doc_categories(self) -> List[str]:
-        categories = set()
-        for doc in self.api_docs:
-            if doc.get("category"):
-                categories.add(doc["category"])
-        return sorted(list(categories))
-    
-    def search_api_docs(self, query: str, category: Optional[str] = None) -> List[Dict]:
-        results = []
-        query_lower = query.lower()
-        
-        for doc in self.api_docs:
-            if category and doc.get("category") != category:
-                continue
-            
-            if not query:
-                results.append(doc)
-                continue
-            
-            if (query_lower in doc["name"].lower() or
-                query_lower in doc.get("category", "").lower() or
-                query_lower in doc.get("content", "").lower() or
-                any(query_lower in tag.lower() for tag in doc.get("tags", []))):
-                results.append(doc)
-        
-        return results
+        return self.collections["api_docs"].field_values("category")
+    
+    def search_api_docs(self, query: str, category: Optional[str] = None, ranked: bool = False,
+                        limit: Optional[int] = None) -> List[Dict]:
+        return self.search("api_docs", query, category, ranked, limit)
     
     # ==================== API 密钥相关方法 ====================
     
     def add_api_key(self, name: str, key: str, category: str = "") -> Dict:
         """添加 API 密钥（只需名称和密钥）"""
-        api_key = {
-            "id": self._generate_id(),
-            "name": name,
-            "key": key,
-            "category": category,
-            "usage_count": 0,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        self.api_keys.append(api_key)
-        self._save_api_keys()
-        return api_key
+        return self.collections["api_keys"].add({"name": name, "key": key, "category": category})
     
     def update_api_key(self, key_id: str, name: str, key: str, category: str = ""):
-        for api_key in self.api_keys:
-            if api_key["id"] == key_id:
-                api_key["name"] = name
-                api_key["key"] = key
-                api_key["category"] = category
-                api_key["updated_at"] = datetime.now().isoformat()
-                self._save_api_keys()
-                return True
-        return False
+        return self.collections["api_keys"].update(key_id, {"name": name, "key": key, "category": category})
     
     def delete_api_key(self, key_id: str) -> bool:
-        original_len = len(self.api_keys)
-        self.api_keys = [k for k in self.api_keys if k["id"] != key_id]
-        if len(self.api_keys) < original_len:
-            self._save_api_keys()
-            return True
-        return False
+        return self.collections["api_keys"].delete(key_id)
     
     def get_api_key(self, key_id: str) -> Optional[Dict]:
-        for api_key in self.api_keys:
-            if api_key["id"] == key_id:
-                return api_key
-        return None
+        return self.collections["api_keys"].get(key_id)
     
     def increment_api_key_usage(self, key_id: str):
-        for api_key in self.api_keys:
-            if api_key["id"] == key_id:
-                api_key["usage_count"] = api_key.get("usage_count", 0) + 1
-                self._save_api_keys()
-                break
+        self.collections["api_keys"].increment_usage(key_id)
     
     def get_all_api_keys(self) -> List[Dict]:
-        return self.api_keys
+        return self.collections["api_keys"].all()
     
     def get_api_key_categories(self) -> List[str]:
-        categories = set()
-        for api_key in self.api_keys:
-            if api_key.get("category"):
-                categories.add(api_key["category"])
-        return sorted(list(categories))
-    
-    def search_api_keys(self, query: str, category: Optional[str] = None) -> List[Dict]:
-        results = []
-        query_lower = query.lower()
-        
-        for api_key in self.api_keys:
-            if category and api_key.get("category") != category:
-                continue
-            
-            if not query:
-                results.append(api_key)
-                continue
-            
-            if (query_lower in api_key["name"].lower() or
-                query_lower in api_key.get("category", "").lower() or
-                query_lower in api_key.get("key", "").lower()):
-                results.append(api_key)
-        
-        return results
+        return self.collections["api_keys"].field_values("category")
+    
+    def search_api_keys(self, query: str, category: Optional[str] = None, ranked: bool = False,
+                        limit: Optional[int] = None) -> List[Dict]:
+        return self.search("api_keys", query, category, ranked, limit)
@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+from typing import Optional, Callable
+
+from collection import Collection
+
+# 每写出这么多条记录回调一次进度
+PROGRESS_EVERY = 500
+
+
+class ExportCancelled(Exception):
+    """进度回调返回 False 时抛出，目标文件保持不变"""
+
+
+def _open_output(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    return open(path, 'w', encoding='utf-8')
+
+
+def export_file(collection: Collection, file_path: str, category: Optional[str] = None,
+                tag: Optional[str] = None, updated_since: Optional[str] = None,
+                progress: Optional[Callable[[int, int], Optional[bool]]] = None) -> int:
+    """把 collection 中符合条件的记录流式写出，返回写出的条数
+
+    - 文件名以 .json / .json.gz 结尾时写成 JSON 数组，其余（.ndjson、.jsonl 等）每行一条记录
+    - 以 .gz 结尾时 gzip 压缩
+    - category / tag 只导出该分类 / 带该标签的记录；updated_since（ISO 时间字符串）只导出
+      updated_at 比它新的记录（增量导出）
+    - 逐条序列化、逐条写出，不在内存中另建一份完整数据；先写临时文件，完成后才替换目标文件
+    - progress(已处理条数, 总条数) 定期回调，返回 False 时取消并抛出 ExportCancelled
+    """
+    records = collection.records
+    total = len(records)
+    as_array = file_path.endswith((".json", ".json.gz"))
+    tmp_path = file_path + ".tmp"
+    written = 0
+    try:
+        with _open_output(tmp_path, file_path.endswith(".gz")) as f:
+            if as_array:
+                f.write("[")
+            for done, record in enumerate(records, 1):
+                if progress is not None and done % PROGRESS_EVERY == 0:
+                    if progress(done, total) is False:
+                        raise ExportCancelled()
+                if category and record.get("category") != category:
+                    continue
+                if tag and tag not in record.get("tags", ()):
+                    continue
+                if updated_since and not str(record.get("updated_at", "")) > updated_since:
+                    continue
+                line = json.dumps(record.to_dict(), ensure_ascii=False)
+                if as_array:
+                    f.write(",\n" if written else "\n")
+                    f.write(line)
+                else:
+                    f.write(line)
+                    f.write("\n")
+                written += 1
+            if as_array:
+                f.write("\n]\n")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if progress is not None:
+        progress(total, total)
+    return written
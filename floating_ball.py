@@ -39,6 +39,9 @@ class FloatingBall(QWidget):
         self.load_position()
         self.start_pulse_animation()
         
+        # 风格设置变化时同步重绘
+        self.data_manager.config.subscribe(lambda key, value: self.set_style(value), "ui_style")
+        
     def init_ui(self):
         """初始化UI"""
         # 设置窗口属性 - 与主窗口相同的配置，确保真正的始终置顶
@@ -314,8 +317,8 @@ class FloatingBall(QWidget):
     def save_position(self):
         """保存位置到配置"""
         pos = self.pos()
+        # 配置会在拖动结束后防抖写盘，这里只改内存
         self.data_manager.config["floating_ball_position"] = [pos.x(), pos.y()]
-        self.data_manager.save_config()
         print(f"💾 浮动球位置已保存: ({pos.x()}, {pos.y()})")
     
     def load_position(self):
@@ -0,0 +1,191 @@
+import math
+import re
+from array import array
+from collections import defaultdict, deque
+from itertools import repeat
+from typing import List, Dict, Optional, Tuple
+
+from search_index import normalize_text
+
+# 容错搜索：字符三元组（trigram）倒排索引
+#
+# 文本按词切开（中日韩文字连续成段，与英文词一样处理），每个词前后各补两个空格后
+# 取所有相邻三个字符，得到 trigram 集合。拼写错误只破坏错字附近的几个 trigram，
+# 词序不同也不影响集合，因此以“查询的 trigram 中有多大比例出现在记录里”作为相似度：
+#   相似度 = |Q ∩ D| / |Q|
+# 达到阈值的记录按相似度从高到低返回，最多 limit 条。
+#
+# 计数用位图完成，结果与逐条计算相似度完全一致：记录序号 i 对应整数的第 i 位，
+# 查询的每个 trigram 的 posting 转成一个位图（Python 的大整数），按位分片累加：
+# planes[j] 的第 i 位是记录 i 命中个数的二进制第 j 位，加一个位图只需几次整数的与 / 异或。
+# 然后从最高命中个数往下，用各 plane 拼出“命中恰好 c 个”的位图，依次取出序号，凑够 limit 条为止。
+# 5 万条记录时一个位图只有 6 KB，一次运算不到一微秒，常见片段组成的短查询也不必逐条计数。
+# 较长的 posting 缓存位图（不比 posting 本身占内存），新增记录后只补上追加的序号。
+#
+# 每条记录编一个递增的序号，posting 是序号的 array('I')，天然有序，5 万条记录也只占几十 MB。
+# 修改或删除时旧序号作废，不从 posting 中立即删除；作废的条目多于有效条目时整体清理一次。
+# 正文只取开头 CONTENT_CHARS 个字符参与索引。
+
+CONTENT_CHARS = 128
+MIN_SIMILARITY = 0.5
+MAX_RESULTS = 100
+# posting 条目数 × 这个倍数不小于记录数时缓存其位图（位图每条记录 1 位，posting 每条目 32 位）
+BITMAP_RATIO = 32
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _bitmap(ordinals, size: int) -> int:
+    """序号 → 位图（第 i 位对应序号 i）；序号多时先拼出二进制串再一次解析"""
+    if len(ordinals) < 64:
+        bitmap = 0
+        for ordinal in ordinals:
+            bitmap |= 1 << ordinal
+        return bitmap
+    digits = bytearray(b"0") * size
+    deque(map(digits.__setitem__, ordinals, repeat(ord("1"))), maxlen=0)
+    return int(digits[::-1], 2)
+
+
+def _set_bits(bitmap: int, limit: Optional[int] = None) -> List[int]:
+    """位图中置位的序号，从小到大，最多 limit 个"""
+    digits = bin(bitmap)[:1:-1]
+    ordinals = []
+    i = digits.find("1")
+    while i >= 0 and (limit is None or len(ordinals) < limit):
+        ordinals.append(i)
+        i = digits.find("1", i + 1)
+    return ordinals
+
+
+def trigrams(text: str) -> set:
+    """文本（需先经过 normalize_text）的 trigram 集合"""
+    words = _WORD_RE.findall(text)
+    if not words:
+        return set()
+    # 各词补齐空格后首尾相接，一次切出所有 trigram；词与词之间只多出一个全是空格的 trigram
+    padded = "  " + "   ".join(words) + "  "
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    grams.discard("   ")
+    return grams
+
+
+class TrigramIndex:
+    """trigram → 记录序号，随增删改增量维护"""
+
+    def __init__(self):
+        self._postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        self._ordinals: Dict[str, int] = {}  # id → 当前序号
+        self._ids: List[Optional[str]] = []  # 序号 → id，作废的序号为 None
+        self._dead = 0  # posting 中作废条目的数量
+        self._retired = set()  # 作废的序号
+        self._retired_mask = (0, 0)  # (作废序号数, 作废序号的位图)
+        self._bitmaps: Dict[str, Tuple[int, int]] = {}  # trigram → (位图包含的 posting 条目数, 位图)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, record_id: str, text: str):
+        if record_id in self._ordinals:
+            self.remove(record_id)
+        grams = trigrams(normalize_text(text))
+        if not grams:
+            return
+        ordinal = len(self._ids)
+        self._ids.append(record_id)
+        self._ordinals[record_id] = ordinal
+        # 与 SearchIndex 相同：用 map 在 C 层完成逐个 posting.append(ordinal)
+        deque(map(array.append, map(self._postings.__getitem__, grams), repeat(ordinal)), maxlen=0)
+
+    def update(self, record_id: str, text: str):
+        self.add(record_id, text)
+
+    def remove(self, record_id: str):
+        ordinal = self._ordinals.pop(record_id, None)
+        if ordinal is None:
+            return
+        self._ids[ordinal] = None
+        self._retired.add(ordinal)
+        self._dead += 1
+        if self._dead > max(len(self._ordinals), 1024):
+            self._compact()
+
+    def _compact(self):
+        """从 posting 中清除作废的序号"""
+        ids = self._ids
+        for gram in list(self._postings):
+            live = array('I', (ordinal for ordinal in self._postings[gram] if ids[ordinal] is not None))
+            if live:
+                self._postings[gram] = live
+            else:
+                del self._postings[gram]
+        self._dead = 0
+        self._retired.clear()
+        self._retired_mask = (0, 0)
+        self._bitmaps.clear()
+
+    def search(self, query: str, threshold: float = MIN_SIMILARITY,
+               limit: Optional[int] = MAX_RESULTS) -> List[Tuple[str, float]]:
+        """相似度不低于 threshold 的记录，按相似度从高到低返回前 limit 条 (id, 相似度)；
+        limit 为 None 时返回全部。相似度相同时保持加入索引的顺序"""
+        grams = trigrams(normalize_text(query))
+        if not grams:
+            return []
+        total = len(grams)
+        required = max(1, math.ceil(threshold * total - 1e-9))
+        # 记录里没有的 trigram 只计入分母
+        postings = [(gram, self._postings.get(gram)) for gram in grams]
+        # 记录里没有的 trigram 只计入分母
+        postings = [(gram, posting) for gram, posting in postings if posting]
+        if len(postings) < required:
+            return []
+
+        # 按位分片的计数器：planes[j] 的第 i 位是序号 i 命中个数的第 j 位，逐个加上各 posting 的位图
+        size = len(self._ids)
+        planes = []
+        for gram, posting in postings:
+            carry = self._bitmap(gram, posting, size)
+            for j, plane in enumerate(planes):
+                planes[j] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            else:
+                planes.append(carry)
+
+        # 从最高命中个数往下逐层取出序号（同一层内从小到大），凑够 limit 条为止
+        full = (1 << size) - 1
+        live = full ^ self._retired_bitmap(size)
+        hits = []
+        for count in range(len(postings), required - 1, -1):
+            if count >> len(planes):
+                continue
+            level = live
+            for j, plane in enumerate(planes):
+                level &= plane if count >> j & 1 else plane ^ full
+            if level:
+                wanted = None if limit is None else limit - len(hits)
+                hits.extend((ordinal, count) for ordinal in _set_bits(level, wanted))
+                if limit is not None and len(hits) >= limit:
+                    break
+        ids = self._ids
+        return [(ids[ordinal], count / total) for ordinal, count in hits]
+
+    def _bitmap(self, gram: str, posting: array, size: int) -> int:
+        """posting 的位图；较长的 posting 缓存位图（不比 posting 本身大），之后只补上新追加的序号"""
+        cached = self._bitmaps.get(gram)
+        if cached is None:
+            bitmap = _bitmap(posting, size)
+        else:
+            built, bitmap = cached
+            if built == len(posting):
+                return bitmap
+            bitmap |= _bitmap(posting[built:], size)
+        if len(posting) * BITMAP_RATIO >= size:
+            self._bitmaps[gram] = (len(posting), bitmap)
+        return bitmap
+
+    def _retired_bitmap(self, size: int) -> int:
+        if self._retired_mask[0] != len(self._retired):
+            self._retired_mask = (len(self._retired), _bitmap(self._retired, size))
+        return self._retired_mask[1]
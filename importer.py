@@ -0,0 +1,127 @@
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Callable, Tuple
+
+from collection import Collection, generate_id
+
+# 每次从文件读入的字符数；单条记录超过它时缓冲区会按需继续扩大
+CHUNK_SIZE = 1 << 20
+# 单条记录的字符数上限：超过时按格式错误处理，避免损坏的文件把整个剩余内容读进缓冲区
+MAX_RECORD_CHARS = 64 * CHUNK_SIZE
+# 每处理这么多条记录回调一次进度
+PROGRESS_EVERY = 500
+
+_WHITESPACE = " \t\r\n"
+
+
+class ImportCancelled(Exception):
+    """进度回调返回 False 时抛出，已插入的记录会被撤销"""
+
+
+def iter_json_records(f, chunk_size: int = CHUNK_SIZE, require_array: bool = False) -> Iterator[Dict]:
+    """逐条读取 JSON 数组（[{...}, {...}]）或 NDJSON（每行一个对象）中的记录
+
+    不把整个文件读进内存：缓冲区里只保留尚未解析完的部分。
+    两种格式共用同一个循环：跳过空白、逗号和开头的 [，遇到 ] 结束，其余位置逐个 raw_decode。
+    不是数组时按 NDJSON 处理，跨行的值（如整个文件是一个带缩进的对象）视为格式错误；
+    require_array 为 True 时顶层必须是数组。格式错误抛出 ValueError
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+    array = False
+    while True:
+        # 跳过分隔符；缓冲区用完时继续读
+        while True:
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ","
+                                         or (buffer[pos] == "[" and not started)):
+                array = array or buffer[pos] == "["
+                started = started or array
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+        if pos >= len(buffer) or buffer[pos] == "]":
+            return
+        if require_array and not array:
+            raise ValueError("JSON 文件的顶层不是数组")
+        started = True
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof or len(buffer) - pos > MAX_RECORD_CHARS:
+                raise
+            # 对象被块边界截断：读入更多内容后从对象开头重新解析
+            more = f.read(max(chunk_size, len(buffer) - pos))
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        if not array and buffer.find("\n", pos, end) != -1:
+            raise ValueError("不是 JSON 数组，也不是每行一条记录的 NDJSON")
+        pos = end
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+        yield value
+
+
+def import_file(collection: Collection, file_path: str,
+                progress: Optional[Callable[[int, int, int, int], Optional[bool]]] = None) -> Tuple[int, int]:
+    """把 JSON 数组或 NDJSON 文件（.gz 结尾时先解压）流式导入到 collection，返回 (新增数, 跳过数)
+
+    - .json / .json.gz 文件的顶层必须是数组（与导出一致），其余扩展名按 NDJSON 读取
+    - 与已有记录（以及文件中先出现的记录）名称相同、或正文规范化后相同的跳过
+    - 所有记录插入内存后一次性交给存储引擎（Collection.persist）；sqlite 模式下在一个事务内完成
+    - progress(已读字节, 总字节, 新增数, 跳过数) 定期回调，返回 False 时取消导入，
+      已插入的记录全部撤销并抛出 ImportCancelled
+    - 文件格式错误或写入存储失败时同样撤销，异常向上抛出
+    """
+    content_field = collection.schema.content_field
+    records = collection.records
+    names = {r.get("name") for r in records}
+    now = datetime.now().isoformat()
+    total = os.path.getsize(file_path)
+    require_array = file_path.endswith((".json", ".json.gz"))
+    inserted = []
+    skipped = 0
+
+    try:
+        with open(file_path, 'rb') as raw:
+            # 进度按磁盘上（压缩后）的字节数计算
+            stream = gzip.GzipFile(fileobj=raw) if file_path.endswith(".gz") else raw
+            f = io.TextIOWrapper(stream, encoding='utf-8')
+            for count, item in enumerate(iter_json_records(f, require_array=require_array), 1):
+                if not isinstance(item, dict):
+                    skipped += 1
+                    continue
+                # 已插入的记录也在正文哈希索引里，文件内部的重复同样会被跳过
+                if item.get("name") in names or collection.find_duplicate(item.get(content_field)) is not None:
+                    skipped += 1
+                else:
+                    names.add(item.get("name"))
+                    if "id" not in item or item["id"] in records:
+                        item["id"] = generate_id()
+                    item.setdefault("usage_count", 0)
+                    item.setdefault("created_at", now)
+                    item.setdefault("updated_at", now)
+                    inserted.append(collection.insert(item))
+                if progress is not None and count % PROGRESS_EVERY == 0:
+                    if progress(raw.tell(), total, len(inserted), skipped) is False:
+                        raise ImportCancelled()
+        if inserted:
+            # 只写入新增的记录（日志模式追加、sqlite 模式一个事务），失败时同样撤销
+            collection.persist(inserted)
+    except BaseException:
+        collection.discard([r["id"] for r in inserted])
+        raise
+
+    if inserted:
+        collection.notify([r["id"] for r in inserted])
+    if progress is not None:
+        progress(total, total, len(inserted), skipped)
+    return len(inserted), skipped
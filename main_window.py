@@ -7,6 +7,7 @@ from PyQt6.QtGui import QIcon, QCursor, QFont
 from prompt_dialog import PromptDialog
 from stats_window import StatsWindow
 from prompt_item_widget import PromptItemWidget
+from minhash import DEFAULT_THRESHOLD
 from pathlib import Path
 import pyperclip
 
@@ -260,6 +261,7 @@ class MainWindow(QMainWindow):
             api_key=self.data_manager.config.get("gemini_api_key"),
             use_key_pool=True  # 启用 312 个 Keys 轮询
         )
+        self.data_manager.config.subscribe(lambda key, value: self.ai_analyzer.set_api_key(value), "gemini_api_key")
         
         # 风格管理器
         from style_manager import StyleManager
@@ -377,6 +379,8 @@ class MainWindow(QMainWindow):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 搜索 Prompts...")
+        self.search_input.setToolTip("以 ~ 开头为容错搜索：允许错字、词序不同，按相似度排列\n"
+                                     "以 ? 开头为语义搜索：按字词片段的 TF-IDF 相似度查找意思相近的条目")
         self.search_input.setStyleSheet(self._get_search_style())
         self.search_input.textChanged.connect(self.on_search)
         search_layout.addWidget(self.search_input)
@@ -396,6 +400,8 @@ class MainWindow(QMainWindow):
         self.prompt_list.itemDoubleClicked.connect(self.on_prompt_double_click)
         self.prompt_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.prompt_list.customContextMenuRequested.connect(self.show_context_menu)
+        # Ctrl / Shift 多选，右键菜单提供批量删除、改分类、改标签
+        self.prompt_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         # 启用悬停提示
         self.prompt_list.setMouseTracking(True)
         self.prompt_list.viewport().setMouseTracking(True)
@@ -459,11 +465,18 @@ class MainWindow(QMainWindow):
         
         menu.addSeparator()
         
-        import_action = menu.addAction("导入 Prompts")
+        import_action = menu.addAction("导入到当前分区")
         import_action.triggered.connect(self.import_prompts)
         
-        export_action = menu.addAction("导出 Prompts")
-        export_action.triggered.connect(self.export_prompts)
+        export_action = menu.addAction("导出当前分区")
+        export_action.triggered.connect(lambda: self.export_prompts())
+        
+        incremental_export_action = menu.addAction("增量导出当前分区（上次导出后的变更）")
+        incremental_export_action.triggered.connect(lambda: self.export_prompts(incremental=True))
+        
+        cleanup_action = menu.addAction("🧹 清理相似条目")
+        cleanup_action.setEnabled(self.current_mode != "api_keys")
+        cleanup_action.triggered.connect(self.show_similar_cleanup)
         
         menu.addSeparator()
         
@@ -501,7 +514,6 @@ class MainWindow(QMainWindow):
         """设置窗口透明度 - 使用 setWindowOpacity 不影响样式"""
         self.opacity_value = opacity / 100.0
         self.data_manager.config["opacity"] = self.opacity_value
-        self.data_manager.save_config()
         
         # 使用 setWindowOpacity 设置整个窗口的透明度
         # 这样不会覆盖 style_manager 设置的样式
@@ -512,7 +524,6 @@ class MainWindow(QMainWindow):
     def toggle_always_on_top(self, checked):
         self.always_on_top = checked
         self.data_manager.config["always_on_top"] = checked
-        self.data_manager.save_config()
         
         flags = Qt.WindowType.FramelessWindowHint
         if checked:
@@ -525,7 +536,6 @@ class MainWindow(QMainWindow):
     def toggle_position_lock(self, checked):
         self.position_locked = checked
         self.data_manager.config["position_locked"] = checked
-        self.data_manager.save_config()
         self.show_toast("位置锁定: " + ("开启" if checked else "关闭"))
     
     def refresh_category_filter(self):
@@ -558,13 +568,8 @@ class MainWindow(QMainWindow):
         if category == "全部分类":
             category = None
         
-        # 根据当前模式搜索不同的数据
-        if self.current_mode == "prompts":
-            items = self.data_manager.search_prompts(query, category)
-        elif self.current_mode == "api_docs":
-            items = self.data_manager.search_api_docs(query, category)
-        else:
-            items = self.data_manager.search_api_keys(query, category)
+        # 根据当前模式搜索不同的数据；有查询词时按相关度排序，最相关的在最上面
+        items = self.data_manager.search(self.current_mode, query, category, ranked=True)
         
         self.prompt_list.clear()
         for index, item_data in enumerate(items):
@@ -573,12 +578,13 @@ class MainWindow(QMainWindow):
             
             # API 密钥使用简化显示
             if self.current_mode == "api_keys":
-                # 为密钥创建简化的数据结构（用于 PromptItemWidget）
+                # 为密钥创建简化的数据结构（用于 PromptItemWidget），密钥按分区的 masked_fields 遮蔽
+                masked = self.data_manager.masked(self.current_mode, item_data)
                 display_data = {
-                    "name": item_data.get("name", "未命名"),
-                    "category": item_data.get("category", ""),
+                    "name": masked.get("name", "未命名"),
+                    "category": masked.get("category", ""),
                     "tags": [],
-                    "content": self._mask_api_key(item_data.get("key", ""))
+                    "content": masked.get("key", "")
                 }
                 widget = PromptItemWidget(display_data, self.prompt_list)
             else:
@@ -592,19 +598,10 @@ class MainWindow(QMainWindow):
             
             # 存储完整信息用于tooltip
             if self.current_mode == "api_keys":
-                item.setData(Qt.ItemDataRole.UserRole + 1, {
-                    'name': item_data.get("name", "未命名"),
-                    'category': item_data.get("category", ""),
-                    'tags': [],
-                    'content': self._mask_api_key(item_data.get("key", ""))
-                })
+                item.setData(Qt.ItemDataRole.UserRole + 1, display_data)
             else:
-                item.setData(Qt.ItemDataRole.UserRole + 1, {
-                    'name': item_data.get("name", "未命名"),
-                    'category': item_data.get("category", ""),
-                    'tags': item_data.get("tags", []),
-                    'content': item_data.get("content", "")
-                })
+                # 直接保存记录本身：正文在悬停预览时才读取（外置正文模式下不必为整个列表加载正文）
+                item.setData(Qt.ItemDataRole.UserRole + 1, item_data)
             
             # 添加item并设置widget
             self.prompt_list.addItem(item)
@@ -615,6 +612,15 @@ class MainWindow(QMainWindow):
             self.prompt_list.scrollToTop()
             QTimer.singleShot(50, self._ensure_first_item_visible)
             QTimer.singleShot(150, self._ensure_first_item_visible)
+        
+        # 容错 / 语义索引还在后台建立：当前是临时结果，建好后自动重新搜索
+        if self.data_manager.index_pending(self.current_mode, query):
+            QTimer.singleShot(200, lambda: self._search_again(query))
+    
+    def _search_again(self, query: str):
+        """输入框内容没变时重新搜索（等待后台索引建好）"""
+        if self.search_input.text() == query:
+            self.on_search()
     
     def _ensure_first_item_visible(self):
         """确保第一个item可见"""
@@ -654,6 +660,11 @@ class MainWindow(QMainWindow):
         if not item:
             return
         
+        selected = self.prompt_list.selectedItems()
+        if len(selected) > 1 and item.isSelected():
+            self.show_bulk_menu(position, [i.data(Qt.ItemDataRole.UserRole) for i in selected])
+            return
+        
         menu = QMenu(self)
         menu.setStyleSheet(self._get_menu_style())
         
@@ -702,6 +713,246 @@ class MainWindow(QMainWindow):
             elif action == delete_action:
                 self.delete_api_key(item_id)
     
+    # ==================== 批量操作 ====================
+    
+    def show_bulk_menu(self, position, item_ids):
+        """多选时的右键菜单"""
+        menu = QMenu(self)
+        menu.setStyleSheet(self._get_menu_style())
+        
+        category_action = menu.addAction(f"🗂️ 修改分类（{len(item_ids)} 项）")
+        tags_action = None
+        if self.current_mode != "api_keys":
+            tags_action = menu.addAction(f"🏷️ 编辑标签（{len(item_ids)} 项）")
+        delete_action = menu.addAction(f"🗑️ 删除（{len(item_ids)} 项）")
+        
+        action = menu.exec(self.prompt_list.mapToGlobal(position))
+        if action is None:
+            return
+        if action == category_action:
+            self.bulk_recategorize(item_ids)
+        elif action == tags_action:
+            self.bulk_edit_tags(item_ids)
+        elif action == delete_action:
+            self.bulk_delete(item_ids)
+    
+    def _bulk_dialog(self, title):
+        """批量编辑对话框的外框（确定 / 取消按钮由调用方最后加入）"""
+        from PyQt6.QtWidgets import QDialog
+        
+        dialog = QDialog(self)
+        dialog.setWindowTitle(title)
+        dialog.setMinimumWidth(400)
+        dialog.setStyleSheet("""
+            QDialog { background: #2C2C2E; }
+            QLabel { color: white; font-size: 13px; }
+            QLineEdit, QComboBox { 
+                background: #3A3A3C; color: white; border: 1px solid #48484A; 
+                border-radius: 6px; padding: 8px; font-size: 13px;
+            }
+            QPushButton {
+                background: #FF9500; color: white; border: none; border-radius: 6px;
+                padding: 10px 20px; font-size: 13px; font-weight: bold;
+            }
+            QPushButton:hover { background: #FFa726; }
+            QPushButton#cancelBtn { background: #3A3A3C; }
+            QPushButton#cancelBtn:hover { background: #48484A; }
+        """)
+        layout = QVBoxLayout(dialog)
+        layout.setSpacing(15)
+        layout.setContentsMargins(20, 20, 20, 20)
+        return dialog, layout
+    
+    def _add_dialog_buttons(self, dialog, layout):
+        btn_layout = QHBoxLayout()
+        cancel_btn = QPushButton("取消")
+        cancel_btn.setObjectName("cancelBtn")
+        cancel_btn.clicked.connect(dialog.reject)
+        btn_layout.addWidget(cancel_btn)
+        
+        save_btn = QPushButton("确定")
+        save_btn.clicked.connect(dialog.accept)
+        btn_layout.addWidget(save_btn)
+        layout.addLayout(btn_layout)
+    
+    def bulk_delete(self, item_ids):
+        reply = QMessageBox.question(
+            self, "确认删除", 
+            f"确定要删除选中的 {len(item_ids)} 项吗？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            removed = self.data_manager.delete_many(self.current_mode, item_ids)
+            self.refresh_prompt_list()
+            self.show_toast(f"✓ 已删除 {removed} 项")
+    
+    def bulk_recategorize(self, item_ids):
+        dialog, layout = self._bulk_dialog(f"修改分类（{len(item_ids)} 项）")
+        layout.addWidget(QLabel("新分类"))
+        category_input = QComboBox()
+        category_input.setEditable(True)
+        for cat in self.data_manager.categories(self.current_mode):
+            category_input.addItem(cat)
+        layout.addWidget(category_input)
+        self._add_dialog_buttons(dialog, layout)
+        
+        if dialog.exec():
+            category = category_input.currentText().strip()
+            changed = self.data_manager.update_many(
+                self.current_mode, {item_id: {"category": category} for item_id in item_ids})
+            self.refresh_prompt_list()
+            self.show_toast(f"✓ 已修改 {changed} 项的分类")
+    
+    def bulk_edit_tags(self, item_ids):
+        dialog, layout = self._bulk_dialog(f"编辑标签（{len(item_ids)} 项）")
+        layout.addWidget(QLabel("添加标签（逗号分隔）"))
+        add_input = QLineEdit()
+        layout.addWidget(add_input)
+        layout.addWidget(QLabel("移除标签（逗号分隔）"))
+        remove_input = QLineEdit()
+        layout.addWidget(remove_input)
+        self._add_dialog_buttons(dialog, layout)
+        
+        if not dialog.exec():
+            return
+        def split_tags(text):
+            return [t.strip() for t in text.replace("，", ",").split(",") if t.strip()]
+        
+        to_add = split_tags(add_input.text())
+        to_remove = set(split_tags(remove_input.text()))
+        if not to_add and not to_remove:
+            return
+        
+        changes = {}
+        for item_id in item_ids:
+            record = self.data_manager.get(self.current_mode, item_id)
+            if record is None:
+                continue
+            old_tags = list(record.get("tags", []))
+            tags = [t for t in old_tags if t not in to_remove]
+            tags += [t for t in to_add if t not in tags]
+            if tags != old_tags:
+                changes[item_id] = {"tags": tags}
+        changed = self.data_manager.update_many(self.current_mode, changes)
+        self.refresh_prompt_list()
+        self.show_toast(f"✓ 已修改 {changed} 项的标签")
+    
+    def show_similar_cleanup(self):
+        """按近似重复分组列出当前分区的条目，勾选的条目一次删除"""
+        from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
+        
+        clusters = self._find_similar_clusters()
+        if clusters is None:
+            return
+        if not clusters:
+            self.show_toast("✓ 没有发现相似条目")
+            return
+        
+        dialog, layout = self._bulk_dialog(f"相似条目（{len(clusters)} 组）")
+        dialog.setMinimumSize(560, 520)
+        dialog.setStyleSheet(dialog.styleSheet() + """
+            QTreeWidget, QTextEdit {
+                background: #3A3A3C; color: white; border: 1px solid #48484A;
+                border-radius: 6px; font-size: 13px;
+            }
+        """)
+        layout.addWidget(QLabel("每组保留使用次数最多的一条（第一条），与它相似的默认勾选；勾选的条目将被删除"))
+        
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["名称", "相似度", "使用次数", "更新时间"])
+        tree.setColumnWidth(0, 300)
+        for number, members in enumerate(clusters, 1):
+            group = QTreeWidgetItem(tree, [f"第 {number} 组（{len(members)} 项）"])
+            for position, (record, score) in enumerate(members):
+                child = QTreeWidgetItem(group, [
+                    record.get("name", "未命名"),
+                    "保留" if position == 0 else f"{score:.0%}",
+                    str(record.get("usage_count", 0)),
+                    str(record.get("updated_at", ""))[:16].replace("T", " "),
+                ])
+                child.setData(0, Qt.ItemDataRole.UserRole, record["id"])
+                # 只是经由别的条目间接相连、与保留的那条并不相似的，不默认删除
+                duplicate = position > 0 and score >= DEFAULT_THRESHOLD
+                child.setCheckState(0, Qt.CheckState.Checked if duplicate else Qt.CheckState.Unchecked)
+            group.setExpanded(True)
+        layout.addWidget(tree, 3)
+        
+        preview = QTextEdit()
+        preview.setReadOnly(True)
+        layout.addWidget(preview, 2)
+        
+        def show_preview(current, _previous):
+            record_id = current.data(0, Qt.ItemDataRole.UserRole) if current is not None else None
+            record = self.data_manager.get(self.current_mode, record_id) if record_id else None
+            preview.setPlainText(record.get("content", "") if record is not None else "")
+        
+        tree.currentItemChanged.connect(show_preview)
+        self._add_dialog_buttons(dialog, layout)
+        
+        if not dialog.exec():
+            return
+        item_ids = []
+        for i in range(tree.topLevelItemCount()):
+            group = tree.topLevelItem(i)
+            for j in range(group.childCount()):
+                child = group.child(j)
+                if child.checkState(0) == Qt.CheckState.Checked:
+                    item_ids.append(child.data(0, Qt.ItemDataRole.UserRole))
+        if item_ids:
+            self.bulk_delete(item_ids)
+    
+    def _find_similar_clusters(self):
+        """在后台线程中分组（第一次需要为全部正文计算签名），期间显示可取消的进度；取消或出错时返回 None"""
+        import threading
+        from PyQt6.QtWidgets import QProgressDialog
+        
+        dialog = QProgressDialog("正在查找相似条目...", "取消", 0, 1000, self)
+        dialog.setWindowTitle("相似条目")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
+        state = {"done": 0, "total": 0, "clusters": None, "error": None}
+        cancelled = threading.Event()
+        
+        def on_progress(done, total):
+            # 在工作线程中调用：只记录进度，界面由下面的循环刷新
+            state["done"], state["total"] = done, total
+            return not cancelled.is_set()
+        
+        def work():
+            try:
+                state["clusters"] = self.data_manager.similar_clusters(self.current_mode, progress=on_progress)
+            except Exception as e:
+                state["error"] = e
+        
+        worker = threading.Thread(target=work, name="similar-clusters", daemon=True)
+        worker.start()
+        while worker.is_alive():
+            if state["total"]:
+                dialog.setValue(int(state["done"] * 1000 / state["total"]))
+                dialog.setLabelText(f"正在计算正文签名 {state['done']}/{state['total']}")
+            QApplication.processEvents()
+            if dialog.wasCanceled():
+                cancelled.set()
+            worker.join(0.05)
+        dialog.close()
+        
+        if state["error"] is not None:
+            QMessageBox.critical(self, "相似条目", f"查找失败: {state['error']}")
+            return None
+        if state["clusters"] is None:
+            self.show_toast("已取消")
+        return state["clusters"]
+    
+    def _bump_duplicate(self, collection: str, content: str) -> bool:
+        """content 与已有记录重复时使用次数 +1 并提示，返回是否重复"""
+        existing = self.data_manager.bump_duplicate(collection, content)
+        if existing is None:
+            return False
+        self.refresh_prompt_list()
+        self.show_toast(f"已存在: {existing['name']}（使用次数 +1）")
+        return True
+    
     def quick_add_from_clipboard(self):
         """从剪贴板快速添加（AI 自动分析）"""
         import pyperclip
@@ -720,6 +971,10 @@ class MainWindow(QMainWindow):
             self.show_toast("❌ 内容太短（至少20字符）")
             return
         
+        # 已有相同内容时不再调用 AI，只给已有记录的使用次数 +1
+        if self._bump_duplicate("prompts", content):
+            return
+        
         # 检查 AI 是否可用
         if not self.ai_analyzer or not self.ai_analyzer.api_key:
             # 如果没有 AI，弹出手动添加对话框
@@ -937,6 +1192,10 @@ class MainWindow(QMainWindow):
             self.show_toast("❌ 内容太短（至少20字符）")
             return
         
+        # 已有相同内容时不再调用 AI，只给已有记录的使用次数 +1
+        if self._bump_duplicate("api_docs", content):
+            return
+        
         # 检查 AI 是否可用
         if not self.ai_analyzer or not self.ai_analyzer.api_key:
             # 如果没有 AI，弹出手动添加对话框
@@ -1000,14 +1259,6 @@ class MainWindow(QMainWindow):
     
     # ==================== API 密钥相关方法 ====================
     
-    def _mask_api_key(self, key: str) -> str:
-        """遮蔽 API 密钥，只显示前4位和后4位"""
-        if not key:
-            return ""
-        if len(key) <= 8:
-            return "*" * len(key)
-        return key[:4] + "*" * (len(key) - 8) + key[-4:]
-    
     def add_api_key(self):
         """添加 API 密钥"""
         from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox
@@ -1180,29 +1431,77 @@ class MainWindow(QMainWindow):
         stats_window.exec()
     
     def import_prompts(self):
+        """把 JSON / NDJSON 文件导入到当前分区（流式读取，带进度，可取消）"""
+        from PyQt6.QtWidgets import QProgressDialog
+        from importer import ImportCancelled
+        
+        titles = {"prompts": "提示词", "api_docs": "API文档", "api_keys": "密钥"}
+        title = f"导入{titles[self.current_mode]}"
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "导入 Prompts", "", "JSON Files (*.json)"
+            self, title, "", "JSON Files (*.json *.ndjson *.jsonl *.gz)"
         )
-        if file_path:
-            try:
-                added, skipped = self.data_manager.import_prompts(file_path)
-                self.refresh_prompt_list()
-                self.show_toast(f"导入完成: 添加 {added} 个, 跳过 {skipped} 个")
-            except Exception as e:
-                QMessageBox.critical(self, "导入错误", f"导入失败: {str(e)}")
+        if not file_path:
+            return
+        
+        dialog = QProgressDialog("正在导入...", "取消", 0, 1000, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
+        
+        def on_progress(done, total, added, skipped):
+            dialog.setValue(int(done * 1000 / total) if total else 1000)
+            dialog.setLabelText(f"已添加 {added} 个, 跳过 {skipped} 个")
+            QApplication.processEvents()
+            return not dialog.wasCanceled()
+        
+        try:
+            added, skipped = self.data_manager.import_records(self.current_mode, file_path, on_progress)
+            self.refresh_prompt_list()
+            self.show_toast(f"导入完成: 添加 {added} 个, 跳过 {skipped} 个")
+        except ImportCancelled:
+            self.show_toast("已取消导入")
+        except Exception as e:
+            QMessageBox.critical(self, "导入错误", f"导入失败: {str(e)}")
+        finally:
+            dialog.close()
     
-    def export_prompts(self):
+    def export_prompts(self, incremental=False):
+        """把当前分区导出为 NDJSON（可 gzip 压缩）或 JSON；当前选中的分类作为筛选条件"""
+        from PyQt6.QtWidgets import QProgressDialog
+        from exporter import ExportCancelled
+        
+        titles = {"prompts": "提示词", "api_docs": "API文档", "api_keys": "密钥"}
+        title = f"{'增量' if incremental else ''}导出{titles[self.current_mode]}"
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "导出 Prompts", "prompts.json", "JSON Files (*.json)"
+            self, title, f"{self.current_mode}.ndjson.gz",
+            "NDJSON gzip (*.ndjson.gz);;NDJSON (*.ndjson);;JSON Files (*.json)"
         )
-        if file_path:
-            try:
-                if self.data_manager.export_prompts(file_path):
-                    self.show_toast("导出成功!")
-                else:
-                    QMessageBox.warning(self, "导出警告", "导出失败，请检查文件路径权限")
-            except Exception as e:
-                QMessageBox.critical(self, "导出错误", f"导出失败: {str(e)}")
+        if not file_path:
+            return
+        category = self.category_filter.currentText()
+        if category == "全部分类":
+            category = None
+        
+        dialog = QProgressDialog("正在导出...", "取消", 0, 1000, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
+        
+        def on_progress(done, total):
+            dialog.setValue(int(done * 1000 / total) if total else 1000)
+            QApplication.processEvents()
+            return not dialog.wasCanceled()
+        
+        try:
+            count = self.data_manager.export_records(
+                self.current_mode, file_path, category=category, incremental=incremental, progress=on_progress)
+            self.show_toast(f"导出成功: {count} 条")
+        except ExportCancelled:
+            self.show_toast("已取消导出")
+        except Exception as e:
+            QMessageBox.critical(self, "导出错误", f"导出失败: {str(e)}")
+        finally:
+            dialog.close()
     
     def show_toast(self, text):
         toast = ToastLabel(text, self)
@@ -1478,7 +1777,6 @@ class MainWindow(QMainWindow):
         """切换自动折叠"""
         self.auto_collapse_enabled = checked
         self.data_manager.config["auto_collapse"] = checked
-        self.data_manager.save_config()
         
         if checked:
             self.mouse_check_timer.start()
@@ -1494,7 +1792,6 @@ class MainWindow(QMainWindow):
         """切换浮动球始终显示"""
         self.ball_always_visible = checked
         self.data_manager.config["ball_always_visible"] = checked
-        self.data_manager.save_config()
         
         if checked:
             # 启用始终显示，确保浮动球可见
@@ -1889,7 +2186,6 @@ class MainWindow(QMainWindow):
         """应用并保存风格"""
         self.current_style = style_key
         self.data_manager.config["ui_style"] = style_key
-        self.data_manager.save_config()
         
         # 关闭对话框
         dialog.accept()
@@ -1939,15 +2235,13 @@ class MainWindow(QMainWindow):
                 child.style().polish(child)
                 child.update()
         
-        # 同步更新浮动球风格
-        if self.floating_ball:
-            self.floating_ball.set_style(style_key)
-        
         print(f"✓ 风格已应用: {self.style_manager.STYLES[style_key]['name']}")
     
     def hide_to_ball(self):
         """隐藏窗口并显示浮动球"""
         self.hide()
+        # 收起后界面空闲，顺手写出累积的使用次数
+        self.data_manager.flush_usage()
         # 如果浮动球不是始终显示，则需要显示它
         if self.floating_ball and not self.ball_always_visible:
             self.floating_ball.show()
@@ -2036,7 +2330,6 @@ class MainWindow(QMainWindow):
     def save_window_state(self):
         self.data_manager.config["window_position"] = [self.x(), self.y()]
         self.data_manager.config["window_geometry"] = [self.width(), self.height()]
-        self.data_manager.save_config()
     
     def resizeEvent(self, event):
         """当窗口大小改变时自动保存新的尺寸"""
@@ -2061,9 +2354,8 @@ class MainWindow(QMainWindow):
         # 更新所有列表项的字体大小以适应新宽度
         self._update_list_items_font()
         
-        # 保存新的窗口尺寸到配置
+        # 记录新的窗口尺寸（配置在调整结束后防抖写盘）
         self.data_manager.config["window_geometry"] = [self.width(), self.height()]
-        self.data_manager.save_config()
     
     def _update_list_items_font(self):
         """更新所有列表项的字体大小"""
@@ -2555,7 +2847,6 @@ class MainWindow(QMainWindow):
         """处理开机自启动选择"""
         # 标记已询问
         self.data_manager.config["asked_autostart"] = True
-        self.data_manager.save_config()
         
         if enable:
             # 启用开机自启动
@@ -2802,8 +3093,6 @@ class MainWindow(QMainWindow):
         def save_settings():
             key = api_key_input.text().strip()
             self.data_manager.config["gemini_api_key"] = key
-            self.data_manager.save_config()
-            self.ai_analyzer.set_api_key(key)
             self.show_toast("✓ AI 设置已保存")
             dialog.accept()
         
@@ -72,6 +72,14 @@ class PromptManagerApp(QApplication):
         
         # 安装事件过滤器，监听全局点击事件
         self.installEventFilter(self)
+        
+        # 定期把内存中累积的使用次数写盘
+        self.usage_flush_timer = QTimer(self)
+        self.usage_flush_timer.timeout.connect(self.data_manager.flush_usage)
+        self.usage_flush_timer.start(30000)
+        
+        # 启动完成、界面空闲后再在后台加载其余分区
+        QTimer.singleShot(3000, self.data_manager.prefetch)
     
     def setup_tray(self):
         self.tray_icon = QSystemTrayIcon(create_tray_icon(), self)
@@ -137,6 +145,8 @@ class PromptManagerApp(QApplication):
     
     def quit_app(self):
         self.main_window.save_window_state()
+        self.data_manager.compact_storage()
+        self.data_manager.flush()
         self.quit()
     
     def eventFilter(self, obj, event):
@@ -0,0 +1,194 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+
+from search_index import _CJK_CHARS
+
+# 近似重复检测：shingle 集合的 MinHash 签名 + LSH 分段分桶
+#
+# shingle 是相邻 SHINGLE 个词元组成的元组：英文/数字按词，中日韩文字每个字一个词元。
+# 签名采用单次排列 MinHash（one permutation hashing）：每个 shingle 只算一次哈希，
+# 哈希值域等分成 BINS 段，每段里最小的哈希值就是该分箱的值（排序后二分查找，全在 C 里完成）；
+# 空箱从后面最近的非空箱借值（densification）。
+# 两条文本签名中相等分箱的比例是它们 shingle 集合 Jaccard 相似度的无偏估计。
+#
+# LSH：签名切成 BANDS 段，每段 ROWS 个分箱，任意一段完全相同的两条记录成为候选，
+# 再用签名估计相似度过滤。相似度 s 的两条记录成为候选的概率为 1 - (1 - s^ROWS)^BANDS：
+# s=0.9 时约 99.99%，s=0.8 时约 98%，s=0.7 时约 89%，s=0.3 时约 6%。
+# 查询只需查 BANDS 个桶，与库的大小无关。
+#
+# 签名使用 Python 内置的字符串哈希（每个进程随机化），因此只在内存中使用，不落盘。
+
+SHINGLE = 3  # 每个 shingle 的词元数
+BINS = 32
+ROWS = 4
+BANDS = BINS // ROWS
+# 超长正文只取开头这么多字符计算签名，避免建索引时间被少数大文档主导
+MAX_CHARS = 16384
+DEFAULT_THRESHOLD = 0.7
+
+_TOKEN_RE = re.compile(f"[{_CJK_CHARS}]|[^\\W{_CJK_CHARS}]+")
+# 各分箱在 64 位有符号哈希值域上的下界，最后一项是上界
+_BOUNDS = [-(1 << 63) + (i << 59) for i in range(BINS + 1)]
+_EMPTY = 1 << 32
+
+
+def signature(text) -> Optional[array]:
+    """文本的 MinHash 签名（BINS 个 32 位无符号整数）；空文本返回 None"""
+    if not isinstance(text, str):
+        return None
+    # 与搜索相同的规范化（全角转半角、大小写折叠）；空白在切词时自然丢弃
+    tokens = _TOKEN_RE.findall(unicodedata.normalize("NFKC", text[:MAX_CHARS]).casefold())
+    if not tokens:
+        return None
+    if len(tokens) <= SHINGLE:
+        hashes = [hash(tuple(tokens))]
+    else:
+        hashes = sorted(set(map(hash, zip(*(tokens[i:] for i in range(SHINGLE))))))
+    sig = [_EMPTY] * BINS
+    count = len(hashes)
+    for i in range(BINS):
+        j = bisect_left(hashes, _BOUNDS[i])
+        if j < count and hashes[j] < _BOUNDS[i + 1]:
+            sig[i] = hashes[j] & 0xFFFFFFFF
+    if _EMPTY in sig:
+        # 空箱取其后（循环）第一个非空箱的值；两条文本只要 shingle 集合相同，借到的值就相同
+        filled = [i for i, value in enumerate(sig) if value != _EMPTY]
+        for i in range(BINS):
+            if sig[i] == _EMPTY:
+                j = next((k for k in filled if k > i), filled[0])
+                sig[i] = sig[j]
+    return array('I', sig)
+
+
+def similarity(a: array, b: array) -> float:
+    """两个签名估计出的 Jaccard 相似度"""
+    return sum(x == y for x, y in zip(a, b)) / BINS
+
+
+class MinHashIndex:
+    """记录 id → 签名，以及 LSH 桶 → 记录 id，随增删改增量维护"""
+
+    def __init__(self):
+        self._signatures: Dict[str, array] = {}
+        # (段号, 段内容) 的哈希 → 一个 id，或多个 id 组成的 tuple（绝大多数桶只有一条记录）
+        self._buckets: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _band_keys(sig: array) -> List[int]:
+        data = sig.tobytes()
+        width = ROWS * sig.itemsize
+        return [hash((band, data[band * width:(band + 1) * width])) for band in range(BANDS)]
+
+    def add(self, record_id: str, text):
+        sig = signature(text)
+        if sig is None:
+            return
+        self._signatures[record_id] = sig
+        buckets = self._buckets
+        for key in self._band_keys(sig):
+            current = buckets.get(key)
+            if current is None:
+                buckets[key] = record_id
+            elif type(current) is tuple:
+                buckets[key] = current + (record_id,)
+            else:
+                buckets[key] = (current, record_id)
+
+    def remove(self, record_id: str):
+        sig = self._signatures.pop(record_id, None)
+        if sig is None:
+            return
+        buckets = self._buckets
+        for key in self._band_keys(sig):
+            current = buckets.get(key)
+            if current == record_id:
+                del buckets[key]
+            elif type(current) is tuple:
+                rest = tuple(i for i in current if i != record_id)
+                buckets[key] = rest if len(rest) > 1 else rest[0]
+
+    def update(self, record_id: str, text):
+        self.remove(record_id)
+        self.add(record_id, text)
+
+    def _candidates(self, sig: array) -> set:
+        candidates = set()
+        buckets = self._buckets
+        for key in self._band_keys(sig):
+            current = buckets.get(key)
+            if current is None:
+                continue
+            if type(current) is tuple:
+                candidates.update(current)
+            else:
+                candidates.add(current)
+        return candidates
+
+    def query(self, text, threshold: float = DEFAULT_THRESHOLD, limit: int = 20,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """与 text 估计相似度不低于 threshold 的记录，按相似度从高到低返回 (id, 相似度)"""
+        sig = signature(text)
+        if sig is None:
+            return []
+        signatures = self._signatures
+        results = []
+        for record_id in self._candidates(sig):
+            if record_id == exclude:
+                continue
+            score = similarity(sig, signatures[record_id])
+            if score >= threshold:
+                results.append((record_id, score))
+        results.sort(key=lambda item: -item[1])
+        return results[:limit]
+
+    def pair_similarity(self, a: str, b: str) -> float:
+        """两条已索引记录的估计相似度；任一条不在索引中（正文为空）时为 0"""
+        sig_a, sig_b = self._signatures.get(a), self._signatures.get(b)
+        if sig_a is None or sig_b is None:
+            return 0.0
+        return similarity(sig_a, sig_b)
+
+    def clusters(self, threshold: float = DEFAULT_THRESHOLD) -> List[List[str]]:
+        """把互相近似重复的记录归成组（并查集，相似关系可传递），只返回两条以上的组，大组在前
+
+        组内 id 的顺序与加入索引的顺序一致。因为可传递，同组的两条不一定彼此相似（A≈B、B≈C 而 A≉C），
+        要删哪些需再用 pair_similarity 与保留的那条比较。
+        """
+        parent: Dict[str, str] = {}
+
+        def find(x):
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while x != root:
+                parent[x], x = root, parent.get(x, x)
+            return root
+
+        signatures = self._signatures
+        checked = set()
+        for ids in self._buckets.values():
+            if type(ids) is not tuple:
+                continue
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if similarity(signatures[a], signatures[b]) >= threshold:
+                        root_a, root_b = find(a), find(b)
+                        if root_a != root_b:
+                            parent[root_b] = root_a
+                            parent.setdefault(root_a, root_a)
+
+        groups: Dict[str, List[str]] = {}
+        for record_id in signatures:
+            if record_id in parent:
+                groups.setdefault(find(record_id), []).append(record_id)
+        return sorted((ids for ids in groups.values() if len(ids) > 1), key=len, reverse=True)
@@ -0,0 +1,203 @@
+import re
+import sys
+import threading
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 汉字 → 拼音（不带声调）的离线对照表，随程序一起发布，运行时不依赖任何第三方包
+#
+# 文件每行一个音节：音节、空格、读这个音节的全部汉字，例如 "ce 册侧厕测策..."。
+# 覆盖 CJK 统一汉字基本区（U+4E00–U+9FFF）；多音字只取最常用的读音。
+# 由 pypinyin 生成（仅生成时需要）：python pinyin.py --generate
+TABLE_PATH = Path(__file__).with_name("pinyin_table.txt")
+_FIRST, _LAST = 0x4E00, 0x9FFF
+
+# 拼音搜索只从音节开头匹配：查询须由连续若干个音节各自的非空前缀依次拼成，
+# 「写作手册」(xie zuo shou ce) 能被 "xzsc"、"xiezuo"、"zuos"、"shouce" 搜到，
+# 跨越音节边界的 "iez"、"ouc" 则不算命中。
+# 每条记录保存一份音节文本：音节之间用空格、各段连续汉字之间用换行分隔（"xie zuo\nfeng ge"）。
+# 校验用正则：查询首字母在音节开头，之后每个字母要么紧接在前一个字母后面（同一音节），
+# 要么跳过该音节余下的字母到下一个音节开头，"xzs" → (?:^| )x(?:[a-z]* )?z(?:[a-z]* )?s。
+# 倒排索引的键是两个字母：每个音节的前两个字母，以及相邻两个音节的首字母；
+# 查询的前两个字母必然是其中之一，候选集是真实结果的超集，再逐条校验。
+# 单个字母几乎能匹配所有含汉字的记录，查询至少 MIN_QUERY 个字母才按拼音搜索。
+MIN_QUERY = 2
+
+_table: Optional[Dict[str, str]] = None
+_table_lock = threading.Lock()
+
+
+def _load_table() -> Dict[str, str]:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                table = {}
+                try:
+                    with open(TABLE_PATH, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            syllable, _, chars = line.strip().partition(" ")
+                            syllable = sys.intern(syllable)
+                            for char in chars:
+                                table[char] = syllable
+                except OSError as e:
+                    print(f"Error loading pinyin table: {e}")
+                _table = table
+    return _table
+
+
+@lru_cache(maxsize=8192)
+def to_pinyin(text: str) -> Optional[Tuple[str, str]]:
+    """(全拼, 首字母)，例如 "写作手册" → ("xiezuoshouce", "xzsc")；非汉字原样保留。
+    text 里没有可转换的汉字时返回 None"""
+    table = _load_table()
+    full = []
+    initials = []
+    converted = False
+    for char in text:
+        syllable = table.get(char)
+        if syllable is None:
+            full.append(char)
+            initials.append(char)
+        else:
+            full.append(syllable)
+            initials.append(syllable[0])
+            converted = True
+    if not converted:
+        return None
+    return "".join(full), "".join(initials)
+
+
+@lru_cache(maxsize=8192)
+def syllable_runs(text: str) -> Tuple[Tuple[str, ...], ...]:
+    """text 里每段连续汉字的音节序列，例如 "写作 手册" → (("xie", "zuo"), ("shou", "ce"))"""
+    table = _load_table()
+    runs = []
+    run = []
+    for char in text:
+        syllable = table.get(char)
+        if syllable is not None:
+            run.append(syllable)
+        elif run:
+            runs.append(tuple(run))
+            run = []
+    if run:
+        runs.append(tuple(run))
+    return tuple(runs)
+
+
+def _keys(text: str) -> Set[str]:
+    """音节文本的倒排索引键：各音节的前两个字母、相邻两个音节的首字母"""
+    keys = set()
+    for run in text.split("\n"):
+        syllables = run.split(" ")
+        for i, syllable in enumerate(syllables):
+            if len(syllable) >= 2:
+                keys.add(syllable[:2])
+            if i + 1 < len(syllables):
+                keys.add(syllable[0] + syllables[i + 1][0])
+    return keys
+
+
+def _pattern(query: str):
+    return re.compile("(?:^| )" + query[0] + "".join("(?:[a-z]* )?" + c for c in query[1:]), re.M)
+
+
+def is_query(query: str) -> bool:
+    """query 能否按拼音搜索：至少 MIN_QUERY 个小写字母"""
+    return len(query) >= MIN_QUERY and query.isascii() and query.isalpha()
+
+
+class PinyinIndex:
+    """记录 → 各字段值里汉字的音节文本，另按两个字母的键建倒排索引，随增删改增量维护
+
+    与 SearchIndex 相同，posting 是记录序号的 array('I')；修改或删除时旧序号作废，
+    作废的条目多于有效条目时整体清理一次。
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        self._ordinals: Dict[str, int] = {}  # id → 当前序号
+        self._ids: List[Optional[str]] = []  # 序号 → id，作废的序号为 None
+        self._texts: List[Optional[str]] = []  # 序号 → 音节文本
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, record_id: str, values: Iterable[str]):
+        """values 为已规范化的字段值；没有汉字的记录不登记"""
+        self.remove(record_id)
+        runs = chain.from_iterable(map(syllable_runs, values))
+        text = "\n".join(map(" ".join, runs))
+        if not text:
+            return
+        ordinal = len(self._ids)
+        self._ids.append(record_id)
+        self._texts.append(text)
+        self._ordinals[record_id] = ordinal
+        for key in _keys(text):
+            self._postings[key].append(ordinal)
+
+    def update(self, record_id: str, values: Iterable[str]):
+        self.add(record_id, values)
+
+    def remove(self, record_id: str):
+        ordinal = self._ordinals.pop(record_id, None)
+        if ordinal is None:
+            return
+        self._ids[ordinal] = None
+        self._texts[ordinal] = None
+        self._dead += 1
+        if self._dead > max(len(self._ordinals), 1024):
+            self._compact()
+
+    def _compact(self):
+        ids = self._ids
+        for key in list(self._postings):
+            live = array('I', (ordinal for ordinal in self._postings[key] if ids[ordinal] is not None))
+            if live:
+                self._postings[key] = live
+            else:
+                del self._postings[key]
+        self._dead = 0
+
+    def search(self, query: str) -> List[str]:
+        """拼音能从某个音节开头拼出 query 的记录 id（按加入索引的顺序）；
+        query 须为至少 MIN_QUERY 个小写字母，否则返回空表"""
+        if not is_query(query):
+            return []
+        posting = self._postings.get(query[:2])
+        if not posting:
+            return []
+        search = _pattern(query).search
+        ids, texts = self._ids, self._texts
+        return [ids[ordinal] for ordinal in posting
+                if texts[ordinal] is not None and search(texts[ordinal])]
+
+
+def generate_table(path: Path = TABLE_PATH) -> int:
+    """用 pypinyin 重新生成对照表，返回收录的汉字数"""
+    from pypinyin import lazy_pinyin, Style
+
+    by_syllable: Dict[str, list] = {}
+    for code in range(_FIRST, _LAST + 1):
+        char = chr(code)
+        syllable = lazy_pinyin(char, style=Style.NORMAL, errors="ignore")
+        if syllable and syllable[0].isascii() and syllable[0].isalpha():
+            by_syllable.setdefault(syllable[0].lower(), []).append(char)
+    with open(path, 'w', encoding='utf-8') as f:
+        for syllable in sorted(by_syllable):
+            f.write(f"{syllable} {''.join(by_syllable[syllable])}\n")
+    return sum(len(chars) for chars in by_syllable.values())
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--generate"]:
+        print(f"✓ 已生成 {TABLE_PATH.name}，收录 {generate_table()} 个汉字")
+    else:
+        print("用法: python pinyin.py --generate   （需要安装 pypinyin）")
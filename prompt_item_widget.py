@@ -43,10 +43,14 @@ class PromptItemWidget(QWidget):
             
         self.category = prompt_data.get("category", "")
         self.tags = prompt_data.get("tags", [])
-        self.content = prompt_data.get("content", "")
         self.usage_count = prompt_data.get("usage_count", 0)
         
         self.init_ui()
+    
+    @property
+    def content(self):
+        """正文按需读取，列表渲染本身不加载正文"""
+        return self.prompt_data.get("content", "")
         
     def init_ui(self):
         """初始化UI"""
@@ -0,0 +1,108 @@
+import heapq
+import math
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from record import pack_timestamp
+from search_index import SearchIndex, tokenize
+
+# 搜索结果排序：BM25F 相关度 × 使用次数加成 × 新近度加成
+#
+# BM25F：先把各字段的词频按字段权重、按字段长度归一化后相加，再做一次饱和，
+#   tf~ = Σ_f  w_f · tf_f / (1 - B + B · len_f / avglen_f)
+#   得分 = Σ_t  idf(t) · tf~ / (K1 + tf~)
+#   idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5))
+# 搜索是子串语义，词频用规范化字段文本中查询词出现的次数（"pyth" 也会计入 "python"），
+# 长度以字符计。查询词取查询里的英文词和中文双字；倒排索引里没有的词（英文词片段、单个汉字）
+# 以全部命中记录数作为 df。
+# SQLite 模式下相关度直接取 FTS5 的 bm25()（各列权重同上），不必在内存中建立 SearchIndex。
+#
+# 加成：
+#   使用次数  × (1 + USAGE_BOOST · ln(1 + usage_count))
+#   新近度    × (1 + RECENCY_BOOST · 0.5 ^ (距上次修改的天数 / RECENCY_HALF_LIFE_DAYS))
+
+K1 = 1.2
+B = 0.75
+USAGE_BOOST = 0.15
+RECENCY_BOOST = 0.3
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+_MICROS_PER_DAY = 86400 * 1000000
+
+
+def _updated_micros(record) -> Optional[int]:
+    """updated_at 的微秒时间戳；紧凑记录里本来就是整数，其余情况解析 ISO 字符串"""
+    value = getattr(record, "updated_at", None)
+    if type(value) is int:
+        return value
+    return pack_timestamp(record.get("updated_at"))
+
+
+def boost(record, now_micros: int) -> float:
+    """使用次数与新近度的乘性加成（≥ 1）"""
+    usage = record.get("usage_count", 0)
+    factor = 1.0 + USAGE_BOOST * math.log1p(usage) if isinstance(usage, int) and usage > 0 else 1.0
+    updated = _updated_micros(record)
+    if updated is not None:
+        age_days = max(now_micros - updated, 0) / _MICROS_PER_DAY
+        factor *= 1.0 + RECENCY_BOOST * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+    return factor
+
+
+def rank(index: SearchIndex, records: List[Dict], needle: str, weights: Dict[str, float],
+         total: int, limit: Optional[int] = None) -> List[Tuple[Dict, float]]:
+    """给命中记录打分，按得分从高到低返回 (记录, 得分)
+
+    needle 需先经过 normalize_text；records 是全部命中记录，total 是分区记录总数。
+    limit 给出时只取前 limit 条（堆选择，不对整个命中集排序）；得分相同时保持原有顺序。
+    """
+    if not records:
+        return []
+    terms = sorted(tokenize(needle)) or [needle.strip()]
+    hits = len(records)
+    idf = []
+    for term in terms:
+        df = index.document_frequency(term) or hits
+        idf.append(math.log(1.0 + (total - df + 0.5) / (df + 0.5)))
+    field_weights = [weights.get(field, 0.0) for field in index.fields]
+    norms = [(1.0 - B, B / avg if avg else 0.0) for avg in index.average_lengths()]
+    # updated_at 保存的是不带时区的本地时间
+    now_micros = pack_timestamp(datetime.now().isoformat())
+
+    scored = []
+    for order, record in enumerate(records):
+        texts = index.field_texts(record["id"])
+        score = 0.0
+        for term, term_idf in zip(terms, idf):
+            tf = 0.0
+            for text, weight, (base, slope) in zip(texts, field_weights, norms):
+                if weight and text:
+                    count = text.count(term)
+                    if count:
+                        tf += weight * count / (base + slope * len(text))
+            if tf:
+                score += term_idf * tf / (K1 + tf)
+        scored.append((score * boost(record, now_micros), -order, record))
+
+    return _best(scored, limit)
+
+
+def rank_by_relevance(records: List[Dict], relevance: Dict[str, float],
+                      limit: Optional[int] = None) -> List[Tuple[Dict, float]]:
+    """存储引擎已给出相关度（如 SQLite FTS5 的 bm25）时的排序：得分为相关度 × 加成，
+    不在 relevance 中的记录（拼音命中）相关度为 0；relevance 为空（查询太短无法打分）时只按加成排序。
+    返回值与 rank 相同"""
+    default = 0.0 if relevance else 1.0
+    now_micros = pack_timestamp(datetime.now().isoformat())
+    scored = [(relevance.get(record["id"], default) * boost(record, now_micros), -order, record)
+              for order, record in enumerate(records)]
+    return _best(scored, limit)
+
+
+def _best(scored: List[Tuple[float, int, Dict]], limit: Optional[int]) -> List[Tuple[Dict, float]]:
+    """按 (得分, -原顺序) 从高到低取前 limit 条（堆选择，不对整个命中集排序）"""
+    if limit is not None and limit < len(scored):
+        best = heapq.nlargest(limit, scored, key=lambda item: item[:2])
+    else:
+        best = sorted(scored, key=lambda item: item[:2], reverse=True)
+    return [(record, score) for score, _, record in best]
@@ -0,0 +1,189 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+from content_store import STORAGE_SUFFIXES
+
+_MISSING = object()
+_EPOCH = datetime(1970, 1, 1)
+_TIME_FIELDS = frozenset(("created_at", "updated_at"))
+
+
+def pack_timestamp(value: str):
+    """ISO 时间字符串 → 1970-01-01 起的微秒整数；
+    带时区或格式不标准（无法原样还原）的字符串返回 None"""
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None or dt.isoformat() != value:
+        return None
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def unpack_timestamp(value: int) -> str:
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+class Record(MutableMapping):
+    """紧凑的记录对象：固定字段存在 __slots__ 里，用法与 dict 相同
+
+    - category 和标签做 sys.intern，成千上万条记录共用同一个字符串对象
+    - tags 存为 tuple
+    - created_at / updated_at 存为微秒整数，读取时还原成原来的 ISO 字符串（逐字节一致）
+    - 未知字段以及无法压缩的值放在 _extra 字典里，保证写回文件时内容不变
+    - content 可以是外置正文的引用（LazyContent）或压缩正文（CompressedContent），读取时才加载/解压
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET = frozenset()
+
+    def __init__(self, data: Dict = None):
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                if key in _TIME_FIELDS:
+                    return unpack_timestamp(value)
+                if type(value) in STORAGE_SUFFIXES:
+                    return value.load()
+                return value
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            if key in _TIME_FIELDS:
+                packed = pack_timestamp(value) if type(value) is str else None
+                if packed is None:
+                    self._set_extra(key, value)
+                    return
+                value = packed
+            elif key == "category" and type(value) is str:
+                value = sys.intern(value)
+            elif key == "tags" and isinstance(value, (list, tuple)):
+                value = tuple(sys.intern(tag) if type(tag) is str else tag for tag in value)
+            if self._extra is not None:
+                self._extra.pop(key, None)
+            setattr(self, key, value)
+        else:
+            self._set_extra(key, value)
+
+    def _set_extra(self, key, value):
+        if key in self._FIELD_SET and hasattr(self, key):
+            delattr(self, key)
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET and hasattr(self, key):
+            delattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for field in self.FIELDS if hasattr(self, field))
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def external(self, key):
+        """字段是外置/压缩正文时返回对应的正文对象，否则返回 None（不触发读取）"""
+        value = getattr(self, key, None) if key in self._FIELD_SET else None
+        return value if type(value) in STORAGE_SUFFIXES else None
+
+    def to_dict(self, resolve: bool = True) -> Dict:
+        """转换成普通 dict；resolve=False 时外置/压缩正文写成 content_ref / content_z（存储引擎写文件用）"""
+        if resolve:
+            return dict(self)
+        data = {}
+        for key in self:
+            lazy = self.external(key)
+            if lazy is None:
+                data[key] = self[key]
+            else:
+                data[key + STORAGE_SUFFIXES[type(lazy)]] = lazy.ref()
+        return data
+
+    def state(self) -> tuple:
+        """快照缓存用的内部表示：按 FIELDS 顺序的原始值（缺失为 Ellipsis），末尾为 _extra 的副本；
+        外置/压缩正文与 to_dict(resolve=False) 一样写成 content_ref / content_z 放进 _extra"""
+        values = []
+        extra = dict(self._extra) if self._extra else None
+        for field in self.FIELDS:
+            value = getattr(self, field, Ellipsis)
+            if type(value) in STORAGE_SUFFIXES:
+                if extra is None:
+                    extra = {}
+                extra[field + STORAGE_SUFFIXES[type(value)]] = value.ref()
+                value = Ellipsis
+            values.append(value)
+        values.append(extra)
+        return tuple(values)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "Record":
+        """由 state() 的结果还原记录，不经过 __setitem__ 的逐字段转换"""
+        record = cls.__new__(cls)
+        record._restore(state)
+        if Ellipsis in state:
+            for field, value in zip(cls.FIELDS, state):
+                if value is Ellipsis:
+                    delattr(record, field)
+        return record
+
+    def _restore(self, state: tuple):
+        for field, value in zip(self.FIELDS, state):
+            setattr(self, field, value)
+        self._extra = state[-1]
+
+
+def storage_dict(record) -> Dict:
+    """写文件用的普通 dict：外置正文保持引用形式，不读入内存"""
+    if isinstance(record, Record):
+        return record.to_dict(resolve=False)
+    return dict(record)
+
+
+class PromptRecord(Record):
+    """Prompt 与 API 文档"""
+    __slots__ = ("id", "name", "category", "tags", "content", "usage_count", "created_at", "updated_at", "_extra")
+    FIELDS = ("id", "name", "category", "tags", "content", "usage_count", "created_at", "updated_at")
+    _FIELD_SET = frozenset(FIELDS)
+
+    def _restore(self, state: tuple):
+        # 逐个写 slot 比通用的 setattr 循环快得多（启动时每条记录调用一次）
+        (self.id, self.name, self.category, self.tags, self.content, self.usage_count,
+         self.created_at, self.updated_at, self._extra) = state
+
+
+class ApiKeyRecord(Record):
+    """API 密钥"""
+    __slots__ = ("id", "name", "key", "category", "usage_count", "created_at", "updated_at", "_extra")
+    FIELDS = ("id", "name", "key", "category", "usage_count", "created_at", "updated_at")
+    _FIELD_SET = frozenset(FIELDS)
+
+    def _restore(self, state: tuple):
+        (self.id, self.name, self.key, self.category, self.usage_count,
+         self.created_at, self.updated_at, self._extra) = state
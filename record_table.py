@@ -0,0 +1,84 @@
+from typing import List, Dict, Optional, Iterator
+
+from record import storage_dict
+
+
+class RecordTable:
+    """按插入顺序保存记录，并维护 id→记录、id→位置 两个索引
+
+    删除时只把对应槽位置空（O(1)），空槽超过一半时再整体压实，
+    因此按 id 查找、更新、删除都是常数时间，列表顺序始终与插入顺序一致。
+    """
+
+    def __init__(self, records: Optional[List[Dict]] = None):
+        self._slots: List[Optional[Dict]] = []
+        self._by_id: Dict[str, Dict] = {}
+        self._pos: Dict[str, int] = {}
+        self._holes = 0
+        for record in records or []:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for record in self._slots:
+            if record is not None:
+                yield record
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._by_id
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        return self._by_id.get(record_id)
+
+    def get_many(self, record_ids) -> List[Dict]:
+        """按给定顺序把一组（都存在的）id 换成记录"""
+        return list(map(self._by_id.__getitem__, record_ids))
+
+    def position(self, record_id: str) -> Optional[int]:
+        """记录在插入顺序中的位置（可用于给 id 集合排序）"""
+        return self._pos.get(record_id)
+
+    def in_order(self, record_ids) -> List[Dict]:
+        """把一组 id 按插入顺序换成记录"""
+        ordered = sorted((i for i in record_ids if i in self._pos), key=self._pos.__getitem__)
+        return [self._by_id[i] for i in ordered]
+
+    def append(self, record: Dict):
+        record_id = record["id"]
+        if record_id in self._pos:
+            # 同 id 重复加入时原位替换
+            self._slots[self._pos[record_id]] = record
+        else:
+            self._pos[record_id] = len(self._slots)
+            self._slots.append(record)
+        self._by_id[record_id] = record
+
+    def remove(self, record_id: str) -> Optional[Dict]:
+        record = self._by_id.pop(record_id, None)
+        if record is None:
+            return None
+        self._slots[self._pos.pop(record_id)] = None
+        self._holes += 1
+        if self._holes > len(self._by_id):
+            self._compact()
+        return record
+
+    def _compact(self):
+        self._slots = [record for record in self._slots if record is not None]
+        self._pos = {record["id"]: i for i, record in enumerate(self._slots)}
+        self._holes = 0
+
+    def values(self) -> List[Dict]:
+        """按插入顺序返回所有记录（新列表，调用方修改不影响索引）"""
+        if self._holes:
+            self._compact()
+        return list(self._slots)
+
+    def snapshot(self) -> List[Dict]:
+        """转换成普通 dict 的浅拷贝，供写文件使用（后台写线程中调用）
+
+        不压实、不修改任何内部结构；拷贝时主线程若恰好在修改某条记录，
+        这次修改本身还会再安排一次写入，最终落盘的总是最新内容"""
+        return [storage_dict(record) for record in list(self._slots) if record is not None]
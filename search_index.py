@@ -0,0 +1,364 @@
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from itertools import chain, repeat
+from typing import List, Dict, Optional, Set, Tuple
+
+from content_store import TextCache
+from pinyin import PinyinIndex
+
+# 中日韩文字（含假名、谚文）按字切分，其余字母数字按词切分
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RE = re.compile(f"[{_CJK_CHARS}]")
+_CJK_BIGRAM_RE = re.compile(f"(?=([{_CJK_CHARS}]{{2}}))")
+_WORD_RE = re.compile(f"[^\\W{_CJK_CHARS}]+")
+_RUN_RE = re.compile(f"[{_CJK_CHARS}]+|[^\\W{_CJK_CHARS}]+")
+
+_SPACE_RE = re.compile(r"\s+")
+
+# 过短的词片段几乎能匹配整个词表，不参与候选计算，只在校验阶段生效
+_MIN_FRAGMENT = 2
+
+# 缓存文本中字段之间的分隔符：它属于空白，规范化后的字段和查询里都不会出现
+FIELD_SEPARATOR = "\x1f"
+
+
+def normalize_text(text: str) -> str:
+    """搜索用的规范化：全角转半角（NFKC）、大小写折叠、连续空白合并为一个空格"""
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).casefold())
+
+
+def tokenize(text: str) -> Set[str]:
+    """把（已规范化的）文本切成索引词：英文/数字按词，中文取相邻双字"""
+    terms = set(_WORD_RE.findall(text))
+    terms.update(_CJK_BIGRAM_RE.findall(text))
+    return terms
+
+
+def analyze_query(query: str) -> Tuple[List[str], List[Tuple[str, bool, bool]]]:
+    """拆分查询：返回 (必须精确命中的词, 词片段列表)
+
+    查询是记录中某段文本的子串，所以查询内部两侧都有边界的英文词一定是完整的词；
+    贴着查询首尾的英文词只能确定是某个词的后缀/前缀/片段。
+    中文串的相邻双字无论位置如何都一定出现在记录里；单个汉字不构成约束，只在校验阶段生效。
+    片段以 (文本, 左侧有边界, 右侧有边界) 表示。
+    """
+    exact = []
+    fragments = []
+    for match in _RUN_RE.finditer(query):
+        run = match.group()
+        if _CJK_RE.match(run):
+            exact.extend(run[i:i + 2] for i in range(len(run) - 1))
+            continue
+        left_bounded = match.start() > 0
+        right_bounded = match.end() < len(query)
+        if left_bounded and right_bounded:
+            exact.append(run)
+        elif len(run) >= _MIN_FRAGMENT:
+            fragments.append((run, left_bounded, right_bounded))
+    return exact, fragments
+
+
+class SearchIndex:
+    """倒排索引：索引词 → 记录 id 集合，随增删改增量维护
+
+    每条记录还缓存一份规范化后的搜索文本（各字段按 fields 的顺序以 FIELD_SEPARATOR 分隔，
+    列表字段的各项以换行分隔，规范化后的字段里不会再有这两种字符），校验一条记录只需一次子串判断。
+    倒排索引给出的候选集保证是真实结果的超集，因此搜索结果与逐条校验全部记录完全一致。
+    外置或压缩的正文只参与建索引，不缓存文本；校验时才读取（压缩正文经 LRU 缓存解压）。
+    pinyin_fields 中字段的汉字另按音节存进拼音索引（见 pinyin.PinyinIndex），不进缓存文本，
+    只从音节开头匹配，因此输入 "xzs" 能搜到 "写作手册"，"ouc" 则不能。
+
+    与 fuzzy_index.TrigramIndex 相同，每条记录编一个递增的序号，posting 是序号的 array('I')
+    （每个条目 4 字节，集合里的一个 id 要几十字节）。修改或删除时旧序号作废，不从 posting 中立即删除；
+    作废的条目多于有效条目时整体清理一次。
+    """
+
+    def __init__(self, fields: Tuple[str, ...], pinyin_fields: Tuple[str, ...] = ()):
+        self.fields = fields
+        self.pinyin_fields = pinyin_fields
+        self._postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        self._ordinals: Dict[str, int] = {}  # id → 当前序号
+        self._ids: List[Optional[str]] = []  # 序号 → id，作废的序号为 None
+        self._dead = 0  # posting 中作废条目的数量
+        self._blobs: Dict[str, str] = {}
+        self._external: Dict[str, list] = {}  # id → [(字段位置, 外置/压缩正文对象)]
+        self._external_texts = TextCache(4 * 1024 * 1024)  # 最近校验过的外置/压缩正文（已规范化）
+        self._words: Set[str] = set()  # 非中文词表，用于片段匹配
+        self._pinyin = PinyinIndex()
+        self._field_chars = [0] * len(fields)  # 各字段规范化文本的总字符数（排序时算平均长度）
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def _record_blob(self, record: Dict) -> Tuple[str, List[str]]:
+        """缓存的搜索文本（外置正文所在的字段留空）和 pinyin_fields 中字段的规范化值"""
+        segments = []
+        pinyin_values = []
+        external = getattr(record, "external", None)
+        for field in self.fields:
+            value = record.get(field) if external is None or external(field) is None else None
+            if not value:
+                segments.append("")
+                continue
+            values = [normalize_text(value)] if isinstance(value, str) else [normalize_text(v) for v in value]
+            segments.append("\n".join(values))
+            if field in self.pinyin_fields:
+                pinyin_values.extend(values)
+        return FIELD_SEPARATOR.join(segments), pinyin_values
+
+    def _external_text(self, lazy) -> str:
+        text = self._external_texts.get(lazy)
+        if text is None:
+            text = normalize_text(lazy.load(cache=False))
+            self._external_texts.put(lazy, text)
+        return text
+
+    def _external_refs(self, record: Dict) -> list:
+        external = getattr(record, "external", None)
+        if external is None:
+            return []
+        return [(i, lazy) for i, lazy in enumerate(map(external, self.fields)) if lazy is not None]
+
+    def _index_text(self, blob: str, refs: list, sign: int) -> str:
+        """累计（sign=1）或扣除（sign=-1）各字段的字符数，返回含外置正文的完整切词文本"""
+        totals = self._field_chars
+        for i, segment in enumerate(blob.split(FIELD_SEPARATOR)):
+            totals[i] += sign * len(segment)
+        if not refs:
+            return blob
+        # 外置/压缩正文读出来只用于切词和计长度，不缓存
+        texts = []
+        for i, lazy in refs:
+            text = normalize_text(lazy.load(cache=False))
+            totals[i] += sign * len(text)
+            texts.append(text)
+        return "\n".join([blob] + texts)
+
+    def matches(self, record_id: str, needle: str) -> bool:
+        """needle 需先经过 normalize_text"""
+        if needle in self._blobs.get(record_id, ""):
+            return True
+        refs = self._external.get(record_id)
+        # needle 里不会有换行，逐个字段判断与拼接后判断等价
+        return refs is not None and any(needle in self._external_text(lazy) for _, lazy in refs)
+
+    def field_texts(self, record_id: str) -> List[str]:
+        """按 fields 顺序返回各字段的规范化文本（外置正文经 LRU 缓存读取）"""
+        segments = self._blobs.get(record_id, "").split(FIELD_SEPARATOR)
+        for i, lazy in self._external.get(record_id, ()):
+            segments[i] = self._external_text(lazy)
+        return segments
+
+    def average_lengths(self) -> List[float]:
+        """各字段规范化文本的平均字符数"""
+        count = max(len(self._blobs), 1)
+        return [total / count for total in self._field_chars]
+
+    def pinyin_ids(self, needle: str) -> List[str]:
+        """拼音能从音节开头拼出 needle（需先经过 normalize_text，空格忽略）的记录 id"""
+        if not self.pinyin_fields:
+            return []
+        return self._pinyin.search(needle.replace(" ", ""))
+
+    def document_frequency(self, term: str) -> Optional[int]:
+        """含有索引词 term 的记录数（含尚未清理的作废条目，最多多出一倍）；
+        term 不是索引词（英文词片段、单个汉字）时返回 None"""
+        posting = self._postings.get(term)
+        return len(posting) if posting else None
+
+    def add(self, record: Dict):
+        record_id = record["id"]
+        if record_id in self._blobs:
+            self.remove(record_id)
+        blob, pinyin_values = self._record_blob(record)
+        self._blobs[record_id] = blob
+        if pinyin_values:
+            self._pinyin.add(record_id, pinyin_values)
+        refs = self._external_refs(record)
+        if refs:
+            self._external[record_id] = refs
+        blob = self._index_text(blob, refs, 1)
+        words = set(_WORD_RE.findall(blob))
+        bigrams = set(_CJK_BIGRAM_RE.findall(blob))
+        self._words |= words
+        ordinal = len(self._ids)
+        self._ids.append(record_id)
+        self._ordinals[record_id] = ordinal
+        # 建索引是加载时的热点：用 map 在 C 层完成逐词的 posting.append(ordinal)
+        terms = chain(words, bigrams)
+        deque(map(array.append, map(self._postings.__getitem__, terms), repeat(ordinal)), maxlen=0)
+
+    def update(self, record: Dict):
+        self.add(record)
+
+    def remove(self, record_id: str):
+        blob = self._blobs.pop(record_id, None)
+        if blob is None:
+            return
+        self._pinyin.remove(record_id)
+        # 引用仍指向旧正文（外置文件只追加、压缩正文不可变），可以还原当时的长度
+        self._index_text(blob, self._external.pop(record_id, None), -1)
+        self._ids[self._ordinals.pop(record_id)] = None
+        self._dead += 1
+        if self._dead > max(len(self._ordinals), 1024):
+            self._compact()
+
+    def _compact(self):
+        """从 posting 中清除作废的序号，不再有记录的词移出词表"""
+        ids = self._ids
+        for term in list(self._postings):
+            live = array('I', (ordinal for ordinal in self._postings[term] if ids[ordinal] is not None))
+            if live:
+                self._postings[term] = live
+            else:
+                del self._postings[term]
+                self._words.discard(term)
+        self._dead = 0
+
+    def _fragment_ordinals(self, fragment: str, left_bounded: bool, right_bounded: bool) -> Set[int]:
+        """片段可能命中的所有词的 posting 并集（序号）"""
+        if left_bounded:
+            words = [w for w in self._words if w.startswith(fragment)]
+        elif right_bounded:
+            words = [w for w in self._words if w.endswith(fragment)]
+        else:
+            words = [w for w in self._words if fragment in w]
+        ordinals = set()
+        for word in words:
+            ordinals.update(self._postings[word])
+        return ordinals
+
+    def candidates(self, needle: str) -> Optional[Set[str]]:
+        """返回候选 id 集合（needle 需先经过 normalize_text）；
+        查询里没有可索引的内容时返回 None，表示需要全量扫描"""
+        exact, fragments = analyze_query(needle)
+        if not exact and not fragments:
+            return None
+
+        postings = []
+        for term in exact:
+            posting = self._postings.get(term)
+            if not posting:
+                return set()
+            postings.append(posting)
+
+        result = None
+        if postings:
+            postings.sort(key=len)
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result.intersection_update(posting)
+                if not result:
+                    return set()
+
+        for fragment, left_bounded, right_bounded in fragments:
+            # 候选已经很少时直接交给校验，省去扫描词表
+            if result is not None and len(result) <= 64:
+                break
+            ordinals = self._fragment_ordinals(fragment, left_bounded, right_bounded)
+            result = ordinals if result is None else result & ordinals
+            if not result:
+                return set()
+        if result is None:
+            return None
+        ids = self._ids
+        return {ids[ordinal] for ordinal in result if ids[ordinal] is not None}
+
+
+class NarrowingCache:
+    """最近几次 (查询, 分类) → 结果 id 列表
+
+    子串语义下，新查询包含旧查询且分类相同时，新结果一定是旧结果的子集，
+    逐字输入时只需在上一次的结果里继续过滤。数据版本号变化时整体失效。
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self.version = None
+        self._entries: List[Tuple[str, Optional[str], List[str]]] = []
+
+    def lookup(self, version: int, needle: str, category: Optional[str]) -> Optional[List[str]]:
+        """返回可作为候选的最小旧结果，没有可用的返回 None"""
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+            return None
+        best = None
+        for old_needle, old_category, ids in self._entries:
+            if old_category == category and old_needle in needle:
+                if best is None or len(ids) < len(best):
+                    best = ids
+        return best
+
+    def store(self, version: int, needle: str, category: Optional[str], ids: List[str]):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        self._entries = [e for e in self._entries if (e[0], e[1]) != (needle, category)]
+        self._entries.append((needle, category, ids))
+        if len(self._entries) > self.size:
+            del self._entries[0]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class QueryCache:
+    """(分区, 查询, 分类, 排序方式, 条数) → 结果 id 列表的 LRU 缓存
+
+    每条结果记下它所依赖的数据版本（见 Collection.search_version），取出时版本不同即作废，
+    增删改之后只有受影响的分区、受影响的排序方式重新搜索。容量同时按条目数和 id 总数限制，
+    超出时淘汰最久未用的条目；hits / misses / evictions 计数用于调整大小。
+    """
+
+    def __init__(self, size: int = 64, max_ids: int = 500000):
+        self.size = size
+        self.max_ids = max_ids
+        self._entries: "OrderedDict[tuple, Tuple[tuple, List[str]]]" = OrderedDict()
+        self._total_ids = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: tuple, version: tuple) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            # 数据已变化：旧结果不会再用到
+            self._discard(key)
+        self.misses += 1
+        return None
+
+    def store(self, key: tuple, version: tuple, ids: List[str]):
+        if len(ids) > self.max_ids:
+            return
+        self._discard(key)
+        self._entries[key] = (version, ids)
+        self._total_ids += len(ids)
+        while len(self._entries) > self.size or self._total_ids > self.max_ids:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._total_ids -= len(evicted)
+            self.evictions += 1
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_ids -= len(entry[1])
+
+    def clear(self):
+        self._entries.clear()
+        self._total_ids = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "ids": self._total_ids, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
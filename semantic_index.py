@@ -0,0 +1,289 @@
+import json
+import math
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+    from numpy.lib.format import open_memmap
+except ImportError:
+    np = None
+
+from search_index import normalize_text
+
+# 语义搜索（离线，不联网、不需要 GPU）：字符 n-gram 哈希 TF-IDF 向量 + 余弦相似度
+#
+# 文本规范化后按词切开，每个词首尾各补一个空格，取其中全部长度为 NGRAM_SIZES 的字符片段，
+# 用 crc32 哈希到 DIMENSIONS 个桶里（哈希技巧，不需要词表，增删记录也不用重新编号）。
+# 中文没有空格，连续的汉字整段是一个“词”，二字片段正好对应常见的双字词。
+# 每个词的桶号数组只算一次（缓存），一条记录的词频是各词桶号拼接后的 bincount。
+#
+# 每条记录一行 float32：桶里存亚线性词频 1 + ln(tf)。idf 随文档频率变化，不写进矩阵，
+# 查询时再乘上：
+#   idf = ln((N + 1) / (df + 1)) + 1
+#   相似度 = Σ q·d·idf² / (‖q·idf‖ · ‖d·idf‖)
+# 各行的 ‖d·idf‖ 在两次修改之间缓存，查询只需一次稠密的矩阵 × 向量，取前 k 条用 argpartition。
+#
+# 矩阵是连续的二维数组，保存为 .npy 文件并以内存映射方式打开。建立时预留约 1/4 的空行，
+# 之后逐条新增不必马上扩容；空行用完时再扩容 1/4（扩容要复制整个矩阵，步子小一些内存不会一下翻倍）。
+# 旁边的 .json 记录每行对应的 id 与索引文本的 crc32。下次启动时文本没变的行直接沿用，
+# 只有新增和修改过的记录需要重新计算。修改后、正常保存前 json 标记为未完成，
+# 中途退出时下次整份重建。删除一行时把最后一行移进空位，矩阵始终紧凑。
+#
+# numpy 为可选依赖，未安装时语义搜索不可用（Collection 改用容错搜索）。
+
+DIMENSIONS = 2048
+NGRAM_SIZES = (2, 3, 4)
+TEXT_CHARS = 2048
+MIN_SCORE = 0.05
+MAX_RESULTS = 50
+FORMAT = 1
+# 计算行范数时每批处理的行数（限制临时数组的大小）
+_CHUNK_ROWS = 8192
+_MIN_CAPACITY = 256
+# 建立和扩容时在所需行数之外预留的比例
+_HEADROOM = 0.25
+_BUCKET_CACHE_LIMIT = 1 << 18
+
+_WORD_RE = re.compile(r"\w+")
+_warned = False
+
+
+def available() -> bool:
+    """numpy 是否可用；第一次发现不可用时提示一次"""
+    global _warned
+    if np is None and not _warned:
+        _warned = True
+        print("numpy 未安装，语义搜索改用容错搜索")
+    return np is not None
+
+
+def ngrams(word: str) -> List[str]:
+    """一个（已规范化的）词首尾补空格后的全部字符 n-gram"""
+    padded = f" {word} "
+    return [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+
+
+class _WordBuckets(dict):
+    """词 → 其 n-gram 桶号数组的缓存；同一个词在各记录间大量重复，只算一次"""
+
+    def __missing__(self, word: str):
+        if len(self) >= _BUCKET_CACHE_LIMIT:
+            self.clear()
+        buckets = self[word] = np.array([zlib.crc32(gram.encode('utf-8')) % DIMENSIONS
+                                         for gram in ngrams(word)], dtype=np.intp)
+        return buckets
+
+
+_word_buckets = _WordBuckets()
+
+
+def term_frequencies(text: str) -> "np.ndarray":
+    """文本（前 TEXT_CHARS 个字符）的词频向量：各桶为 1 + ln(tf)，没有出现的桶为 0"""
+    words = _WORD_RE.findall(normalize_text(text[:TEXT_CHARS]))
+    if not words:
+        return np.zeros(DIMENSIONS, dtype=np.float32)
+    buckets = np.concatenate(list(map(_word_buckets.__getitem__, words)))
+    counts = np.bincount(buckets, minlength=DIMENSIONS).astype(np.float32)
+    present = counts > 0
+    counts[present] = 1.0 + np.log(counts[present])
+    return counts
+
+
+def _with_headroom(count: int) -> int:
+    return count + max(int(count * _HEADROOM), _MIN_CAPACITY)
+
+
+def checksum(text: str) -> int:
+    return zlib.crc32(text[:TEXT_CHARS].encode('utf-8'))
+
+
+class SemanticIndex:
+    """记录 id → 矩阵中的一行，随增删改增量维护；path 为 None 时只在内存中"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._meta_path = path.with_suffix(".json") if path is not None else None
+        self._ids: List[str] = []  # 行号 → id
+        self._rows: Dict[str, int] = {}  # id → 行号
+        self._checksums: List[int] = []  # 行号 → 索引文本的 crc32
+        self._matrix = np.zeros((_MIN_CAPACITY, DIMENSIONS), dtype=np.float32)
+        self._df = np.zeros(DIMENSIONS, dtype=np.int64)  # 各桶出现在多少行里
+        self._norms: Optional["np.ndarray"] = None  # 各行 ‖d·idf‖ 的缓存，修改后作废
+        self._saved = True  # 磁盘上的 json 与矩阵一致
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ==================== 建立与保存 ====================
+
+    def build(self, items: Iterable[Tuple[str, str]]):
+        """按 (id, 文本) 建立索引；磁盘上有可用的矩阵时沿用文本没变的行"""
+        items = list(items)
+        if self._open():
+            wanted = {record_id: checksum(text) for record_id, text in items}
+            stale = [record_id for record_id, row in self._rows.items()
+                     if wanted.get(record_id) != self._checksums[row]]
+            for record_id in stale:
+                self.remove(record_id)
+            items = [(record_id, text) for record_id, text in items if record_id not in self._rows]
+        elif self.path is not None:
+            self._matrix = self._create(self.path, _with_headroom(len(items)))
+        self._reserve(len(self._ids) + len(items))
+        for record_id, text in items:
+            self.add(record_id, text)
+        self.save()
+
+    def _open(self) -> bool:
+        """读入磁盘上的矩阵和行表；文件缺失、格式不符或上次没有正常保存时返回 False"""
+        if self.path is None or not self.path.exists() or not self._meta_path.exists():
+            return False
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get("format") != FORMAT or meta.get("dimensions") != DIMENSIONS
+                    or meta.get("ngrams") != list(NGRAM_SIZES) or not meta.get("clean")):
+                return False
+            ids, checksums = meta["ids"], meta["checksums"]
+            matrix = np.load(self.path, mmap_mode="r+")
+            if matrix.dtype != np.float32 or matrix.shape[1] != DIMENSIONS or matrix.shape[0] < len(ids):
+                return False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Discarding semantic index {self.path.name}: {e}")
+            return False
+        self._matrix = matrix
+        self._ids = list(ids)
+        self._rows = {record_id: row for row, record_id in enumerate(ids)}
+        self._checksums = list(checksums)
+        count = len(ids)
+        for start in range(0, count, _CHUNK_ROWS):
+            self._df += np.count_nonzero(matrix[start:min(start + _CHUNK_ROWS, count)], axis=0)
+        return True
+
+    @staticmethod
+    def _create(path: Path, capacity: int):
+        return open_memmap(path, mode="w+", dtype=np.float32, shape=(capacity, DIMENSIONS))
+
+    def _reserve(self, count: int):
+        """保证矩阵至少有 count 行；扩容时（连同预留的空行）复制到新文件再替换旧文件"""
+        capacity = self._matrix.shape[0]
+        if count <= capacity:
+            return
+        capacity = _with_headroom(count)
+        used = len(self._ids)
+        if self.path is None:
+            matrix = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        else:
+            self._mark_unsaved()
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            matrix = self._create(tmp_path, capacity)
+        matrix[:used] = self._matrix[:used]
+        if self.path is not None:
+            matrix.flush()
+            os.replace(tmp_path, self.path)
+        self._matrix = matrix
+
+    def save(self):
+        """矩阵写回磁盘，并记下每行对应的 id（退出时调用）"""
+        if self.path is None or self._saved:
+            return
+        self._matrix.flush()
+        self._write_meta(True)
+        self._saved = True
+
+    def _mark_unsaved(self):
+        # 第一次修改前先把 json 标记为未完成：中途退出时磁盘上的矩阵与行表可能对不上
+        if self._saved and self.path is not None:
+            self._write_meta(False)
+        self._saved = False
+
+    def _write_meta(self, clean: bool):
+        meta = {"format": FORMAT, "dimensions": DIMENSIONS, "ngrams": list(NGRAM_SIZES), "clean": clean,
+                "ids": self._ids if clean else [], "checksums": self._checksums if clean else []}
+        tmp_path = self._meta_path.with_name(self._meta_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path)
+
+    # ==================== 增删改 ====================
+
+    def add(self, record_id: str, text: str):
+        if record_id in self._rows:
+            self.remove(record_id)
+        self._mark_unsaved()
+        row = len(self._ids)
+        self._reserve(row + 1)
+        vector = term_frequencies(text)
+        self._matrix[row] = vector
+        self._df += vector > 0
+        self._ids.append(record_id)
+        self._rows[record_id] = row
+        self._checksums.append(checksum(text))
+        self._norms = None
+
+    def update(self, record_id: str, text: str):
+        self.add(record_id, text)
+
+    def remove(self, record_id: str):
+        row = self._rows.pop(record_id, None)
+        if row is None:
+            return
+        self._mark_unsaved()
+        matrix = self._matrix
+        self._df -= matrix[row] > 0
+        # 最后一行移进空位
+        last = len(self._ids) - 1
+        if row != last:
+            matrix[row] = matrix[last]
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._checksums[row] = self._checksums[last]
+            self._rows[moved] = row
+        self._ids.pop()
+        self._checksums.pop()
+        self._norms = None
+
+    # ==================== 查询 ====================
+
+    def _idf(self) -> "np.ndarray":
+        count = len(self._ids)
+        return (np.log((count + 1) / (self._df + 1)) + 1.0).astype(np.float32)
+
+    def _row_norms(self, idf_squared: "np.ndarray") -> "np.ndarray":
+        if self._norms is None:
+            count = len(self._ids)
+            norms = np.empty(count, dtype=np.float32)
+            for start in range(0, count, _CHUNK_ROWS):
+                block = self._matrix[start:min(start + _CHUNK_ROWS, count)]
+                norms[start:start + len(block)] = np.sqrt(np.square(block) @ idf_squared)
+            self._norms = norms
+        return self._norms
+
+    def search(self, query: str, limit: Optional[int] = MAX_RESULTS,
+               min_score: float = MIN_SCORE) -> List[Tuple[str, float]]:
+        """与 query 余弦相似度不低于 min_score 的记录，按相似度从高到低返回前 limit 条 (id, 相似度)；
+        limit 为 None 时返回全部"""
+        count = len(self._ids)
+        if not count:
+            return []
+        weights = term_frequencies(query)
+        idf = self._idf()
+        query_norm = math.sqrt(float(np.square(weights * idf).sum()))
+        if not query_norm:
+            return []
+        idf_squared = idf * idf
+        norms = self._row_norms(idf_squared)
+        scores = self._matrix[:count] @ (weights * idf_squared)
+        scores /= np.maximum(norms, 1e-12) * query_norm
+        hits = np.flatnonzero(scores >= min_score)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        # 相似度相同时按行号排列
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        ids = self._ids
+        return [(ids[row], float(scores[row])) for row in hits]
@@ -0,0 +1,74 @@
+import marshal
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+# 二进制快照缓存：与 JSON 文件内容相同，只为加快启动；JSON 仍是唯一可信的数据源与导出格式
+#
+# 文件布局（小端）：
+#   头部  魔数 b"PMSNAP" | 格式版本 u16 | 源 JSON 的 mtime_ns i64 | 源 JSON 字节数 i64
+#         | 数据段字节数 u64 | 数据段 crc32 u32
+#   数据段  marshal 序列化的 (记录类型名, 字段表, 记录行)
+#     字段表    记录类型的 FIELDS，行内按这个顺序存放，不再逐条重复字段名
+#     记录行    Record.state()：字段的内部表示（时间戳为整数），缺失字段为 Ellipsis，末尾为 _extra
+#
+# 分类和标签在记录里已经 sys.intern（见 record.Record），同一个值在各记录间是同一个对象；
+# marshal 对同一对象只写一次，之后写成对它的引用，读回时各记录也共用同一个字符串对象。
+#
+# 头部记录的源 JSON 大小和修改时间与当前文件不一致（JSON 被重写或手工编辑过）、
+# 版本不符、校验失败、字段表变化时快照作废，改为解析 JSON。
+MAGIC = b"PMSNAP"
+VERSION = 2
+_HEADER = struct.Struct("<6sHqqQI")
+
+
+def _source_stamp(source: Path):
+    stat = source.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def record_states(records) -> List[tuple]:
+    """复制记录的内部表示（与 snapshot_records 同时调用，保证快照缓存与 JSON 内容一致）"""
+    return [record.state() for record in list(records) if record is not None]
+
+
+def write_snapshot(path: Path, source: Path, record_type, rows: List[tuple]):
+    """把 record_states() 的结果写成 source（刚写出的 JSON）对应的快照缓存"""
+    mtime_ns, size = _source_stamp(source)
+    payload = marshal.dumps((record_type.__name__, record_type.FIELDS, rows), 4)
+    header = _HEADER.pack(MAGIC, VERSION, mtime_ns, size, len(payload), zlib.crc32(payload))
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: Path, source: Path, record_type, label: str) -> Optional[List]:
+    """读取快照缓存，得到可直接使用的记录对象；缓存不存在或已失效时返回 None"""
+    if not path.exists() or not source.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, mtime_ns, size, length, checksum = _HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or (mtime_ns, size) != _source_stamp(source):
+                return None
+            payload = f.read(length)
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            print(f"Discarding corrupt {label} snapshot cache")
+            return None
+        type_name, fields, rows = marshal.loads(payload)
+        if type_name != record_type.__name__ or tuple(fields) != record_type.FIELDS:
+            return None
+        return [record_type.from_state(row) for row in rows]
+    except Exception as e:
+        print(f"Error loading {label} snapshot cache: {e}")
+        return None
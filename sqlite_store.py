@@ -0,0 +1,238 @@
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from search_index import normalize_text
+from storage import JournalStore
+
+
+class SqliteStore:
+    """SQLite 存储：每个集合一张表，外加一张 FTS5 全文索引表
+
+    表结构：
+      <table>      seq 自增主键（保持插入顺序）、id 唯一索引、category 索引、data 整条记录 JSON
+      <table>_fts  name / category / tags / content 四列，trigram 分词，rowid 与 seq 对应
+
+    全文索引里存的是 normalize_text 规范化后的文本（全角转半角、大小写折叠、连续空白合并），
+    查询同样先规范化，trigram 分词让 MATCH 查询具备与内存扫描一致的子串语义，两种模式结果相同。
+    """
+
+    def __init__(self, db_path: Path, json_path: Path, label: str, content_field: str = "content"):
+        self.db_path = db_path
+        self.path = json_path
+        self.label = label
+        self.table = label
+        self.content_field = content_field
+        # 首次加载可能发生在后台预加载线程里；加载由 PromptManager 加锁串行，之后只在主线程使用
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        t = self.table
+        with self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {t} (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    category TEXT NOT NULL DEFAULT '',
+                    data TEXT NOT NULL
+                )""")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_category ON {t}(category)")
+            self.conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {t}_fts
+                USING fts5(name, category, tags, content, tokenize='trigram')""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    # ==================== 读写 ====================
+
+    def load(self) -> List[Dict]:
+        if not self._is_migrated():
+            self.migrate_from_json()
+        elif self._meta(f"fts_normalized_{self.table}") is None:
+            self._rebuild_fts()
+        rows = self.conn.execute(f"SELECT data FROM {self.table} ORDER BY seq")
+        return [json.loads(data) for (data,) in rows]
+
+    def _fts_values(self, record: Dict) -> tuple:
+        # 与内存索引相同的规范化（列表字段逐项规范化后以换行分隔）；
+        # 手工编辑过的数据里字段可能是 null 或类型不对，统一转成字符串
+        tags = record.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tags]
+        return (
+            normalize_text(str(record.get("name") or "")),
+            normalize_text(str(record.get("category") or "")),
+            "\n".join(normalize_text(str(tag)) for tag in tags if tag is not None),
+            normalize_text(str(record.get(self.content_field) or "")),
+        )
+
+    def _upsert(self, record: Dict):
+        t = self.table
+        self.conn.execute(
+            f"""INSERT INTO {t}(id, category, data) VALUES(?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET category=excluded.category, data=excluded.data""",
+            (record["id"], str(record.get("category") or ""), json.dumps(dict(record), ensure_ascii=False)))
+        (seq,) = self.conn.execute(f"SELECT seq FROM {t} WHERE id = ?", (record["id"],)).fetchone()
+        self.conn.execute(f"DELETE FROM {t}_fts WHERE rowid = ?", (seq,))
+        self.conn.execute(
+            f"INSERT INTO {t}_fts(rowid, name, category, tags, content) VALUES(?, ?, ?, ?, ?)",
+            (seq,) + self._fts_values(record))
+
+    def put_many(self, records: List[Dict], changed: List[Dict]):
+        with self.conn:
+            for record in changed:
+                self._upsert(record)
+
+    def patch(self, records: List[Dict], record_id: str, fields: Dict):
+        t = self.table
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE {t} SET data = json_patch(data, ?) WHERE id = ?",
+                (json.dumps(fields, ensure_ascii=False), record_id))
+            # 只有搜索相关字段变化时才需要刷新分类列和全文索引
+            if {"name", "category", "tags", self.content_field} & fields.keys():
+                row = self.conn.execute(f"SELECT data FROM {t} WHERE id = ?", (record_id,)).fetchone()
+                if row:
+                    self._upsert(json.loads(row[0]))
+
+    def delete_many(self, records: List[Dict], record_ids: List[str]):
+        t = self.table
+        with self.conn:
+            for record_id in record_ids:
+                row = self.conn.execute(f"SELECT seq FROM {t} WHERE id = ?", (record_id,)).fetchone()
+                if row:
+                    self.conn.execute(f"DELETE FROM {t}_fts WHERE rowid = ?", row)
+                    self.conn.execute(f"DELETE FROM {t} WHERE seq = ?", row)
+
+    def save(self, records: List[Dict]):
+        """整体替换（导入等批量场景），在一个事务内完成"""
+        t = self.table
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {t}_fts")
+            self.conn.execute(f"DELETE FROM {t}")
+            for record in records:
+                self._upsert(record)
+
+    def save_now(self, records: List[Dict]):
+        """save 本身就是同步的事务，失败时抛出异常"""
+        self.save(records)
+
+    def compact(self, records: List[Dict]):
+        self.conn.execute("PRAGMA optimize")
+
+    # ==================== 检索 ====================
+
+    def needs_snapshot(self) -> bool:
+        """数据库本身就是二进制格式，没有快照缓存"""
+        return False
+
+    def has_full_text_index(self) -> bool:
+        """搜索和排序都由 FTS5 完成，不需要在内存中另建搜索索引"""
+        return True
+
+    def search_ids(self, needle: str, category: Optional[str] = None) -> Optional[List[str]]:
+        """子串检索，返回按插入顺序排列的 id；needle 需先经过 normalize_text。
+        3 个字符以上走 FTS5 trigram 索引，更短的 trigram 无法命中，改为逐行 LIKE 扫描全文索引表"""
+        if len(needle) >= 3:
+            return [record_id for record_id, _ in self._query(needle, category)]
+        escaped = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        t = self.table
+        sql = f"""SELECT r.id FROM {t}_fts f JOIN {t} r ON r.seq = f.rowid
+                  WHERE (f.name LIKE ?1 ESCAPE '\\' OR f.category LIKE ?1 ESCAPE '\\'
+                         OR f.tags LIKE ?1 ESCAPE '\\' OR f.content LIKE ?1 ESCAPE '\\')"""
+        params = [f"%{escaped}%"]
+        if category:
+            sql += " AND r.category = ?2"
+            params.append(category)
+        sql += " ORDER BY r.seq"
+        return [record_id for (record_id,) in self.conn.execute(sql, params)]
+
+    def relevance(self, needle: str, category: Optional[str], weights: Dict[str, float]) -> Dict[str, float]:
+        """命中记录 id → 相关度（FTS5 bm25() 取负，越大越相关），weights 为各字段的权重；
+        needle 不足 3 个字符时 FTS5 无法打分，返回空字典"""
+        if len(needle) < 3:
+            return {}
+        columns = [weights.get(field, 0.0) for field in ("name", "category", "tags", self.content_field)]
+        return {record_id: -score for record_id, score in self._query(needle, category, columns)}
+
+    def _query(self, needle: str, category: Optional[str], weights: Optional[List[float]] = None):
+        """FTS5 短语查询，按插入顺序给出 (id, 得分)；weights 为空时不打分，得分为 0"""
+        t = self.table
+        score = f"bm25({t}_fts, ?, ?, ?, ?)" if weights else "0"
+        sql = f"""SELECT r.id, {score} FROM {t}_fts f JOIN {t} r ON r.seq = f.rowid
+                  WHERE {t}_fts MATCH ?"""
+        params = list(weights or []) + ['"' + needle.replace('"', '""') + '"']
+        if category:
+            sql += " AND r.category = ?"
+            params.append(category)
+        sql += " ORDER BY r.seq"
+        return self.conn.execute(sql, params)
+
+    # ==================== 迁移 ====================
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _is_migrated(self) -> bool:
+        return self._meta(f"migrated_{self.table}") is not None
+
+    def _rebuild_fts(self):
+        """早期版本的全文索引存的是原文：按数据表整体重建为规范化文本（只做一次）"""
+        t = self.table
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {t}_fts")
+            for seq, data in self.conn.execute(f"SELECT seq, data FROM {t}").fetchall():
+                self.conn.execute(
+                    f"INSERT INTO {t}_fts(rowid, name, category, tags, content) VALUES(?, ?, ?, ?, ?)",
+                    (seq,) + self._fts_values(json.loads(data)))
+            self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)",
+                              (f"fts_normalized_{t}", "1"))
+
+    def migrate_from_json(self) -> int:
+        """一次性把 ~/.prompt_manager/<label>.json（含未压缩的日志）导入数据库，原文件保留作备份
+
+        单条记录写不进去时跳过它；整体失败时回滚、不标记为已迁移（下次启动重试），返回 0
+        """
+        records = JournalStore(self.path, self.label).load()
+        migrated = 0
+        try:
+            with self.conn:
+                for record in records:
+                    if not isinstance(record, dict) or not record.get("id"):
+                        continue
+                    try:
+                        self._upsert(record)
+                        migrated += 1
+                    except (sqlite3.IntegrityError, sqlite3.ProgrammingError, TypeError, ValueError) as e:
+                        print(f"Skipping {self.label} record {record.get('id')} during migration: {e}")
+                self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)",
+                                  (f"migrated_{self.table}", str(migrated)))
+                self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)",
+                                  (f"fts_normalized_{self.table}", "1"))
+        except sqlite3.Error as e:
+            print(f"Error migrating {self.label} to {self.db_path.name}: {e}")
+            return 0
+        if migrated:
+            print(f"✓ 已迁移 {migrated} 条 {self.label} 到 {self.db_path.name}")
+        return migrated
+
+
+def migrate_data_dir(data_dir: Path) -> Dict[str, int]:
+    """把数据目录下三个 JSON 文件迁移到 library.db"""
+    db_path = data_dir / "library.db"
+    counts = {}
+    for label, content_field in (("prompts", "content"), ("api_docs", "content"), ("api_keys", "key")):
+        store = SqliteStore(db_path, data_dir / f"{label}.json", label, content_field)
+        counts[label] = store.migrate_from_json()
+        store.conn.close()
+    return counts
+
+
+if __name__ == "__main__":
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path.home() / ".prompt_manager"
+    print(migrate_data_dir(data_dir))
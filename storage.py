@@ -0,0 +1,333 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Callable
+
+from record import storage_dict
+from snapshot import read_snapshot, record_states, write_snapshot
+
+
+def read_json_list(path: Path, label: str) -> List[Dict]:
+    """读取 JSON 数组文件，文件不存在或格式不对时返回空列表"""
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                # 确保返回的是列表
+                if isinstance(data, list):
+                    return data
+                else:
+                    return []
+        except Exception as e:
+            print(f"Error loading {label}: {e}")
+            return []
+    return []
+
+
+def write_json_atomic(path: Path, data):
+    """先写临时文件再 rename，避免写到一半崩溃留下损坏的文件"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def snapshot_records(records) -> List[Dict]:
+    """在后台线程中复制记录：只做 C 层的列表/字典浅拷贝，不改动记录表本身"""
+    if hasattr(records, "snapshot"):
+        return records.snapshot()
+    return [dict(r) for r in list(records)]
+
+
+class WriteBehindWriter:
+    """后台写线程
+
+    主线程只需调用 schedule(key, job) 通知“某个文件脏了”；同一个 key 在一个短窗口内
+    的多次通知合并为一次写入（批量导入、连续复制都只写一次），写文件不再阻塞 GUI 线程。
+    job 在后台线程执行，需要自行从内存数据取快照。
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending: Dict[str, tuple] = {}  # key -> (到期时间, job)
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="prompt-manager-writer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, key: str, job: Callable, delay: Optional[float] = None, debounce: bool = False):
+        """debounce=True 时每次通知都把到期时间往后推（拖动窗口这类连续事件结束后才写一次）"""
+        due = time.monotonic() + (self.delay if delay is None else delay)
+        with self._cond:
+            if key in self._pending and not debounce:
+                # 已在排队：保留最早的到期时间，任务换成最新的
+                due = min(due, self._pending[key][0])
+            self._pending[key] = (due, job)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._pending:
+                        return
+                    if self._pending and not self._busy:
+                        now = time.monotonic()
+                        next_due = min(due for due, _ in self._pending.values())
+                        if next_due <= now or self._closed:
+                            break
+                        self._cond.wait(next_due - now)
+                    else:
+                        self._cond.wait()
+                now = time.monotonic()
+                ready = [key for key, (due, _) in self._pending.items() if due <= now or self._closed]
+                jobs = [self._pending.pop(key)[1] for key in ready]
+                self._busy = True
+            self._run_jobs(jobs)
+
+    def _run_jobs(self, jobs: List[Callable]):
+        try:
+            for job in jobs:
+                try:
+                    job()
+                except Exception as e:
+                    print(f"Write error: {e}")
+        finally:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self):
+        """立即写出所有排队的任务并等待完成（退出前调用）"""
+        with self._cond:
+            while self._busy:
+                self._cond.wait()
+            jobs = [job for _, job in self._pending.values()]
+            self._pending.clear()
+            self._busy = True
+        self._run_jobs(jobs)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+
+class JsonStore:
+    """整文件存储：每次变更都重写完整的 JSON 快照
+
+    传入 writer 时快照由后台线程合并写出（临时文件 + rename），否则同步写出。
+    传入 record_type 时每次写 JSON 都同时写出二进制快照缓存（同名 .snap，见 snapshot.py），
+    启动时缓存与 JSON 对应则直接读缓存，省去 JSON 解析和逐条构造记录。
+    """
+
+    def __init__(self, path: Path, label: str, writer: Optional[WriteBehindWriter] = None,
+                 record_type=None):
+        self.path = path
+        self.label = label
+        self.writer = writer
+        self.record_type = record_type
+        self.snapshot_path = path.with_suffix(".snap") if record_type is not None else None
+        self._snapshot_stale = False
+
+    def load(self) -> List[Dict]:
+        """快照缓存有效时返回记录对象，否则返回解析 JSON 得到的 dict"""
+        if self.snapshot_path is not None:
+            records = read_snapshot(self.snapshot_path, self.path, self.record_type, self.label)
+            if records is not None:
+                self._snapshot_stale = False
+                return records
+        records = read_json_list(self.path, self.label)
+        # JSON 读取失败时也是空列表，不能据此重写文件
+        self._snapshot_stale = self.snapshot_path is not None and len(records) > 0
+        return records
+
+    def needs_snapshot(self) -> bool:
+        """上次加载解析的是 JSON（缓存缺失或已过期），需要保存一次来重建快照缓存"""
+        return self._snapshot_stale
+
+    def put_many(self, records: List[Dict], changed: List[Dict]):
+        """新增或更新了一批记录（单条修改也走这里；整文件模式下同样只写一次）"""
+        self.save(records)
+
+    def patch(self, records: List[Dict], record_id: str, fields: Dict):
+        """记录的部分字段发生变化（如 usage_count）"""
+        self.save(records)
+
+    def delete_many(self, records: List[Dict], record_ids: List[str]):
+        self.save(records)
+
+    def save(self, records: List[Dict]):
+        if self.writer is None:
+            self._write_files(records)
+        else:
+            self.writer.schedule(str(self.path), lambda: self._write_files(records))
+
+    def save_now(self, records: List[Dict]):
+        """同步写出快照，失败时抛出异常（不经过后台写线程，调用方据此确认已落盘）"""
+        self._write_files(records)
+
+    def _write_files(self, records: List[Dict]):
+        data = snapshot_records(records)
+        rows = record_states(records) if self.snapshot_path is not None else None
+        write_json_atomic(self.path, data)
+        if rows is not None:
+            self._write_snapshot(rows)
+
+    def _write_snapshot(self, rows: List[tuple]):
+        # 缓存写失败不影响 JSON：旧缓存记录的 JSON 大小/时间已对不上，下次启动自然作废
+        try:
+            write_snapshot(self.snapshot_path, self.path, self.record_type, rows)
+            self._snapshot_stale = False
+        except Exception as e:
+            print(f"Error writing {self.label} snapshot cache: {e}")
+
+    def compact(self, records: List[Dict]):
+        """整文件模式下快照总是最新的，无需压缩"""
+        pass
+
+    def has_full_text_index(self) -> bool:
+        """没有全文索引：搜索和排序由 Collection 在内存中建立 SearchIndex 完成"""
+        return False
+
+    def search_ids(self, needle: str, category: Optional[str] = None) -> Optional[List[str]]:
+        """没有索引的引擎返回 None，由调用方在内存中扫描"""
+        return None
+
+
+class JournalStore(JsonStore):
+    """日志存储：变更以单行 JSON 追加到快照旁的 .journal 文件
+
+    启动时先读快照再重放日志；只有压缩时才重建 JSON 快照。
+    日志中的每条操作都是幂等的（put 整条记录 / patch 绝对值 / delete），
+    因此压缩过程中即使崩溃，重放也不会出错。
+    有 writer 时日志行先进缓冲区，由后台线程成组追加（group commit）。
+    """
+
+    def __init__(self, path: Path, label: str, writer: Optional[WriteBehindWriter] = None,
+                 record_type=None, compact_threshold: int = 1000):
+        super().__init__(path, label, writer, record_type)
+        self.journal_path = path.with_suffix(".journal")
+        self.compact_threshold = compact_threshold
+        self._entries = 0  # 尚未合入快照的日志条数
+        self._buffer: List[str] = []  # 尚未写入日志文件的行
+        self._lock = threading.Lock()
+
+    def load(self) -> List[Dict]:
+        records = super().load()
+        if not self.journal_path.exists():
+            return records
+
+        # 按 id 重放，dict 保持插入顺序，更新时位置不变
+        table = {}
+        for record in records:
+            table[record.get("id") or object()] = record
+
+        entries = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 最后一行可能在追加时被中断，丢弃即可
+                        print(f"Skipping broken {self.label} journal entry")
+                        break
+                    self._apply(table, entry)
+                    entries += 1
+        except Exception as e:
+            print(f"Error replaying {self.label} journal: {e}")
+
+        self._entries = entries
+        return list(table.values())
+
+    @staticmethod
+    def _apply(table: Dict, entry: Dict):
+        op = entry.get("op")
+        if op == "put":
+            record = entry["record"]
+            table[record["id"]] = record
+        elif op == "patch":
+            record = table.get(entry["id"])
+            if record is not None:
+                record.update(entry["fields"])
+        elif op == "delete":
+            table.pop(entry["id"], None)
+
+    def _append(self, records: List[Dict], entries: List[Dict]):
+        lines = [json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n" for entry in entries]
+        with self._lock:
+            self._buffer.extend(lines)
+            self._entries += len(lines)
+            # 日志比快照本身还大时顺手压缩
+            needs_compaction = self._entries > max(self.compact_threshold, len(records))
+        if needs_compaction:
+            self.save(records)
+        elif self.writer is None:
+            self._write_buffer()
+        else:
+            self.writer.schedule(str(self.journal_path), self._write_buffer)
+
+    def _write_buffer(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+
+    def put_many(self, records: List[Dict], changed: List[Dict]):
+        self._append(records, [{"op": "put", "record": storage_dict(record)} for record in changed])
+
+    def patch(self, records: List[Dict], record_id: str, fields: Dict):
+        self._append(records, [{"op": "patch", "id": record_id, "fields": fields}])
+
+    def delete_many(self, records: List[Dict], record_ids: List[str]):
+        self._append(records, [{"op": "delete", "id": record_id} for record_id in record_ids])
+
+    def save(self, records: List[Dict]):
+        """重建快照并清空日志"""
+        if self.writer is None:
+            self._compact_now(records)
+        else:
+            self.writer.schedule(str(self.path), lambda: self._compact_now(records))
+
+    def save_now(self, records: List[Dict]):
+        self._compact_now(records)
+
+    def _compact_now(self, records: List[Dict]):
+        # 取快照与清空缓冲在同一把锁内完成：缓冲里的变更都已反映在快照中
+        with self._lock:
+            data = snapshot_records(records)
+            rows = record_states(records) if self.snapshot_path is not None else None
+            self._buffer = []
+            self._entries = 0
+        write_json_atomic(self.path, data)
+        if rows is not None:
+            self._write_snapshot(rows)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+
+    def compact(self, records: List[Dict]):
+        if self._entries > 0:
+            self.save(records)
+
+
+def create_store(mode: str, path: Path, label: str, content_field: str = "content",
+                 writer: Optional[WriteBehindWriter] = None, record_type=None):
+    """根据配置中的 storage_mode 创建存储引擎；record_type 用于 json / journal 模式的快照缓存"""
+    if mode == "journal":
+        return JournalStore(path, label, writer, record_type)
+    if mode == "sqlite":
+        # 行级写入本身很轻，且连接只在主线程使用，不经过后台写线程
+        from sqlite_store import SqliteStore
+        return SqliteStore(path.parent / "library.db", path, label, content_field)
+    return JsonStore(path, label, writer, record_type)
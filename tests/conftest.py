@@ -0,0 +1,38 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_manager import PromptManager
+
+
+def open_manager(data_dir: Path, **config) -> PromptManager:
+    """在 data_dir 中打开一个 PromptManager；config 为写入 config.json 的配置项（如 storage_mode）"""
+    if config:
+        config_file = data_dir / "config.json"
+        current = {}
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                current = json.load(f)
+        current.update(config)
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump(current, f)
+    return PromptManager(data_dir=data_dir)
+
+
+def reopen(manager: PromptManager) -> PromptManager:
+    """等待写入落盘后在同一目录重新打开（模拟重启）"""
+    manager.flush()
+    for collection in manager.collections.values():
+        store = collection.store
+        if hasattr(store, "conn"):
+            store.conn.close()
+    return PromptManager(data_dir=manager.data_dir)
+
+
+@pytest.fixture(params=["json", "journal", "sqlite"])
+def storage_mode(request):
+    return request.param
@@ -0,0 +1,128 @@
+from tests.conftest import open_manager, reopen
+
+
+def names(records):
+    return [r["name"] for r in records]
+
+
+def test_crud_survives_reload(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    first = manager.add_prompt("第一条", "通用", ["a", "b"], "正文一")
+    second = manager.add_prompt("第二条", "写作", [], "正文二")
+    third = manager.add_prompt("第三条", "通用", ["c"], "正文三")
+    manager.update_prompt(second["id"], "第二条（改）", "写作", ["d"], "新正文")
+    manager.delete_prompt(third["id"])
+    manager.increment_usage(first["id"])
+    manager.increment_usage(first["id"])
+
+    check(manager, first, second, third)
+    check(reopen(manager), first, second, third)
+
+
+def check(manager, first, second, third):
+    assert names(manager.get_all_prompts()) == ["第一条", "第二条（改）"]
+    record = manager.get_prompt(second["id"])
+    assert record["content"] == "新正文"
+    assert list(record["tags"]) == ["d"]
+    assert record["created_at"] == second["created_at"]
+    assert manager.get_prompt(first["id"])["usage_count"] == 2
+    assert manager.get_prompt(third["id"]) is None
+    assert manager.get_categories() == ["写作", "通用"]
+    assert manager.get_all_tags() == ["a", "b", "d"]
+    assert manager.get_category_stats() == {"通用": 1, "写作": 1}
+
+
+def test_bulk_operations_survive_reload(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    added = manager.add_many("api_docs", [{"name": f"文档{i}", "category": "接口", "tags": [], "content": f"接口 {i}"}
+                                          for i in range(5)])
+    ids = [r["id"] for r in added]
+    assert manager.update_many("api_docs", {ids[0]: {"category": "已改"}, "不存在": {"name": "x"}}) == 1
+    assert manager.delete_many("api_docs", ids[3:] + ["不存在"]) == 2
+
+    manager = reopen(manager)
+    assert names(manager.get_all_api_docs()) == ["文档0", "文档1", "文档2"]
+    assert manager.get_api_doc(ids[0])["category"] == "已改"
+    assert manager.get_all_prompts() == []
+
+
+def test_unknown_fields_round_trip(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    record_id = manager.add_prompt("名称", "通用", [], "正文")["id"]
+    manager.update_many("prompts", {record_id: {"source": {"url": "https://example.com", "rank": 3}}})
+
+    manager = reopen(manager)
+    assert manager.get_prompt(record_id)["source"] == {"url": "https://example.com", "rank": 3}
+
+
+def test_api_keys_are_masked_for_display(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    record = manager.add_api_key("OpenAI", "sk-1234567890abcdef", "模型")
+
+    manager = reopen(manager)
+    stored = manager.get_api_key(record["id"])
+    assert stored["key"] == "sk-1234567890abcdef"
+    masked = manager.masked("api_keys", stored)
+    assert masked["key"] == "sk-1" + "*" * 11 + "cdef"
+    assert masked["name"] == "OpenAI"
+    # 遮蔽的是副本
+    assert stored["key"] == "sk-1234567890abcdef"
+    assert manager.masked("prompts", {"content": "不遮蔽"}) == {"content": "不遮蔽"}
+
+
+def test_bump_duplicate_counts_usage_instead_of_adding(tmp_path):
+    manager = open_manager(tmp_path)
+    record = manager.add_prompt("已有", "通用", [], "同样的  正文\n")
+    assert manager.bump_duplicate("prompts", "同样的 正文")["id"] == record["id"]
+    assert manager.bump_duplicate("prompts", "不同的正文") is None
+    assert manager.bump_duplicate("api_docs", "同样的 正文") is None
+    assert manager.get_prompt(record["id"])["usage_count"] == 1
+    assert len(manager.get_all_prompts()) == 1
+
+
+def test_similar_clusters_reports_progress_and_can_be_cancelled(tmp_path):
+    manager = open_manager(tmp_path)
+    # 正文足够长，副本的估计相似度才稳定地高于阈值（签名用的字符串哈希每个进程不同）
+    texts = [" ".join(f"w{i}x{j}" for j in range(80)) for i in range(1200)]
+    manager.add_many("prompts", [{"name": f"条目{i}", "category": "通用", "tags": [], "content": text}
+                                 for i, text in enumerate(texts)]
+                     + [{"name": "副本", "category": "通用", "tags": [], "content": texts[7] + " 结尾"}])
+    calls = []
+    assert manager.similar_clusters("prompts", progress=lambda done, total: calls.append((done, total)) or False) is None
+    assert calls == [(500, 1201)]
+    assert manager.collections["prompts"]._similar_index is None
+
+    calls.clear()
+    clusters = manager.similar_clusters("prompts", progress=lambda done, total: calls.append(done))
+    assert calls == [500, 1000]
+    assert [sorted(r["name"] for r, _ in group) for group in clusters] == [["副本", "条目7"]]
+
+
+def test_similar_clusters_score_members_against_the_kept_record(tmp_path, monkeypatch):
+    import minhash
+    from array import array
+
+    # 签名直接给定：B、C 和 C、D 各有 26/32 个分箱相同，B、D 只有 20/32
+    b = list(range(1, 33))
+    c = b[:26] + [100 + i for i in range(6)]
+    d = [200 + i for i in range(6)] + c[6:]
+    signatures = {"B": b, "C": c, "D": d}
+    monkeypatch.setattr(minhash, "signature", lambda text: array('I', signatures[text]) if text in signatures else None)
+    manager = open_manager(tmp_path)
+    records = {name: manager.add_prompt(name, "通用", [], name) for name in "BCD"}
+    manager.increment_usage(records["B"]["id"])
+
+    [group] = manager.similar_clusters("prompts")
+    # 三条因传递归为一组，但 D 与保留的 B 并不相似
+    assert [(r["name"], round(score, 3)) for r, score in group] == [("B", 1.0), ("C", 0.812), ("D", 0.625)]
+
+
+def test_generic_get_and_categories(tmp_path):
+    manager = open_manager(tmp_path)
+    doc = manager.add_many("api_docs", [{"name": "文档", "category": "接口", "tags": [], "content": "正文"},
+                                        {"name": "文档二", "category": "SDK", "tags": [], "content": "正文二"}])[0]
+    manager.add_prompt("提示", "写作", [], "正文")
+    assert manager.get("api_docs", doc["id"])["name"] == "文档"
+    assert manager.get("prompts", doc["id"]) is None
+    assert manager.categories("api_docs") == ["SDK", "接口"]
+    assert manager.categories("prompts") == ["写作"]
@@ -0,0 +1,55 @@
+import json
+
+from config_store import ConfigStore
+from storage import WriteBehindWriter
+from tests.conftest import open_manager, reopen
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_rapid_changes_write_once_after_they_stop(tmp_path, monkeypatch):
+    import config_store
+
+    path = tmp_path / "config.json"
+    writes = []
+    original = config_store.write_json_atomic
+    monkeypatch.setattr(config_store, "write_json_atomic", lambda p, data: writes.append(dict(data)) or original(p, data))
+    writer = WriteBehindWriter()
+    config = ConfigStore(path, {"opacity": 1.0}, writer, delay=10)
+    # 拖动窗口：连续修改只在最后写一次，写的是最终值
+    for x in range(50):
+        config["window_geometry"] = {"x": x, "y": 0}
+    assert writes == []
+    writer.flush()
+    assert writes == [{"opacity": 1.0, "window_geometry": {"x": 49, "y": 0}}]
+    assert read(path)["window_geometry"] == {"x": 49, "y": 0}
+    # 值没变时不写盘
+    config["opacity"] = 1.0
+    writer.flush()
+    assert len(writes) == 1
+    writer.close()
+
+
+def test_subscribers_see_only_real_changes(tmp_path):
+    writer = WriteBehindWriter(delay=10)
+    config = ConfigStore(tmp_path / "config.json", {"theme": "dark"}, writer)
+    everything, themes = [], []
+    config.subscribe(lambda key, value: everything.append((key, value)))
+    config.subscribe(lambda key, value: themes.append(value), key="theme")
+    config["theme"] = "dark"
+    config.update(theme="light", opacity=0.8)
+    config.setdefault("opacity", 1.0)
+    del config["opacity"]
+    assert everything == [("theme", "light"), ("opacity", 0.8), ("opacity", None)]
+    assert themes == ["light"]
+    writer.close()
+
+
+def test_manager_config_survives_restart(tmp_path):
+    manager = open_manager(tmp_path)
+    manager.config["floating_ball_position"] = [10, 20]
+    manager = reopen(manager)
+    assert manager.config["floating_ball_position"] == [10, 20]
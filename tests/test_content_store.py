@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from content_store import BLOB_THRESHOLD, COMPRESS_THRESHOLD, LazyContent, CompressedContent
+from data_manager import PromptManager
+from tests.conftest import open_manager, reopen
+
+LONG = "长正文 " * BLOB_THRESHOLD
+MEDIUM = "可压缩的正文 " * (COMPRESS_THRESHOLD // 4)
+
+
+@pytest.mark.parametrize("storage", ["inline", "blob"])
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_content_round_trip_through_reload(tmp_path, storage, compression):
+    manager = open_manager(tmp_path, storage_mode="journal", content_storage=storage,
+                           content_compression=compression)
+    long_id = manager.add_prompt("长", "通用", [], LONG)["id"]
+    medium_id = manager.add_prompt("中", "通用", [], MEDIUM)["id"]
+    short_id = manager.add_prompt("短", "通用", [], "短正文")["id"]
+
+    manager = reopen(manager)
+    assert manager.get_prompt(long_id)["content"] == LONG
+    assert manager.get_prompt(medium_id)["content"] == MEDIUM
+    assert manager.get_prompt(short_id)["content"] == "短正文"
+    stored = manager.collections["prompts"].get(long_id).external("content")
+    if storage == "blob":
+        assert type(stored) is LazyContent
+    elif compression:
+        assert type(stored) is CompressedContent
+    else:
+        assert stored is None
+    assert [r["id"] for r in manager.search_prompts("长正文")] == [long_id]
+
+
+def test_switching_back_to_inline_restores_plain_json(tmp_path):
+    manager = open_manager(tmp_path, content_storage="blob", content_compression="zlib")
+    record_id = manager.add_prompt("长", "通用", [], LONG)["id"]
+    manager = reopen(manager)
+    assert list(tmp_path.glob("prompts.*.blob"))
+
+    manager = open_manager(tmp_path, content_storage="inline", content_compression=None)
+    assert manager.get_prompt(record_id)["content"] == LONG
+    manager.flush()
+    with open(tmp_path / "prompts.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)[0]["content"] == LONG
+    # 正文已收回 JSON 并保存过：下次加载时删除旧的外置文件
+    manager = reopen(manager)
+    manager.get_all_prompts()
+    assert not list(tmp_path.glob("prompts.*.blob"))
+
+
+def test_blob_compaction_keeps_live_content(tmp_path):
+    manager = open_manager(tmp_path, storage_mode="journal", content_storage="blob")
+    collection = manager.collections["prompts"]
+    collection.contents.threshold = 16
+    keep = manager.add_prompt("保留", "通用", [], "保留的正文" * 10)["id"]
+    for i in range(20):
+        record_id = manager.add_prompt(f"临时{i}", "通用", [], f"会被删除的正文 {i} " * 5000)["id"]
+        manager.delete_prompt(record_id)
+
+    manager.compact_storage()
+    assert collection.contents.gen == 1
+    assert not (tmp_path / "prompts.0.blob").exists()
+    manager = reopen(manager)
+    assert manager.get_prompt(keep)["content"] == "保留的正文" * 10
+
+
+def test_failed_compaction_write_keeps_old_blob_file(tmp_path, monkeypatch):
+    manager = open_manager(tmp_path, storage_mode="json", content_storage="blob")
+    collection = manager.collections["prompts"]
+    collection.contents.threshold = 16
+    keep = manager.add_prompt("保留", "通用", [], "保留的正文" * 10)["id"]
+    for i in range(20):
+        record_id = manager.add_prompt(f"临时{i}", "通用", [], f"会被删除的正文 {i} " * 5000)["id"]
+        manager.delete_prompt(record_id)
+    manager.flush()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("storage.write_json_atomic", fail)
+    manager.compact_storage()
+    assert (tmp_path / "prompts.0.blob").exists()
+    monkeypatch.undo()
+    assert PromptManager(data_dir=tmp_path).get_prompt(keep)["content"] == "保留的正文" * 10
+
+
+def test_missing_or_truncated_blob_reads_as_empty(tmp_path):
+    manager = open_manager(tmp_path, storage_mode="journal", content_storage="blob")
+    record_id = manager.add_prompt("长", "通用", [], LONG)["id"]
+    manager = reopen(manager)
+    blob = tmp_path / "prompts.0.blob"
+    with open(blob, 'r+b') as f:
+        f.truncate(10)
+    assert manager.get_prompt(record_id)["content"] == ""
+    blob.unlink()
+    manager = reopen(manager)
+    assert manager.get_prompt(record_id)["content"] == ""
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+from exporter import ExportCancelled
+from tests.conftest import open_manager, reopen
+
+
+def read_export(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    if str(path).endswith((".json", ".json.gz")):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def fill(manager):
+    manager.add_prompt("SQL 优化", "数据库", ["sql"], "正文一")
+    manager.add_prompt("代码审查", "编程", ["review", "sql"], "正文二")
+    manager.add_prompt("周报", "办公", [], "正文三")
+
+
+@pytest.mark.parametrize("suffix", [".json", ".ndjson", ".json.gz", ".ndjson.gz"])
+def test_export_formats_and_filters(tmp_path, suffix):
+    manager = open_manager(tmp_path)
+    fill(manager)
+    path = tmp_path / f"out{suffix}"
+    assert manager.export_records("prompts", str(path)) == 3
+    assert [r["name"] for r in read_export(path)] == ["SQL 优化", "代码审查", "周报"]
+    assert manager.export_records("prompts", str(path), category="编程") == 1
+    assert [r["name"] for r in read_export(path)] == ["代码审查"]
+    assert manager.export_records("prompts", str(path), tag="sql") == 2
+    assert [r["name"] for r in read_export(path)] == ["SQL 优化", "代码审查"]
+    assert manager.export_records("prompts", str(path), category="不存在") == 0
+    assert read_export(path) == []
+
+
+def test_incremental_export_uses_watermark_of_last_full_export(tmp_path):
+    manager = open_manager(tmp_path)
+    fill(manager)
+    path = tmp_path / "out.ndjson"
+    assert manager.export_records("prompts", str(path), incremental=True) == 3
+    changed = manager.search_prompts("周报")[0]
+    manager.update_prompt(changed["id"], "周报（改）", "办公", [], "正文三")
+    # 带筛选的导出不移动水位
+    manager.export_records("prompts", str(path), category="编程")
+    manager = reopen(manager)
+    assert manager.export_records("prompts", str(path), incremental=True) == 1
+    assert [r["name"] for r in read_export(path)] == ["周报（改）"]
+    assert manager.export_records("prompts", str(path), incremental=True) == 0
+
+
+def test_cancelled_export_keeps_previous_file(tmp_path, monkeypatch):
+    import exporter
+
+    monkeypatch.setattr(exporter, "PROGRESS_EVERY", 1)
+    manager = open_manager(tmp_path)
+    fill(manager)
+    path = tmp_path / "out.json"
+    manager.export_records("prompts", str(path))
+    with pytest.raises(ExportCancelled):
+        manager.export_records("prompts", str(path), progress=lambda done, total: False)
+    assert len(read_export(path)) == 3
+    assert not (tmp_path / "out.json.tmp").exists()
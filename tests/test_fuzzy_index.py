@@ -0,0 +1,122 @@
+import math
+import random
+import threading
+import time
+
+import pytest
+
+from fuzzy_index import TrigramIndex, trigrams
+from search_index import normalize_text
+
+SYLLABLES = ["zu", "qua", "mi", "lo", "pel", "ka", "ri", "to", "ne", "sa", "bo", "xi", "代码", "审查", "写作"]
+
+
+def make_corpus(count: int, rng: random.Random):
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return {f"r{i}": " ".join(word() for _ in range(rng.randint(2, 6))) for i in range(count)}
+
+
+def brute_force(corpus_grams, query: str, threshold: float):
+    """逐条计算相似度：(id, 相似度)，相似度从高到低，相同时按加入顺序"""
+    grams = trigrams(normalize_text(query))
+    if not grams:
+        return []
+    required = max(1, math.ceil(threshold * len(grams) - 1e-9))
+    hits = []
+    for record_id, record_grams in corpus_grams.items():
+        count = len(grams & record_grams)
+        if count >= required:
+            hits.append((record_id, count / len(grams)))
+    hits.sort(key=lambda hit: -hit[1])
+    return hits
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 0.8])
+def test_search_matches_brute_force(threshold):
+    rng = random.Random(11)
+    corpus = make_corpus(3000, rng)
+    index = TrigramIndex()
+    for record_id, text in corpus.items():
+        index.add(record_id, text)
+    # 修改和删除留下作废的序号，结果不能受影响
+    for record_id in rng.sample(sorted(corpus), 300):
+        if rng.random() < 0.5:
+            del corpus[record_id]
+            index.remove(record_id)
+        else:
+            corpus[record_id] = corpus.pop(record_id) + " kari"
+            index.update(record_id, corpus[record_id])
+
+    queries = ["zuzuquami loqauquapel"] + [rng.choice(list(corpus.values())) for _ in range(40)]
+    # 再加上带错字的查询：交换相邻字符
+    for text in list(queries[1:21]):
+        i = rng.randrange(len(text) - 1)
+        queries.append(text[:i] + text[i + 1] + text[i] + text[i + 2:])
+    # 与索引相同，修改过的记录排在后面
+    corpus_grams = {record_id: trigrams(normalize_text(text)) for record_id, text in corpus.items()}
+    for query in queries:
+        for typed in (query[:3], query[:len(query) // 2], query):
+            expected = brute_force(corpus_grams, typed, threshold)
+            assert index.search(typed, threshold, None) == expected, typed
+            assert index.search(typed, threshold, 10) == expected[:10], typed
+
+
+def test_best_matches_are_not_pruned_by_posting_order():
+    # 每个 trigram 都出现在两千多条记录里；只含其中一个词的记录先加入，完全匹配的记录最后加入
+    index = TrigramIndex()
+    for i in range(2100):
+        index.add(f"first{i}", "zuzuquami")
+        index.add(f"second{i}", "loqauquapel")
+    index.add("target", "zuzuquami loqauquapel")
+    assert index.search("zuzuquami loqauquapel", 0.5, 1) == [("target", 1.0)]
+    assert index.search("loqauquapel zuzuquami", 0.5, 3)[0] == ("target", 1.0)
+
+
+def test_cached_bitmaps_follow_later_changes():
+    rng = random.Random(3)
+    corpus = make_corpus(2000, rng)
+    index = TrigramIndex()
+    for record_id, text in corpus.items():
+        index.add(record_id, text)
+    queries = [rng.choice(list(corpus.values())) for _ in range(10)]
+    for query in queries:
+        index.search(query, 0.5, 10)
+    # 缓存位图之后再增删改：新追加的序号补进位图，作废的序号不再出现
+    for i in range(200):
+        corpus[f"n{i}"] = queries[i % 10]
+        index.add(f"n{i}", queries[i % 10])
+    for record_id in rng.sample(sorted(corpus), 100):
+        del corpus[record_id]
+        index.remove(record_id)
+    corpus_grams = {record_id: trigrams(normalize_text(text)) for record_id, text in corpus.items()}
+    for query in queries:
+        assert index.search(query, 0.5, None) == brute_force(corpus_grams, query, 0.5)
+
+
+def test_fuzzy_search_does_not_wait_for_the_index(tmp_path):
+    from tests.conftest import open_manager
+
+    manager = open_manager(tmp_path)
+    manager.add_prompt("代码审查", "编程", [], "review the code")
+    manager.add_prompt("写作手册", "写作", [], "writing guide")
+    collection = manager.collections["prompts"]
+    started = threading.Event()
+    release = threading.Event()
+
+    class SlowIndex(TrigramIndex):
+        def __init__(self):
+            super().__init__()
+            started.set()
+            release.wait(5)
+
+    collection._build_in_background("_fuzzy_index", SlowIndex)
+    started.wait(5)
+    # 索引还在建立：返回子串搜索的结果，且这个临时结果不会被缓存下来
+    assert manager.index_pending("prompts", "~reveiw")
+    assert [r["name"] for r in manager.search_prompts("~review")] == ["代码审查"]
+    assert manager.search_prompts("~reveiw") == []
+    release.set()
+    while manager.index_pending("prompts", "~"):
+        time.sleep(0.01)
+    assert [r["name"] for r in manager.search_prompts("~reveiw")] == ["代码审查"]
@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+
+from importer import ImportCancelled, iter_json_records
+from tests.conftest import open_manager, reopen
+
+
+def items(count, prefix="导入"):
+    return [{"name": f"{prefix}{i}", "category": "通用", "tags": ["t"], "content": f"{prefix}正文 {i}"}
+            for i in range(count)]
+
+
+def test_iter_json_records_array_and_ndjson_across_chunks(tmp_path):
+    data = items(50)
+    array_file = tmp_path / "a.json"
+    array_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    ndjson_file = tmp_path / "a.ndjson"
+    ndjson_file.write_text("\n".join(json.dumps(d, ensure_ascii=False) for d in data), encoding='utf-8')
+    for path in (array_file, ndjson_file):
+        with open(path, 'r', encoding='utf-8') as f:
+            assert list(iter_json_records(f, chunk_size=7)) == data
+
+
+@pytest.mark.parametrize("suffix", [".json", ".ndjson", ".json.gz"])
+def test_import_formats_and_dedupe(tmp_path, suffix):
+    manager = open_manager(tmp_path)
+    manager.add_prompt("已有", "通用", [], "导入正文 3")
+    data = items(5) + [{"name": "导入1", "content": "名称重复"}, {"name": "新名称", "content": "导入正文  0 "}]
+    path = tmp_path / f"import{suffix}"
+    if suffix == ".ndjson":
+        text = "\n".join(json.dumps(d, ensure_ascii=False) for d in data)
+    else:
+        text = json.dumps(data, ensure_ascii=False)
+    if suffix.endswith(".gz"):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding='utf-8')
+
+    assert manager.import_records("prompts", str(path)) == (4, 3)
+    manager = reopen(manager)
+    assert sorted(r["name"] for r in manager.get_all_prompts()) == ["导入0", "导入1", "导入2", "导入4", "已有"]
+
+
+def test_cancelled_import_is_rolled_back(tmp_path):
+    manager = open_manager(tmp_path)
+    manager.add_prompt("keep", "通用", [], "keep")
+    path = tmp_path / "import.json"
+    path.write_text(json.dumps(items(1200)), encoding='utf-8')
+
+    with pytest.raises(ImportCancelled):
+        manager.import_records("prompts", str(path), progress=lambda *args: False)
+    assert [r["name"] for r in manager.get_all_prompts()] == ["keep"]
+    assert manager.search_prompts("导入") == []
+    manager = reopen(manager)
+    assert [r["name"] for r in manager.get_all_prompts()] == ["keep"]
+
+
+def test_malformed_import_is_rolled_back(tmp_path):
+    manager = open_manager(tmp_path)
+    manager.add_prompt("keep", "通用", [], "keep")
+    path = tmp_path / "import.json"
+    path.write_text(json.dumps(items(3))[:-10], encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        manager.import_records("prompts", str(path))
+    assert [r["name"] for r in manager.get_all_prompts()] == ["keep"]
+    assert manager.find_duplicate("prompts", "导入正文 0") is None
+
+
+def test_failed_write_is_rolled_back(tmp_path, storage_mode, monkeypatch):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    manager.add_prompt("keep", "通用", [], "keep")
+    path = tmp_path / "import.json"
+    path.write_text(json.dumps(items(3)), encoding='utf-8')
+
+    def failing_put_many(records, changed):
+        raise OSError("磁盘已满")
+    monkeypatch.setattr(manager.collections["prompts"].store, "put_many", failing_put_many)
+    with pytest.raises(OSError):
+        manager.import_records("prompts", str(path))
+    assert names(manager) == ["keep"]
+    monkeypatch.undo()
+    assert names(reopen(manager)) == ["keep"]
+
+
+@pytest.mark.parametrize("suffix, text", [
+    (".json", json.dumps({"name": "对象", "content": "顶层是对象"}, ensure_ascii=False, indent=2)),
+    (".json", json.dumps({"name": "对象", "content": "顶层是对象"}, ensure_ascii=False)),
+    (".ndjson", json.dumps({"name": "对象", "content": "跨行的对象"}, ensure_ascii=False, indent=2)),
+])
+def test_top_level_object_is_rejected(tmp_path, suffix, text):
+    manager = open_manager(tmp_path)
+    path = tmp_path / f"import{suffix}"
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        manager.import_records("prompts", str(path))
+    assert manager.import_prompts(str(path)) == (0, 0)
+    assert manager.get_all_prompts() == []
+
+
+def names(manager):
+    return [r["name"] for r in manager.get_all_prompts()]
@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta
+
+from ranking import rank, boost
+from record import pack_timestamp
+from search_index import SearchIndex
+from tests.conftest import open_manager
+
+FIELDS = ("name", "category", "content", "tags")
+WEIGHTS = {"name": 3.0, "tags": 2.0, "content": 1.0, "category": 0.5}
+OLD = "2020-01-01T00:00:00"
+
+
+def record(record_id, name="", content="", tags=(), usage=0, updated_at=OLD):
+    return {"id": record_id, "name": name, "category": "通用", "content": content, "tags": list(tags),
+            "usage_count": usage, "updated_at": updated_at}
+
+
+def ranked_ids(records, needle, limit=None):
+    index = SearchIndex(FIELDS)
+    for r in records:
+        index.add(r)
+    return [r["id"] for r, _ in rank(index, records, needle, WEIGHTS, len(records), limit)]
+
+
+def test_field_weight_and_length_normalization():
+    records = [
+        record("content", "其他 工具", "python 正文内容", tags=["其他"]),
+        record("tag", "其他 工具", "正文内容 正文内容", tags=["python"]),
+        record("name", "python 工具", "正文内容 正文内容", tags=["其他"]),
+    ]
+    assert ranked_ids(records, "python") == ["name", "tag", "content"]
+    # 同一字段里，文本越长得分越低
+    records = [record("long", "其他", "python " + "填充 " * 200), record("short", "其他", "python 脚本")]
+    assert ranked_ids(records, "python") == ["short", "long"]
+
+
+def test_usage_and_recency_break_ties():
+    now = datetime.now()
+    records = [
+        record("plain", "sql"),
+        record("used", "sql", usage=20),
+        record("recent", "sql", updated_at=now.isoformat()),
+    ]
+    assert ranked_ids(records, "sql") == ["used", "recent", "plain"]
+    now_micros = pack_timestamp(now.isoformat())
+    assert boost(records[0], now_micros) == 1.0
+    # 新近度加成按半衰期衰减
+    half_life = record("x", updated_at=(now - timedelta(days=30)).isoformat())
+    assert abs(boost(half_life, now_micros) - 1.15) < 0.01
+
+
+def test_top_k_matches_full_sort_and_keeps_original_order_on_ties():
+    rng = random.Random(5)
+    records = [record(f"r{i}", rng.choice(["sql", "sql sql", "其他"]), rng.choice(["sql 查询", "正文"]),
+                      usage=rng.choice([0, 0, 3])) for i in range(300)]
+    full = ranked_ids(records, "sql")
+    for limit in (1, 10, 50):
+        assert ranked_ids(records, "sql", limit) == full[:limit]
+    ties = [record(f"t{i}", "sql") for i in range(5)]
+    assert ranked_ids(ties, "sql") == [f"t{i}" for i in range(5)]
+
+
+def test_ranked_search_follows_usage(tmp_path):
+    manager = open_manager(tmp_path)
+    first = manager.add_prompt("SQL 模板一", "数据库", [], "正文")
+    second = manager.add_prompt("SQL 模板二", "数据库", [], "正文")
+    assert len(manager.search_prompts("sql", ranked=True)) == 2
+    for _ in range(5):
+        manager.increment_usage(first["id"])
+    assert [r["id"] for r in manager.search_prompts("sql", ranked=True, limit=1)] == [first["id"]]
+    # 不排序时仍按存储顺序
+    assert [r["id"] for r in manager.search_prompts("sql")] == [first["id"], second["id"]]
@@ -0,0 +1,236 @@
+import pytest
+
+from tests.conftest import open_manager, reopen
+
+RECORDS = [
+    ("SQL 性能优化", "数据库", ["sql", "性能"], "分析慢查询，给出 SQL perf 优化建议"),
+    ("代码审查", "编程", ["review"], "审查 Python 代码的可读性和潜在 bug"),
+    ("写作手册", "写作", ["风格"], "中文技术写作的常见规范"),
+    ("Translate", "翻译", ["en"], "Translate the following text into English"),
+    ("周报生成", "办公", ["周报", "总结"], "根据本周提交记录生成周报"),
+]
+QUERIES = ["", "sql", "SQL", "代码", "审查", "python", "写作", "translate the", "周报", "不存在的词",
+           "ＰＹＴＨＯＮ", "sql perf", "sql  PERF", " 代码审查 ", "Ｓｑｌ", "sq", "代", "e", "%", "_"]
+
+
+def fill(manager):
+    for name, category, tags, content in RECORDS:
+        manager.add_prompt(name, category, tags, content)
+
+
+@pytest.fixture(scope="module")
+def json_results(tmp_path_factory):
+    manager = open_manager(tmp_path_factory.mktemp("json"), storage_mode="json")
+    fill(manager)
+    return {query: [r["name"] for r in manager.search_prompts(query)] for query in QUERIES}
+
+
+@pytest.mark.parametrize("mode", ["journal", "sqlite"])
+def test_backends_return_identical_results(tmp_path, json_results, mode):
+    manager = open_manager(tmp_path, storage_mode=mode)
+    fill(manager)
+    for query in QUERIES:
+        assert [r["name"] for r in manager.search_prompts(query)] == json_results[query], query
+    manager = reopen(manager)
+    for query in QUERIES:
+        assert [r["name"] for r in manager.search_prompts(query)] == json_results[query], query
+
+
+def test_search_follows_updates_and_deletes(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    fill(manager)
+    record = manager.search_prompts("代码审查")[0]
+    manager.update_prompt(record["id"], "代码评审", "编程", ["review"], "评审 Go 代码")
+    assert manager.search_prompts("python") == []
+    assert [r["name"] for r in manager.search_prompts("go 代码")] == ["代码评审"]
+    manager.delete_prompt(record["id"])
+    assert manager.search_prompts("代码评审") == []
+
+
+def test_index_builds_lazily_and_catches_up_with_concurrent_changes(tmp_path):
+    import threading
+
+    manager = open_manager(tmp_path)
+    fill(manager)
+    manager = reopen(manager)
+    collection = manager.collections["prompts"]
+    records = collection.all()
+    assert collection.is_loaded and not collection.indexes_ready
+
+    started, release = threading.Event(), threading.Event()
+    create = collection._new_search_index
+
+    def slow_index():
+        index = create()
+        add = index.add
+
+        def blocking_add(record):
+            started.set()
+            release.wait(5)
+            add(record)
+        index.add = blocking_add
+        return index
+
+    collection._new_search_index = slow_index
+    builder = threading.Thread(target=collection.build_indexes)
+    builder.start()
+    assert started.wait(5)
+    # 建立期间的增删改：索引建好后必须补上
+    manager.add_prompt("新增的 SQL 模板", "数据库", [], "建立索引期间新增")
+    manager.update_prompt(records[1]["id"], "代码评审", "编程", [], "评审 SQL")
+    manager.delete_prompt(records[0]["id"])
+    release.set()
+    builder.join(5)
+
+    assert collection.indexes_ready
+    assert [r["name"] for r in manager.search_prompts("sql")] == ["代码评审", "新增的 SQL 模板"]
+    assert manager.search_prompts("性能优化") == []
+
+
+def test_sqlite_mode_searches_and_ranks_without_the_memory_index(tmp_path):
+    manager = open_manager(tmp_path, storage_mode="sqlite")
+    fill(manager)
+    manager.add_prompt("SQL 速查", "数据库", ["sql"], "常用 SQL 语句")
+    manager = reopen(manager)
+    collection = manager.collections["prompts"]
+    manager.prefetch(["prompts"]).join()
+    assert collection.indexes_ready and collection._pinyin_index is not None
+
+    # 名称里命中的权重更高
+    assert [r["name"] for r in manager.search_prompts("sql", ranked=True)] == ["SQL 速查", "SQL 性能优化"]
+    # 太短无法用 bm25 打分时按使用次数排序
+    top = manager.search_prompts("周报", ranked=True)[0]
+    assert top["name"] == "周报生成"
+    manager.increment_usage(manager.search_prompts("sq")[1]["id"])
+    assert manager.search_prompts("sq", ranked=True, limit=1)[0]["name"] == "SQL 速查"
+    assert [r["name"] for r in manager.search_prompts("xzsc", ranked=True)] == ["写作手册"]
+    assert collection._search_index is None
+
+
+def test_pinyin_matches_only_at_syllable_starts(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    fill(manager)
+    for _ in range(2):
+        def names(query):
+            return [r["name"] for r in manager.search_prompts(query)]
+
+        for query in ["xzs", "xiezuo", "xiezs", "XZSC", "zuoshou", "xie zuo", "shouce"]:
+            assert names(query) == ["写作手册"], query
+        assert names("dmsc") == ["代码审查"]
+        assert names("zb") == ["周报生成"]
+        # 跨越音节边界的片段、单个字母不按拼音匹配
+        for query in ["aim", "ouc", "iez"]:
+            assert names(query) == [], query
+        for query in ["x", "s", "c"]:
+            assert "写作手册" not in names(query), query
+        # 逐字输入时上一次的结果不限制拼音命中
+        assert [names(q) for q in ["i", "ie", "iez", "xiez"]][-1] == ["写作手册"]
+        manager = reopen(manager)
+
+
+def test_index_postings_survive_compaction():
+    from search_index import SearchIndex
+
+    index = SearchIndex(("name", "content"), ("name",))
+    for i in range(3000):
+        index.add({"id": f"r{i}", "name": f"条目{i % 3}", "content": f"word{i} shared"})
+    # 删除和修改留下的作废序号多于有效条目时整体清理
+    for i in range(2000):
+        index.remove(f"r{i}")
+    for i in range(2000, 2500):
+        index.update({"id": f"r{i}", "name": "写作手册", "content": "changed"})
+    assert index._dead < 2000  # 已整体清理过
+    assert index.candidates("shared") == {f"r{i}" for i in range(2500, 3000)}
+    assert index.candidates("changed") == {f"r{i}" for i in range(2000, 2500)}
+    assert index.candidates("word10 ") == set()
+    assert sorted(index.pinyin_ids("xzsc")) == sorted(f"r{i}" for i in range(2000, 2500))
+    assert index.document_frequency("word10") is None
+
+
+def test_query_cache_versions_lru_and_counters():
+    from search_index import QueryCache
+
+    cache = QueryCache(size=2, max_ids=5)
+    assert cache.lookup("a", (1, 0)) is None
+    cache.store("a", (1, 0), ["x"])
+    assert cache.lookup("a", (1, 0)) == ["x"]
+    # 版本变了：旧结果作废并移除
+    assert cache.lookup("a", (2, 0)) is None
+    assert len(cache) == 0
+    cache.store("a", (1, 0), ["x"])
+    cache.store("b", (1, 0), ["y"])
+    cache.lookup("a", (1, 0))
+    cache.store("c", (1, 0), ["z"])  # 条目数超限，淘汰最久未用的 b
+    assert cache.lookup("b", (1, 0)) is None and cache.lookup("a", (1, 0)) == ["x"]
+    cache.store("d", (1, 0), ["1", "2", "3", "4"])  # id 总数超限
+    assert cache.stats()["ids"] <= 5
+    cache.store("big", (1, 0), list("abcdef"))  # 单条就超限的不缓存
+    assert cache.lookup("big", (1, 0)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 4, 2)
+    assert stats["hit_rate"] == 3 / 7
+
+
+def test_query_cache_invalidates_only_affected_results(tmp_path):
+    manager = open_manager(tmp_path)
+    fill(manager)
+    manager.search_prompts("sql")
+    manager.search_prompts("sql", ranked=True)
+    manager.search("api_docs", "sql")
+    hits = manager.query_cache_stats()["hits"]
+    manager.search_prompts("sql")
+    assert manager.query_cache_stats()["hits"] == hits + 1
+
+    # 使用次数只影响按相关度排序的结果
+    manager.increment_usage(manager.search_prompts("sql")[0]["id"])
+    hits = manager.query_cache_stats()["hits"]
+    manager.search_prompts("sql")
+    manager.search_prompts("sql", ranked=True)
+    assert manager.query_cache_stats()["hits"] == hits + 1
+
+    # 修改只影响所在分区
+    manager.add_prompt("SQL 新模板", "数据库", [], "新增")
+    hits = manager.query_cache_stats()["hits"]
+    assert "SQL 新模板" in [r["name"] for r in manager.search_prompts("sql")]
+    manager.search("api_docs", "sql")
+    assert manager.query_cache_stats()["hits"] == hits + 1
+
+
+def test_narrowing_cache_picks_smallest_usable_result():
+    from search_index import NarrowingCache
+
+    cache = NarrowingCache(size=2)
+    assert cache.lookup(1, "s", None) is None
+    cache.store(1, "s", None, ["a", "b", "c"])
+    cache.store(1, "sq", None, ["a", "b"])
+    assert cache.lookup(1, "sql", None) == ["a", "b"]
+    # 旧查询必须是新查询的子串，分类必须相同
+    assert cache.lookup(1, "xs", None) == ["a", "b", "c"]
+    assert cache.lookup(1, "q", None) is None
+    assert cache.lookup(1, "sql", "数据库") is None
+    cache.store(1, "sql", None, ["a"])  # 超出容量，淘汰最早的 "s"
+    assert cache.lookup(1, "xs", None) is None
+    # 数据版本变化后全部作废
+    assert cache.lookup(2, "sql", None) is None
+    cache.store(1, "s", None, ["a"])
+    assert cache.lookup(2, "s", None) is None
+
+
+def test_incremental_typing_matches_fresh_search(tmp_path, storage_mode):
+    manager = open_manager(tmp_path, storage_mode=storage_mode)
+    fill(manager)
+    collection = manager.collections["prompts"]
+
+    def typed(text, category=None):
+        for end in range(1, len(text) + 1):
+            results = [r["name"] for r in collection.search(text[:end], category)]
+        return results
+
+    for text, category in [("sql perf", None), ("代码审查", None), ("translate the", "翻译"), ("sql", "编程")]:
+        expected = typed(text, category)
+        collection._search_cache.clear()
+        assert [r["name"] for r in collection.search(text, category)] == expected, text
+    # 输入过程中数据变化：缓存的旧结果不能漏掉新记录
+    typed("sq")
+    manager.add_prompt("SQL 速查", "数据库", [], "新增")
+    assert "SQL 速查" in [r["name"] for r in collection.search("sql")]
@@ -0,0 +1,103 @@
+import json
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import semantic_index
+from semantic_index import SemanticIndex, term_frequencies
+from tests.conftest import open_manager
+
+TEXTS = {
+    "a": "review the pull request for bugs",
+    "b": "write a short poem about autumn",
+    "c": "translate this paragraph into french",
+    "d": "summarize the meeting notes",
+}
+
+
+def build(path=None, texts=TEXTS):
+    index = SemanticIndex(path)
+    index.build(texts.items())
+    return index
+
+
+def assert_rows_match(index, texts):
+    # 每行仍是对应记录的词频向量，行表与矩阵对得上
+    assert sorted(index._ids) == sorted(texts)
+    for record_id, row in index._rows.items():
+        assert index._ids[row] == record_id
+        assert np.array_equal(index._matrix[row], term_frequencies(texts[record_id]))
+    expected_df = sum((term_frequencies(text) > 0).astype(np.int64) for text in texts.values())
+    assert np.array_equal(index._df, expected_df)
+
+
+def test_add_remove_moves_last_row_into_gap():
+    index = build()
+    texts = dict(TEXTS)
+    index.remove("a")
+    del texts["a"]
+    assert index._rows["d"] == 0
+    assert_rows_match(index, texts)
+    index.add("e", "review the code for bugs")
+    texts["e"] = "review the code for bugs"
+    index.update("b", "write a long poem about spring")
+    texts["b"] = "write a long poem about spring"
+    assert_rows_match(index, texts)
+    assert index.search("review code bugs", limit=1)[0][0] == "e"
+    assert "a" not in [record_id for record_id, _ in index.search("pull request", limit=None)]
+
+
+def test_matrix_keeps_headroom(tmp_path):
+    index = build(tmp_path / "p.vectors.npy")
+    capacity = index._matrix.shape[0]
+    assert capacity > len(TEXTS)
+    index.add("e", "one more record")
+    assert index._matrix.shape[0] == capacity
+    # 空行用完后按比例扩容，而不是翻倍
+    for i in range(capacity):
+        index.add(f"n{i}", f"record {i}")
+    grown = index._matrix.shape[0]
+    assert len(index) < grown < 2 * len(index)
+
+
+def test_reopen_reuses_rows_with_same_checksum(tmp_path, monkeypatch):
+    path = tmp_path / "p.vectors.npy"
+    build(path).save()
+    texts = dict(TEXTS, b="write a long poem about spring")
+    computed = []
+    original = semantic_index.term_frequencies
+    monkeypatch.setattr(semantic_index, "term_frequencies",
+                        lambda text: computed.append(text) or original(text))
+    reopened = build(path, texts)
+    # 只有文本改过的记录重新计算
+    assert computed == [texts["b"]]
+    assert_rows_match(reopened, texts)
+
+
+def test_unclean_meta_rebuilds(tmp_path, monkeypatch):
+    path = tmp_path / "p.vectors.npy"
+    index = build(path)
+    index.save()
+    index.add("e", "changed after the last save")
+    meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+    assert meta["clean"] is False
+    computed = []
+    original = semantic_index.term_frequencies
+    monkeypatch.setattr(semantic_index, "term_frequencies",
+                        lambda text: computed.append(text) or original(text))
+    reopened = build(path)
+    assert sorted(computed) == sorted(TEXTS.values())
+    assert_rows_match(reopened, TEXTS)
+
+
+def test_semantic_search_does_not_wait_for_the_index(tmp_path):
+    manager = open_manager(tmp_path)
+    manager.add_prompt("代码审查", "编程", [], "review the pull request for bugs")
+    manager.add_prompt("写作", "写作", [], "write a short poem about autumn")
+    # 第一次输入只触发后台建立，先返回子串搜索的结果
+    assert [r["name"] for r in manager.search_prompts("?review")] == ["代码审查"]
+    while manager.index_pending("prompts", "?"):
+        time.sleep(0.01)
+    assert manager.search_prompts("?bugs review request")[0]["name"] == "代码审查"
@@ -0,0 +1,57 @@
+import os
+
+from record import PromptRecord
+from snapshot import read_snapshot
+from storage import JsonStore
+from tests.test_storage import make_record
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "prompts.json"
+    records = [make_record("a", tags=["x", "y"]), make_record("b", created_at="2024-01-01T00:00:00+08:00"),
+               make_record("c", unknown={"k": 1})]
+    del records[2]["tags"]
+    JsonStore(path, "prompts", record_type=PromptRecord).save(records)
+
+    store = JsonStore(path, "prompts", record_type=PromptRecord)
+    loaded = store.load()
+    assert all(type(r) is PromptRecord for r in loaded)
+    assert [r.to_dict() for r in loaded] == [r.to_dict() for r in records]
+    assert not store.needs_snapshot()
+
+
+def test_snapshot_is_stale_after_json_changes(tmp_path):
+    path = tmp_path / "prompts.json"
+    JsonStore(path, "prompts", record_type=PromptRecord).save([make_record("a")])
+    # 手工编辑 JSON：大小变化后快照作废，改读 JSON 并要求重建快照
+    text = path.read_text(encoding='utf-8').replace('"name": "a"', '"name": "手工改过"')
+    path.write_text(text, encoding='utf-8')
+
+    assert read_snapshot(path.with_suffix(".snap"), path, PromptRecord, "prompts") is None
+    store = JsonStore(path, "prompts", record_type=PromptRecord)
+    assert store.load()[0]["name"] == "手工改过"
+    assert store.needs_snapshot()
+
+
+def test_corrupt_snapshot_is_discarded(tmp_path):
+    path = tmp_path / "prompts.json"
+    JsonStore(path, "prompts", record_type=PromptRecord).save([make_record("a"), make_record("b")])
+    snap = path.with_suffix(".snap")
+    data = bytearray(snap.read_bytes())
+    data[-5] ^= 0xFF
+    stat = snap.stat()
+    snap.write_bytes(bytes(data))
+    os.utime(snap, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert read_snapshot(snap, path, PromptRecord, "prompts") is None
+    loaded = JsonStore(path, "prompts", record_type=PromptRecord).load()
+    assert [r["id"] for r in loaded] == ["a", "b"]
+
+
+def test_snapshot_shares_repeated_category_strings(tmp_path):
+    path = tmp_path / "prompts.json"
+    JsonStore(path, "prompts", record_type=PromptRecord).save(
+        [make_record(str(i), category="共享分类", tags=["共享标签"]) for i in range(3)])
+    loaded = read_snapshot(path.with_suffix(".snap"), path, PromptRecord, "prompts")
+    assert loaded[0].category is loaded[1].category is loaded[2].category
+    assert loaded[0].tags[0] is loaded[2].tags[0]
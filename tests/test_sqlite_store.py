@@ -0,0 +1,94 @@
+import json
+
+from sqlite_store import SqliteStore, migrate_data_dir
+from storage import JournalStore
+from tests.conftest import open_manager, reopen
+from tests.test_storage import make_record
+
+
+def write_json(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+
+
+def test_migration_includes_uncompacted_journal(tmp_path):
+    path = tmp_path / "prompts.json"
+    journal = JournalStore(path, "prompts")
+    records = [make_record("a"), make_record("b")]
+    journal.save(records)
+    records.append(make_record("c"))
+    journal.put_many(records, [records[-1]])
+    journal.delete_many(records, ["a"])
+
+    store = SqliteStore(tmp_path / "library.db", path, "prompts")
+    assert [r["id"] for r in store.load()] == ["b", "c"]
+    # 原文件保留作备份，只迁移一次
+    assert path.exists()
+    write_json(path, [])
+    assert [r["id"] for r in SqliteStore(tmp_path / "library.db", path, "prompts").load()] == ["b", "c"]
+
+
+def test_migrate_data_dir_counts(tmp_path):
+    write_json(tmp_path / "prompts.json", [make_record("a").to_dict(), make_record("b").to_dict()])
+    write_json(tmp_path / "api_keys.json", [{"id": "k", "name": "key", "key": "sk-123", "category": ""}])
+    assert migrate_data_dir(tmp_path) == {"prompts": 2, "api_docs": 0, "api_keys": 1}
+
+
+def test_search_ids_substring_and_category(tmp_path):
+    store = SqliteStore(tmp_path / "library.db", tmp_path / "prompts.json", "prompts")
+    store.put_many([], [make_record("a", content="SQL 查询优化"), make_record("b", category="其他",
+                                                                             content="优化 SQL 查询")])
+    assert store.search_ids("sql") == ["a", "b"]
+    assert store.search_ids("查询优化") == ["a"]
+    assert store.search_ids("sql", "其他") == ["b"]
+    # 不足 3 个字符时 trigram 无法命中，逐行扫描；LIKE 的通配符按原样匹配
+    assert store.search_ids("优化") == ["a", "b"]
+    assert store.search_ids("%") == []
+    assert store.relevance("优化", None, {"content": 1.0}) == {}
+    relevance = store.relevance("sql", None, {"content": 1.0})
+    assert sorted(relevance) == ["a", "b"] and all(score > 0 for score in relevance.values())
+
+
+def test_sqlite_manager_reload(tmp_path):
+    manager = open_manager(tmp_path, storage_mode="sqlite")
+    record_id = manager.add_prompt("名称", "分类", ["标签"], "正文")["id"]
+    manager.increment_usage(record_id)
+    manager = reopen(manager)
+    record = manager.get_prompt(record_id)
+    assert record["usage_count"] == 1
+    assert list(record["tags"]) == ["标签"]
+
+
+def test_migration_coerces_null_fields(tmp_path):
+    write_json(tmp_path / "prompts.json", [
+        {"id": "a", "name": None, "category": None, "tags": None, "content": None},
+        {"id": "b", "name": "正常", "category": "通用", "tags": "单个标签", "content": "可以搜索的正文"},
+        {"id": ["坏 id"], "name": "跳过", "content": "x"},
+        {"name": "没有 id"},
+    ])
+    store = SqliteStore(tmp_path / "library.db", tmp_path / "prompts.json", "prompts")
+    loaded = store.load()
+    assert [r["id"] for r in loaded] == ["a", "b"]
+    assert loaded[0]["category"] is None
+    assert store.search_ids("单个标签") == ["b"]
+    assert store.search_ids("可以搜索") == ["b"]
+
+    manager = open_manager(tmp_path, storage_mode="sqlite")
+    assert [r["id"] for r in manager.get_all_prompts()] == ["a", "b"]
+
+
+def test_fts_written_by_older_versions_is_rebuilt_normalized(tmp_path):
+    store = SqliteStore(tmp_path / "library.db", tmp_path / "prompts.json", "prompts")
+    store.load()
+    store.put_many([], [make_record("a", name="ＰＹＴＨＯＮ 脚本", content="SQL   Perf")])
+    # 模拟旧版本：全文索引里是原文，也没有规范化标记
+    with store.conn:
+        store.conn.execute("UPDATE prompts_fts SET name = ?, content = ?", ("ＰＹＴＨＯＮ 脚本", "SQL   Perf"))
+        store.conn.execute("DELETE FROM meta WHERE key = 'fts_normalized_prompts'")
+    assert store.search_ids("python") == []
+    store.conn.close()
+
+    store = SqliteStore(tmp_path / "library.db", tmp_path / "prompts.json", "prompts")
+    store.load()
+    assert store.search_ids("python") == ["a"]
+    assert store.search_ids("sql perf") == ["a"]
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+
+from record import PromptRecord
+from storage import JsonStore, JournalStore, WriteBehindWriter, read_json_list
+
+
+def make_record(record_id: str, **fields) -> PromptRecord:
+    data = {"id": record_id, "name": record_id, "category": "通用", "tags": ["a"], "content": "正文 " + record_id,
+            "usage_count": 0, "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"}
+    data.update(fields)
+    return PromptRecord(data)
+
+
+def test_json_store_round_trip(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JsonStore(path, "prompts")
+    records = [make_record("a"), make_record("b", extra_field=[1, 2])]
+    store.save(records)
+    loaded = JsonStore(path, "prompts").load()
+    assert [PromptRecord(r) for r in loaded] == records
+
+
+def test_journal_replays_put_patch_delete(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JournalStore(path, "prompts")
+    records = [make_record("a"), make_record("b")]
+    store.save(records)
+
+    records.append(make_record("c"))
+    store.put_many(records, [records[-1]])
+    records[0]["name"] = "改名"
+    store.put_many(records, [records[0]])
+    store.patch(records, "b", {"usage_count": 5})
+    store.delete_many(records, ["c"])
+    assert store.journal_path.exists()
+
+    loaded = {r["id"]: r for r in JournalStore(path, "prompts").load()}
+    assert list(loaded) == ["a", "b"]
+    assert loaded["a"]["name"] == "改名"
+    assert loaded["b"]["usage_count"] == 5
+    # 快照本身没有被改写
+    assert [r["id"] for r in read_json_list(path, "prompts")] == ["a", "b"]
+
+
+def test_journal_truncated_last_line_is_dropped(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JournalStore(path, "prompts")
+    records = [make_record("a")]
+    store.save(records)
+    records.append(make_record("b"))
+    store.put_many(records, [records[-1]])
+    # 模拟追加到一半崩溃
+    with open(store.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"op":"put","record":{"id":"c","na')
+
+    loaded = JournalStore(path, "prompts").load()
+    assert [r["id"] for r in loaded] == ["a", "b"]
+
+
+def test_journal_compaction_removes_journal(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JournalStore(path, "prompts")
+    records = [make_record("a")]
+    store.save(records)
+    records.append(make_record("b"))
+    store.put_many(records, [records[-1]])
+    store.compact(records)
+
+    assert not store.journal_path.exists()
+    assert [r["id"] for r in read_json_list(path, "prompts")] == ["a", "b"]
+    assert [r["id"] for r in JournalStore(path, "prompts").load()] == ["a", "b"]
+
+
+def test_journal_replay_is_idempotent_after_crash_during_compaction(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JournalStore(path, "prompts")
+    records = [make_record("a"), make_record("b")]
+    store.save(records)
+    records[1]["name"] = "新名称"
+    store.put_many(records, [records[1]])
+    store.patch(records, "a", {"usage_count": 3})
+    store.delete_many(records, ["b"])
+    journal = store.journal_path.read_text(encoding='utf-8')
+
+    # 快照已按最新内容重写，但日志还没来得及删除
+    store.save([records[0]])
+    store.journal_path.write_text(journal, encoding='utf-8')
+
+    loaded = JournalStore(path, "prompts").load()
+    assert [r["id"] for r in loaded] == ["a"]
+    assert loaded[0]["usage_count"] == 3
+
+
+def test_journal_compacts_when_it_outgrows_the_snapshot(tmp_path):
+    path = tmp_path / "prompts.json"
+    store = JournalStore(path, "prompts", compact_threshold=2)
+    records = [make_record("a")]
+    store.save(records)
+    for i in range(3):
+        records[0]["usage_count"] = i + 1
+        store.patch(records, "a", {"usage_count": i + 1})
+
+    assert not store.journal_path.exists()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f)[0]["usage_count"] == 3
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_writer_coalesces_jobs_per_key():
+    writer = WriteBehindWriter(delay=10)
+    runs = []
+    for i in range(5):
+        writer.schedule("prompts", lambda i=i: runs.append(("prompts", i)))
+    writer.schedule("config", lambda: runs.append(("config", 0)))
+    # 同一 key 只执行最后一次安排的任务
+    writer.flush()
+    assert sorted(runs) == [("config", 0), ("prompts", 4)]
+    writer.flush()
+    assert len(runs) == 2
+    writer.close()
+
+
+def test_writer_runs_due_jobs_and_debounce_postpones_them():
+    writer = WriteBehindWriter(delay=0.01)
+    done = threading.Event()
+    writer.schedule("a", done.set)
+    assert done.wait(5)
+
+    postponed = threading.Event()
+    writer.schedule("b", postponed.set, delay=0.01)
+    writer.schedule("b", postponed.set, delay=10, debounce=True)
+    assert not postponed.wait(0.1)
+    # 不带 debounce 时保留最早的到期时间
+    kept = threading.Event()
+    writer.schedule("c", kept.set, delay=0.01)
+    writer.schedule("c", kept.set, delay=10)
+    assert kept.wait(5)
+    writer.close()
+    assert postponed.is_set()
+
+
+def test_writer_survives_failing_jobs():
+    writer = WriteBehindWriter(delay=10)
+    runs = []
+
+    def fail():
+        raise OSError("disk full")
+
+    writer.schedule("a", fail)
+    writer.schedule("b", lambda: runs.append("b"))
+    writer.flush()
+    assert runs == ["b"]
+    writer.schedule("a", lambda: runs.append("a"), delay=0.01)
+    wait_until(lambda: runs == ["b", "a"])
+    writer.close()
+
+
+def test_manager_writes_each_file_once_per_burst(tmp_path, monkeypatch):
+    import storage
+    from tests.conftest import open_manager
+
+    writes = []
+    original = storage.write_json_atomic
+    monkeypatch.setattr(storage, "write_json_atomic", lambda path, data: writes.append(path.name) or original(path, data))
+    manager = open_manager(tmp_path)
+    manager.writer.delay = 10
+    for i in range(20):
+        manager.add_prompt(f"条目{i}", "通用", [], f"正文{i}")
+    assert writes == []
+    manager.flush()
+    assert writes.count("prompts.json") == 1
+    assert len(read_json_list(tmp_path / "prompts.json", "prompts")) == 20